@@ -0,0 +1,67 @@
+# benchmarks/bench_contraction_hierarchies.py
+"""Compare Contraction Hierarchies queries with get_shortest_path_dijkstra.
+
+Usage: python benchmarks/bench_contraction_hierarchies.py [--queries N] [--save DIR]
+"""
+import argparse
+import os
+import random
+import time
+
+from common import load_map, quiet
+
+from core.algorithms import get_shortest_path_dijkstra
+from core.algorithms.contraction_hierarchies import ContractionHierarchy
+from core.algorithms import dijkstra
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="directory to write the preprocessed hierarchies to")
+    args = parser.parse_args()
+
+    cairo_map = load_map()
+    nodes = list(cairo_map.G.nodes())
+    rng = random.Random(args.seed)
+    pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(args.queries)]
+    print(f"Graph: {len(nodes)} nodes, {cairo_map.G.number_of_edges()} edges, {len(pairs)} queries")
+
+    for weight_type in ("distance", "travel_time"):
+        start = time.perf_counter()
+        hierarchy = ContractionHierarchy.build(cairo_map.G, weight_type)
+        build_time = time.perf_counter() - start
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            hierarchy.save(os.path.join(args.save, f"ch_{weight_type}.npz"))
+
+        start = time.perf_counter()
+        with quiet():
+            for s, t in pairs:
+                dijkstra.cache.clear()
+                get_shortest_path_dijkstra(cairo_map.G, s, t, weight_type)
+        dijkstra_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for s, t in pairs:
+            hierarchy.query(s, t)
+        ch_time = time.perf_counter() - start
+
+        mismatches = 0
+        with quiet():
+            for s, t in pairs:
+                dijkstra.cache.clear()
+                _, expected = get_shortest_path_dijkstra(cairo_map.G, s, t, weight_type)
+                _, length = hierarchy.query(s, t)
+                if abs(expected - length) > 1e-9:
+                    mismatches += 1
+
+        print(f"[{weight_type}] build {build_time * 1000:.1f} ms, {hierarchy.num_shortcuts} shortcuts")
+        print(f"  dijkstra: {dijkstra_time / len(pairs) * 1e6:.1f} us/query")
+        print(f"  ch:       {ch_time / len(pairs) * 1e6:.1f} us/query "
+              f"(x{dijkstra_time / max(ch_time, 1e-12):.1f}), mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
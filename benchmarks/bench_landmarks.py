@@ -0,0 +1,79 @@
+# benchmarks/bench_landmarks.py
+"""Settled nodes per query: Dijkstra vs Euclidean A* vs ALT (landmark) A*, one- and two-sided.
+
+Usage: python benchmarks/bench_landmarks.py [--queries N] [--landmarks K] [--grid SIDE]
+
+--grid SIDE runs on a SIDE x SIDE synthetic street grid instead of data/.
+"""
+import argparse
+import random
+import time
+
+import networkx as nx
+
+from common import load_map
+
+from core.algorithms.astar import astar_search, bidirectional_astar_search, euclidean_heuristic
+from core.algorithms.landmarks import LandmarkIndex
+from core.models.csr_graph import CSRGraph
+
+
+def grid_graph(side, seed):
+    rng = random.Random(seed)
+    graph = nx.Graph()
+    for (x1, y1), (x2, y2) in nx.grid_2d_graph(side, side).edges():
+        u, v = f"{x1}_{y1}", f"{x2}_{y2}"
+        graph.add_node(u, pos=(31.0 + x1 * 0.01, 30.0 + y1 * 0.01))
+        graph.add_node(v, pos=(31.0 + x2 * 0.01, 30.0 + y2 * 0.01))
+        distance = rng.uniform(1.0, 1.5)
+        graph.add_edge(u, v, distance=distance, travel_time=distance * rng.uniform(1.0, 2.0))
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--grid", type=int, default=0)
+    parser.add_argument("--weight", default="distance", choices=["distance", "travel_time"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    graph = grid_graph(args.grid, args.seed) if args.grid else load_map().G
+    csr = CSRGraph.from_networkx(graph)
+    adjacency = csr.adjacency(args.weight)
+
+    start = time.perf_counter()
+    index = LandmarkIndex.build(csr, args.weight, num_landmarks=args.landmarks)
+    print(f"Graph: {csr.num_nodes} nodes, {csr.num_edges} arcs; "
+          f"{len(index.landmarks)} landmarks in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = random.Random(args.seed)
+    pairs = [(rng.randrange(csr.num_nodes), rng.randrange(csr.num_nodes)) for _ in range(args.queries)]
+    modes = {
+        "dijkstra": (astar_search, lambda t: (lambda v: 0.0)),
+        "euclidean A*": (astar_search, lambda t: euclidean_heuristic(csr, t)),
+        "ALT A*": (astar_search, index.potential),
+        "bidir ALT A*": (bidirectional_astar_search, index.potential),
+    }
+    reference = None
+    for name, (search, make_heuristic) in modes.items():
+        settled = 0
+        costs = []
+        start = time.perf_counter()
+        for s, t in pairs:
+            if search is bidirectional_astar_search:
+                _, cost, expanded = search(adjacency, s, t, make_heuristic(t), make_heuristic(s))
+            else:
+                _, cost, expanded = search(adjacency, s, t, make_heuristic(t))
+            settled += expanded
+            costs.append(cost)
+        elapsed = time.perf_counter() - start
+        reference = reference or costs
+        mismatches = sum(abs(a - b) > 1e-9 for a, b in zip(reference, costs))
+        print(f"{name:>13}: {settled / len(pairs):8.1f} settled/query, "
+              f"{elapsed / len(pairs) * 1e6:8.1f} us/query, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
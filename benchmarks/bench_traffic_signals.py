@@ -0,0 +1,86 @@
+# benchmarks/bench_traffic_signals.py
+"""Intersections per second: per-dict signal planning vs the vectorized batch API.
+
+Usage: python benchmarks/bench_traffic_signals.py [--intersections N] [--min-green PCT]
+       python benchmarks/bench_traffic_signals.py --data DIR [--period PERIOD]
+
+--data DIR takes the approach counts of DIR's road graph (approach_counts)
+and also preempts the signals along random shortest routes, instead of
+planning --intersections random intersections.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from common import load_map
+
+from core.algorithms.dijkstra import get_shortest_path_dijkstra
+from core.algorithms.emergency_priority import adjust_signal_for_emergency, adjust_signals_for_emergency, preempt_route
+from core.algorithms.traffic_signal_optimizer import (
+    DIRECTIONS, approach_counts, optimize_traffic_signal, optimize_traffic_signals,
+)
+
+# The per-dict functions run on at most this many intersections
+SCALAR_LIMIT = 10_000
+
+
+def report(name, count, elapsed):
+    print(f"{name:>22}: {elapsed * 1000:9.1f} ms, {count / elapsed:12,.0f} intersections/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--intersections", type=int, default=100_000)
+    parser.add_argument("--min-green", type=float, default=5.0)
+    parser.add_argument("--data", default=None)
+    parser.add_argument("--period", default="morning")
+    parser.add_argument("--routes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    csr = None
+    if args.data:
+        cairo_map = load_map(args.data)
+        csr = cairo_map.freeze()
+        _, counts = approach_counts(csr, args.period)
+    else:
+        counts = rng.integers(0, 3000, size=(args.intersections, len(DIRECTIONS))).astype(np.float64)
+    emergency = rng.integers(0, len(DIRECTIONS), size=len(counts))
+    print(f"{len(counts)} intersections")
+
+    subset = counts[:SCALAR_LIMIT].tolist()
+    start = time.perf_counter()
+    for row, direction in zip(subset, emergency.tolist()):
+        intersection = dict(zip(DIRECTIONS, row))
+        optimize_traffic_signal(intersection)
+        adjust_signal_for_emergency(intersection, DIRECTIONS[direction])
+    report("per-dict (both)", len(subset), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    optimize_traffic_signals(counts)
+    report("batch splits", len(counts), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    adjust_signals_for_emergency(counts, emergency, args.min_green)
+    report("batch preemption", len(counts), time.perf_counter() - start)
+
+    if csr is not None:
+        picker = random.Random(args.seed)
+        routes = []
+        while len(routes) < args.routes:
+            path, _ = get_shortest_path_dijkstra(csr, picker.choice(csr.node_ids), picker.choice(csr.node_ids))
+            if path:
+                routes.append(path)
+        start = time.perf_counter()
+        for route in routes:
+            preempt_route(csr, counts, route, args.min_green)
+        elapsed = time.perf_counter() - start
+        print(f"{'route preemption':>22}: {elapsed / len(routes) * 1000:9.1f} ms/route, "
+              f"{sum(map(len, routes)) / len(routes):.0f} intersections/route, whole plan replanned each time")
+
+
+if __name__ == "__main__":
+    main()
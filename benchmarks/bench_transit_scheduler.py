@@ -0,0 +1,83 @@
+# benchmarks/bench_transit_scheduler.py
+"""Full-day transit scheduling: O(n^2) predecessor scan vs binary search, plus the fleet variant.
+
+Usage: python benchmarks/bench_transit_scheduler.py [--trips N] [--vehicles K] [--reference N]
+       python benchmarks/bench_transit_scheduler.py --data DIR
+
+--data DIR derives the timetable from DIR's bus routes and metro lines
+(transit_trips) instead of generating --trips random trips. The quadratic
+reference runs on the first --reference trips only.
+"""
+import argparse
+import random
+import time
+
+from common import load_map
+
+from core.algorithms.public_transit_scheduler import schedule_fleet, schedule_transit, transit_trips
+
+
+def random_trips(count, seed):
+    rng = random.Random(seed)
+    trips = []
+    for k in range(count):
+        start = rng.uniform(5.0, 23.0)
+        trips.append({"line_id": f"T{k}", "start_time": start, "end_time": start + rng.uniform(0.2, 1.5),
+                      "passenger_demand": rng.randint(10, 500)})
+    return trips
+
+
+def quadratic_schedule(lines):
+    """The original scheduler: backwards scan for every trip's predecessor."""
+    lines = sorted(lines, key=lambda x: x["end_time"])
+    n = len(lines)
+    prev = [-1] * n
+    for i in range(n):
+        for j in range(i - 1, -1, -1):
+            if lines[j]["end_time"] <= lines[i]["start_time"]:
+                prev[i] = j
+                break
+    dp = [0] * (n + 1)
+    for i in range(1, n + 1):
+        dp[i] = max(dp[i - 1], lines[i - 1]["passenger_demand"] + dp[prev[i - 1] + 1])
+    return dp[n]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trips", type=int, default=100_000)
+    parser.add_argument("--vehicles", type=int, default=50)
+    parser.add_argument("--reference", type=int, default=5000)
+    parser.add_argument("--data", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.data:
+        cairo_map = load_map(args.data)
+        trips = list(transit_trips(cairo_map.bus_routes, cairo_map.metro_lines))
+    else:
+        trips = random_trips(args.trips, args.seed)
+    print(f"{len(trips)} trips")
+
+    subset = trips[:args.reference]
+    expected, elapsed = timed(quadratic_schedule, subset)
+    (_, total), fast = timed(schedule_transit, subset, 1)
+    print(f"{'O(n^2) scan':>16}: {elapsed * 1000:9.1f} ms on {len(subset)} trips "
+          f"(binary search {fast * 1000:.1f} ms), totals match: {expected == total}")
+
+    (selected, total), elapsed = timed(schedule_transit, trips, 1)
+    print(f"{'schedule_transit':>16}: {elapsed * 1000:9.1f} ms, {len(selected)} trips, {total} passengers")
+
+    (assignments, total), elapsed = timed(schedule_fleet, trips, args.vehicles)
+    print(f"{'schedule_fleet':>16}: {elapsed * 1000:9.1f} ms, {len(assignments)} trips on "
+          f"{args.vehicles} vehicles, {total} passengers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# benchmarks/common.py
+import contextlib
+import io
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.models.data_module import CairoMap
+from core.services.data_loader import load_cairo_map
+
+
+def load_map(data_dir=os.path.join(ROOT, "data")):
+    """Build a CairoMap from a data directory without starting the GUI."""
+    return load_cairo_map(CairoMap(), data_dir)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Keep anything written to stdout out of the timings."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
@@ -0,0 +1,444 @@
+# benchmarks/run_benchmarks.py
+"""Run every core/algorithms entry point on synthetic networks of increasing size.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 1000 10000 ...] [--queries N]
+                                            [--out results.json] [--baseline old.json]
+
+Datasets are generated once per (size, seed) under benchmarks/.data/ with
+core/services/synthetic_network.py. Every case reports wall time per call,
+peak traced memory and, for the searches, nodes expanded. Results are
+written as JSON; with --baseline the run is compared against an earlier
+results file and exits with status 1 if any case got slower than
+--threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from common import ROOT, quiet
+
+from core.algorithms import (
+    ContractionHierarchy, EmergencyCatchments, IncrementalMST, LandmarkIndex, RoadImpactEvaluator,
+    adjust_signal_for_emergency, adjust_signals_for_emergency, approach_counts,
+    compute_travel_matrix, demand_pair_costs, design_mst_network, get_anytime_path,
+    get_best_departure, get_shortest_path_astar, get_shortest_path_dijkstra, get_time_dependent_path,
+    greedy_search, maintenance_candidates, neighborhood_facility_matrix, optimize_road_maintenance,
+    optimize_traffic_signal, optimize_traffic_signals, route_cache, schedule_fleet, schedule_transit,
+    transit_trips,
+)
+from core.algorithms import instrumentation
+from core.models.data_module import CairoMap
+from core.services.stream_loader import stream_cairo_map
+from core.services.synthetic_network import write_dataset
+
+DATA_ROOT = os.path.join(ROOT, "benchmarks", ".data")
+
+CASES = []
+
+
+def case(name, max_nodes=None, algorithm=None):
+    """Register ``fn(ctx, pairs) -> calls`` as a benchmark case.
+
+    Cases above ``max_nodes`` are reported as skipped. ``algorithm`` is the
+    instrumentation name whose search counters (nodes expanded, heap
+    pushes, edges relaxed) are reported for the case.
+    """
+    def register(fn):
+        CASES.append((name, max_nodes, algorithm, fn))
+        return fn
+    return register
+
+
+class Context:
+    """One loaded dataset plus whatever the cases share (CSR snapshot, indexes)."""
+
+    def __init__(self, cairo_map, seed):
+        self.cairo_map = cairo_map
+        self.graph = cairo_map.G
+        self.csr = cairo_map.freeze()
+        self.rng = random.Random(seed)
+        self.landmarks = None
+        self.hierarchy = None
+
+    def random_pairs(self, count):
+        nodes = self.csr.node_ids
+        return [(self.rng.choice(nodes), self.rng.choice(nodes)) for _ in range(count)]
+
+
+def _routing(ctx, pairs, search):
+    for s, t in pairs:
+        route_cache.clear()
+        search(s, t)
+    return len(pairs)
+
+
+@case("dijkstra/networkx", algorithm="dijkstra")
+def bench_dijkstra_nx(ctx, pairs):
+    return _routing(ctx, pairs, lambda s, t: get_shortest_path_dijkstra(ctx.graph, s, t))
+
+
+@case("dijkstra/csr", algorithm="dijkstra")
+def bench_dijkstra_csr(ctx, pairs):
+    return _routing(ctx, pairs, lambda s, t: get_shortest_path_dijkstra(ctx.csr, s, t))
+
+
+@case("astar/networkx", algorithm="astar")
+def bench_astar_nx(ctx, pairs):
+    return _routing(ctx, pairs, lambda s, t: get_shortest_path_astar(ctx.graph, s, t))
+
+
+@case("astar/csr", algorithm="astar")
+def bench_astar_csr(ctx, pairs):
+    return _routing(ctx, pairs, lambda s, t: get_shortest_path_astar(ctx.csr, s, t))
+
+
+@case("landmarks/build")
+def bench_landmarks_build(ctx, pairs):
+    ctx.landmarks = LandmarkIndex.build(ctx.csr, 'distance')
+    return 1
+
+
+@case("astar/alt", algorithm="astar")
+def bench_astar_alt(ctx, pairs):
+    if ctx.landmarks is None:
+        ctx.landmarks = LandmarkIndex.build(ctx.csr, 'distance')
+    return _routing(ctx, pairs, lambda s, t: get_shortest_path_astar(ctx.csr, s, t, landmarks=ctx.landmarks))
+
+
+@case("astar/bidirectional_alt", algorithm="astar")
+def bench_astar_bidirectional(ctx, pairs):
+    if ctx.landmarks is None:
+        ctx.landmarks = LandmarkIndex.build(ctx.csr, 'distance')
+    return _routing(ctx, pairs, lambda s, t: get_shortest_path_astar(
+        ctx.csr, s, t, landmarks=ctx.landmarks, bidirectional=True))
+
+
+@case("greedy", algorithm="greedy")
+def bench_greedy(ctx, pairs):
+    for s, t in pairs:
+        greedy_search(ctx.csr, s, t)
+    return len(pairs)
+
+
+@case("astar/anytime", algorithm="astar.anytime")
+def bench_astar_anytime(ctx, pairs):
+    # Fixed expansion budget so the result does not depend on the machine
+    for s, t in pairs:
+        get_anytime_path(ctx.csr, s, t, time_budget=None, max_expansions=1000)
+    return len(pairs)
+
+
+@case("time_dependent/path", algorithm="time_dependent")
+def bench_time_dependent(ctx, pairs):
+    hours = [6.0, 8.5, 13.0, 18.25, 23.0]
+    return _routing(ctx, pairs, lambda s, t: get_time_dependent_path(ctx.csr, s, t, hours[len(s) % len(hours)]))
+
+
+@case("time_dependent/best_departure", algorithm="time_dependent.best_departure")
+def bench_best_departure(ctx, pairs):
+    pairs = pairs[:5]
+    return _routing(ctx, pairs, lambda s, t: get_best_departure(ctx.csr, s, t, 6.0, 10.0, step_minutes=30))
+
+
+@case("contraction_hierarchies/build", max_nodes=10000)
+def bench_ch_build(ctx, pairs):
+    ctx.hierarchy = ContractionHierarchy.build(ctx.graph, 'distance')
+    return 1
+
+
+@case("contraction_hierarchies/query", max_nodes=10000, algorithm="contraction_hierarchies.query")
+def bench_ch_query(ctx, pairs):
+    if ctx.hierarchy is None:
+        ctx.hierarchy = ContractionHierarchy.build(ctx.graph, 'distance')
+    for s, t in pairs:
+        ctx.hierarchy.query(s, t)
+    return len(pairs)
+
+
+@case("travel_matrix/20x200")
+def bench_travel_matrix(ctx, pairs):
+    nodes = ctx.csr.node_ids
+    origins = [ctx.rng.choice(nodes) for _ in range(20)]
+    destinations = [ctx.rng.choice(nodes) for _ in range(200)]
+    compute_travel_matrix(ctx.csr, origins, destinations)
+    return 1
+
+
+@case("travel_matrix/demand_pairs", max_nodes=10000)
+def bench_demand_pairs(ctx, pairs):
+    demand_pair_costs(ctx.cairo_map)
+    return 1
+
+
+@case("travel_matrix/neighborhood_facility", max_nodes=2000)
+def bench_neighborhood_facility(ctx, pairs):
+    neighborhood_facility_matrix(ctx.cairo_map)
+    return 1
+
+
+@case("mst", max_nodes=100000)
+def bench_mst(ctx, pairs):
+    design_mst_network(ctx.graph)
+    return 1
+
+
+@case("mst/incremental", max_nodes=100000)
+def bench_mst_incremental(ctx, pairs):
+    # What-if sweep: every proposed road on, then off again, one at a time
+    mst = IncrementalMST(ctx.graph)
+    roads = sorted(mst.proposed)[:len(pairs)]
+    for road in roads:
+        mst.toggle(*road, on=True)
+    for road in roads:
+        mst.toggle(*road, on=False)
+    return 1
+
+
+@case("road_maintenance")
+def bench_road_maintenance(ctx, pairs):
+    # Exact DP: the worst roads compete for a budget of 2000 cost units
+    roads = sorted(ctx.cairo_map.existing_roads, key=lambda road: road["condition"])[:2000]
+    candidates = [{"road_id": f"{road['from_id']}-{road['to_id']}",
+                   "repair_cost": max(1, int(road["distance_km"] * 10)),
+                   "urgency": 10 - road["condition"]} for road in roads]
+    optimize_road_maintenance(candidates, 2000)
+    return 1
+
+
+@case("road_maintenance/scaled")
+def bench_road_maintenance_scaled(ctx, pairs):
+    # Every worn road priced in EGP, 5% of the total repair bill available
+    candidates = maintenance_candidates(ctx.cairo_map)
+    budget = sum(road["repair_cost"] for road in candidates) // 20
+    optimize_road_maintenance(candidates, budget, scale='auto')
+    return 1
+
+
+@case("road_impact", max_nodes=10000, algorithm="road_impact")
+def bench_road_impact(ctx, pairs):
+    evaluator = RoadImpactEvaluator.build(ctx.cairo_map, processes=1)
+    evaluator.score_candidates(processes=1)
+    return 1
+
+
+@case("road_impact/combinations", max_nodes=1000, algorithm="road_impact.combinations")
+def bench_road_impact_combinations(ctx, pairs):
+    # Every set of up to three proposed roads within a tenth of their total cost
+    evaluator = RoadImpactEvaluator.build(ctx.cairo_map, processes=1)
+    evaluator.best_combinations(sum(c["cost"] for c in evaluator.candidates) // 10, max_roads=3)
+    return 1
+
+
+@case("emergency_catchments", algorithm="emergency_catchments.build")
+def bench_emergency_catchments(ctx, pairs):
+    catchments = EmergencyCatchments(ctx.graph, "Medical")
+    for s, _ in pairs:
+        catchments.route(s, "evening")
+    return 1
+
+
+@case("emergency_catchments/repair", algorithm="emergency_catchments.repair")
+def bench_emergency_repair(ctx, pairs):
+    # Close and reopen the first road of every query's ambulance route
+    catchments = EmergencyCatchments(ctx.graph, "Medical")
+    calls = 0
+    for s, _ in pairs:
+        path, _ = catchments.route(s, "evening")
+        if path is None or len(path) < 2:
+            continue
+        u, v = path[0], path[1]
+        data = dict(ctx.graph.edges[u, v])
+        ctx.cairo_map.remove_edge(u, v)
+        catchments.refresh()
+        ctx.cairo_map.update_edge(u, v, **data)
+        catchments.refresh()
+        calls += 2
+    return calls
+
+
+@case("transit_scheduler")
+def bench_transit_scheduler(ctx, pairs):
+    # A full day of departures for every bus route and metro line
+    trips = list(transit_trips(ctx.cairo_map.bus_routes, ctx.cairo_map.metro_lines))
+    schedule_transit(trips, len(ctx.cairo_map.bus_routes))
+    return 1
+
+
+@case("transit_scheduler/fleet")
+def bench_transit_fleet(ctx, pairs):
+    trips = list(transit_trips(ctx.cairo_map.bus_routes, ctx.cairo_map.metro_lines))
+    schedule_fleet(trips, sum(route.get("buses_assigned", 1) for route in ctx.cairo_map.bus_routes))
+    return 1
+
+
+@case("traffic_signal")
+def bench_traffic_signal(ctx, pairs):
+    # Every intersection's morning inflow, bucketed by approach direction
+    graph = ctx.graph
+    calls = 0
+    for node, data in graph.nodes(data=True):
+        x, y = data["pos"]
+        counts = {"north": 0, "south": 0, "east": 0, "west": 0}
+        for neighbor, edge in graph.adj[node].items():
+            nx_, ny_ = graph.nodes[neighbor]["pos"]
+            if abs(ny_ - y) >= abs(nx_ - x):
+                counts["north" if ny_ > y else "south"] += edge["morning_traffic"]
+            else:
+                counts["east" if nx_ > x else "west"] += edge["morning_traffic"]
+        optimize_traffic_signal(counts)
+        adjust_signal_for_emergency(counts, max(counts, key=counts.get))
+        calls += 1
+    return calls
+
+
+@case("traffic_signal/batch", algorithm="traffic_signal.batch")
+def bench_traffic_signal_batch(ctx, pairs):
+    # The same city-wide plan as traffic_signal, in one vectorized pass
+    _, counts = approach_counts(ctx.csr)
+    optimize_traffic_signals(counts)
+    adjust_signals_for_emergency(counts, counts.argmax(axis=1))
+    return len(counts)
+
+
+def dataset_dir(size, seed):
+    path = os.path.join(DATA_ROOT, f"{size}_{seed}")
+    if not os.path.exists(os.path.join(path, "transport.json")):
+        write_dataset(path, size, seed)
+    return path
+
+
+def run_case(ctx, fn, pairs, memory, algorithm):
+    with quiet():
+        start = time.perf_counter()
+        calls = fn(ctx, pairs)
+        elapsed = time.perf_counter() - start
+        counters = {}
+        if algorithm is not None:
+            # Separate pass so the counters don't weigh on the timing
+            with instrumentation.profile() as recorded:
+                fn(ctx, pairs)
+            counters = recorded.stats(algorithm)
+        peak = None
+        if memory:
+            # Separate, shorter run: tracing allocations distorts the timing
+            tracemalloc.start()
+            fn(ctx, pairs[:3])
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    expanded = counters.get("settled_mean")
+    return {
+        "calls": calls,
+        "seconds_total": elapsed,
+        "seconds_per_call": elapsed / calls if calls else None,
+        "peak_memory_bytes": peak,
+        # networkx's own Dijkstra has no counters
+        "nodes_expanded_mean": expanded or None,
+        "heap_pushes_mean": counters.get("heap_pushes_mean") or None,
+        "edges_relaxed_mean": counters.get("edges_relaxed_mean") or None,
+    }
+
+
+def run(sizes, queries, seed, memory, only):
+    results = []
+    for size in sizes:
+        path = dataset_dir(size, seed)
+        start = time.perf_counter()
+        with quiet():
+            cairo_map = stream_cairo_map(CairoMap(), path)
+        load_time = time.perf_counter() - start
+        ctx = Context(cairo_map, seed)
+        results.append({"size": size, "case": "load/stream_cairo_map", "calls": 1, "seconds_total": load_time,
+                        "seconds_per_call": load_time, "peak_memory_bytes": None, "nodes_expanded_mean": None})
+        pairs = ctx.random_pairs(queries)
+        for name, max_nodes, algorithm, fn in CASES:
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            if max_nodes is not None and size > max_nodes:
+                results.append({"size": size, "case": name, "skipped": f"size > {max_nodes}"})
+                continue
+            row = {"size": size, "case": name}
+            try:
+                row.update(run_case(ctx, fn, pairs, memory, algorithm))
+            except Exception as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+                print(f"{size:>8} {name:<40} failed: {row['error']}", file=sys.stderr)
+            else:
+                print(_format(row), file=sys.stderr)
+            results.append(row)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """Print per-case speed ratios against a previous results file; return the regressions."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(row["size"], row["case"]): row for row in json.load(f)["results"]}
+    regressions = []
+    for row in results:
+        old = baseline.get((row["size"], row["case"]))
+        if not old or not old.get("seconds_per_call") or not row.get("seconds_per_call"):
+            continue
+        ratio = row["seconds_per_call"] / old["seconds_per_call"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{row['size']:>8} {row['case']:<40} x{ratio:6.2f}{flag}")
+        if flag:
+            regressions.append(row)
+    return regressions
+
+
+def _format(row):
+    per_call = row["seconds_per_call"]
+    text = f"{row['size']:>8} {row['case']:<40} {per_call * 1000 if per_call else 0:10.3f} ms/call"
+    if row["peak_memory_bytes"] is not None:
+        text += f" {row['peak_memory_bytes'] / 2**20:9.2f} MiB"
+    if row["nodes_expanded_mean"] is not None:
+        text += f" {row['nodes_expanded_mean']:10.1f} expanded"
+    return text
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=50, help="random origin-destination pairs per size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", help="run only cases whose name starts with one of these")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio reported as a regression (default 1.2)")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.queries, args.seed, not args.no_memory, args.only)
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "queries": args.queries,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}", file=sys.stderr)
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
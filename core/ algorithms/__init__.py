@@ -1,9 +1,16 @@
-from .astar import get_shortest_path_astar
+from .astar import get_shortest_path_astar, get_anytime_path, AnytimeSearch
 from .dijkstra import get_shortest_path_dijkstra
 from .greedy import greedy_search
-from .mst import design_mst_network
-from .traffic_signal_optimizer import optimize_traffic_signal
-from .emergency_priority import adjust_signal_for_emergency
-from .public_transit_scheduler import schedule_transit
-from .road_maintenance_optimizer import optimize_road_maintenance
-from .time_dependent_dijkstra import get_time_dependent_path
\ No newline at end of file
+from .mst import IncrementalMST, design_mst_network
+from .traffic_signal_optimizer import optimize_traffic_signal, optimize_traffic_signals, approach_counts
+from .emergency_priority import adjust_signal_for_emergency, adjust_signals_for_emergency, preempt_route
+from .public_transit_scheduler import schedule_fleet, schedule_transit, transit_trips
+from .road_maintenance_optimizer import optimize_road_maintenance, solve_knapsack, maintenance_candidates
+from .time_dependent_dijkstra import get_time_dependent_path, get_best_departure
+from .contraction_hierarchies import ContractionHierarchy, build_contraction_hierarchies
+from .landmarks import LandmarkIndex
+from .route_cache import RouteCache, route_cache
+from .travel_matrix import compute_travel_matrix, matrix_path, demand_pair_costs, neighborhood_facility_matrix
+from .road_impact import RoadImpactEvaluator, insert_edge
+from .emergency_catchments import EmergencyCatchments
+from . import instrumentation
@@ -1,37 +1,412 @@
 # core/algorithm/astar.py
 import heapq
 import math
+import time
+import numpy as np
+from ..models.csr_graph import CSRGraph, snapshot_of
+from ..models.spatial_index import locate
+from .route_cache import graph_version, route_cache
+from .instrumentation import STATE, count, instrumented, scanned_edges
 
-def get_shortest_path_astar(graph, source, target, weight_type='distance'):
-    def heuristic(u, v):
-        pos_u = graph.nodes[u].get("pos", (0,0))
-        pos_v = graph.nodes[v].get("pos", (0,0))
-        return math.sqrt((pos_u[0] - pos_v[0])**2 + (pos_u[1] - pos_v[1])**2)
+@instrumented("astar")
+def get_shortest_path_astar(graph, source, target, weight_type='distance', landmarks=None, bidirectional=False):
+    """
+    source/target: node ids or (lon, lat) pairs, which snap to the nearest node.
+    landmarks: optional LandmarkIndex (see landmarks.py) built from the same
+    road network for ``weight_type``; switches A* to the ALT heuristic.
+    If the graph changed since they were built (another version), their
+    distances no longer bound the routes and the plain heuristic is used.
+    bidirectional: search from both ends at once (undirected road graphs only).
+    """
+    source, target = locate(graph, source), locate(graph, target)
+    if landmarks is not None:
+        if landmarks.weight_type != weight_type:
+            raise ValueError(f"Landmarks were built for {landmarks.weight_type!r}, not {weight_type!r}")
+        if graph is not landmarks.csr and graph_version(graph) != landmarks.csr.version:
+            landmarks = None
+        elif not isinstance(graph, CSRGraph):
+            graph = landmarks.csr
 
-    source = str(source)
-    target = str(target)
-    open_set = []
-    heapq.heappush(open_set, (0 + heuristic(source, target), 0, source, [source]))
-    g_score = {node: float('inf') for node in graph.nodes()}
-    g_score[source] = 0
+    key = ('astar', str(source), str(target), weight_type)
+    cached = route_cache.get(graph, key)
+    if cached is not None:
+        return cached
+    path, cost = _astar(graph, source, target, weight_type, landmarks, bidirectional)
+    route_cache.put(graph, key, (path, cost), path)
+    return path, cost
 
+
+def _astar(graph, source, target, weight_type, landmarks, bidirectional):
+    if isinstance(graph, CSRGraph):
+        s = graph.node_index(source)
+        t = graph.node_index(target)
+        if s is None or t is None or weight_type not in graph.weights:
+            return None, float('inf')
+        adjacency = graph.adjacency(weight_type)
+        if landmarks is not None:
+            make_heuristic = landmarks.potential
+        else:
+            make_heuristic = lambda node: euclidean_heuristic(graph, node)
+    else:
+        s = str(source)
+        t = str(target)
+        if s not in graph or t not in graph:
+            return None, float('inf')
+        if bidirectional and graph.is_directed():
+            raise ValueError("Bidirectional A* needs an undirected graph")
+        adjacency = _NxAdjacency(graph, weight_type)
+        make_heuristic = lambda node: _position_heuristic(graph, node)
+
+    if bidirectional:
+        path, cost, _ = bidirectional_astar_search(adjacency, s, t, make_heuristic(t), make_heuristic(s))
+    else:
+        path, cost, _ = astar_search(adjacency, s, t, make_heuristic(t))
+    if path is None:
+        return None, float('inf')
+    if isinstance(graph, CSRGraph):
+        path = graph.path_ids(path)
+    return path, cost
+
+
+def euclidean_heuristic(csr, target):
+    """Straight-line distance between ``pos`` coordinates to ``target``.
+
+    The coordinate arrays are converted once per snapshot and reused by
+    every query.
+    """
+    coords = csr.__dict__.get("_xy")
+    if coords is None:
+        coords = csr.__dict__["_xy"] = (csr.pos[:, 0].tolist(), csr.pos[:, 1].tolist())
+    xs, ys = coords
+    tx, ty = xs[target], ys[target]
+
+    def heuristic(u):
+        return math.sqrt((xs[u] - tx)**2 + (ys[u] - ty)**2)
+
+    return heuristic
+
+
+def calibrated_heuristic(csr, target, weight_type='distance'):
+    """Straight-line distance to ``target`` scaled into ``weight_type`` units.
+
+    The scale is the smallest weight per unit of straight-line length over
+    all roads, so the heuristic never overestimates (it stays admissible
+    and consistent) while being far tighter than raw coordinate distance.
+    Computed once per snapshot and weight type.
+    """
+    scales = csr.__dict__.setdefault("_heuristic_scale", {})
+    if weight_type not in scales:
+        sources = np.repeat(np.arange(csr.num_nodes), np.diff(csr.offsets))
+        length = np.hypot(*(csr.pos[sources] - csr.pos[csr.targets]).T)
+        weights = csr.weight(weight_type)
+        usable = (length > 0) & ~np.isnan(weights)
+        scales[weight_type] = float((weights[usable] / length[usable]).min()) if usable.any() else 0.0
+    scale = scales[weight_type]
+    straight = euclidean_heuristic(csr, target)
+    return lambda u: scale * straight(u)
+
+
+def _position_heuristic(graph, target):
+    nodes = graph.nodes
+    tx, ty = nodes[target].get("pos", (0, 0))
+
+    def heuristic(u):
+        x, y = nodes[u].get("pos", (0, 0))
+        return math.sqrt((x - tx)**2 + (y - ty)**2)
+
+    return heuristic
+
+
+class _NxAdjacency:
+    """``adjacency[u]`` view of a networkx graph yielding ``(neighbor, weight)``.
+
+    Edges without ``weight_type`` are skipped, like the CSR adjacency lists.
+    """
+
+    def __init__(self, graph, weight_type):
+        self._adj = graph.adj
+        self._weight_type = weight_type
+
+    def __getitem__(self, u):
+        weight_type = self._weight_type
+        return ((v, data[weight_type]) for v, data in self._adj[u].items() if weight_type in data)
+
+    def degree(self, u):
+        return len(self._adj[u])
+
+
+def astar_search(adjacency, source, target, heuristic):
+    """A* with parent pointers and a closed set.
+
+    ``adjacency[u]`` yields ``(neighbor, weight)``; nodes can be CSR indices
+    or networkx ids. Only touched nodes are stored, and stale heap entries
+    are skipped instead of re-expanded.
+    Returns ``(path, cost, settled)`` where ``settled`` is the number of
+    nodes expanded, or ``(None, inf, settled)`` when target is unreachable.
+    """
+    open_set = [(heuristic(source), 0.0, source)]
+    g_score = {source: 0.0}
+    parent = {source: None}
+    closed = set()
+    pushes = 0
     while open_set:
-        f_current, g_current, current, path = heapq.heappop(open_set)
+        f_current, g_current, current = heapq.heappop(open_set)
+        if current in closed:
+            continue
+        closed.add(current)
         if current == target:
-            print("Path founded")
-            total_cost = g_score[current]
-            return path, total_cost
-        for neighbor in graph.neighbors(current):
-            try:
-                weight = graph[current][neighbor][weight_type]
-            except KeyError:
+            if STATE.enabled:
+                _count_search(adjacency, closed, pushes + 1, len(open_set), unexpanded=target)
+            return _walk(parent, current)[::-1], g_current, len(closed)
+        for neighbor, weight in adjacency[current]:
+            if neighbor in closed:
                 continue
-            tentative_g_score = g_score[current] + weight
+            tentative_g_score = g_current + weight
             if tentative_g_score < g_score.get(neighbor, float('inf')):
                 g_score[neighbor] = tentative_g_score
-                f_score = tentative_g_score + heuristic(neighbor, target)
-                heapq.heappush(open_set, (f_score, tentative_g_score, neighbor, path + [neighbor]))
-    print("Path not found.")
-    return None, float('inf')
+                parent[neighbor] = current
+                heapq.heappush(open_set, (tentative_g_score + heuristic(neighbor), tentative_g_score, neighbor))
+                pushes += 1
+    if STATE.enabled:
+        _count_search(adjacency, closed, pushes + 1, 0)
+    return None, float('inf'), len(closed)
+
+
+def bidirectional_astar_search(adjacency, source, target, to_target, to_source):
+    """Bidirectional A* with average potentials (undirected graphs).
+
+    Both searches use ``p(v) = (to_target(v) - to_source(v)) / 2`` (negated
+    for the backward search), which keeps the reduced edge costs non-negative
+    when both heuristics are consistent. The search stops once the two queue
+    minima together reach the best meeting cost found so far.
+    Returns ``(path, cost, settled)`` like :func:`astar_search`.
+    """
+    if source == target:
+        return [source], 0.0, 1
+
+    def potential(v):
+        return (to_target(v) - to_source(v)) / 2
+
+    g = ({source: 0.0}, {target: 0.0})
+    parent = ({source: None}, {target: None})
+    closed = (set(), set())
+    heaps = ([(potential(source), 0.0, source)], [(-potential(target), 0.0, target)])
+    sign = (1, -1)
+    best = float('inf')
+    meeting = None
+    side = 0
+    pushes = 0
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        # Expand the smaller frontier first
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        _, g_current, current = heapq.heappop(heaps[side])
+        if current in closed[side]:
+            continue
+        closed[side].add(current)
+        g_side, g_other = g[side], g[1 - side]
+        for neighbor, weight in adjacency[current]:
+            if neighbor in closed[side]:
+                continue
+            tentative_g_score = g_current + weight
+            if tentative_g_score < g_side.get(neighbor, float('inf')):
+                g_side[neighbor] = tentative_g_score
+                parent[side][neighbor] = current
+                heapq.heappush(heaps[side], (tentative_g_score + sign[side] * potential(neighbor),
+                                             tentative_g_score, neighbor))
+                pushes += 1
+            if neighbor in g_other and tentative_g_score + g_other[neighbor] < best:
+                best = tentative_g_score + g_other[neighbor]
+                meeting = neighbor
+        if current in g_other and g_current + g_other[current] < best:
+            best = g_current + g_other[current]
+            meeting = current
+
+    settled = len(closed[0]) + len(closed[1])
+    if STATE.enabled:
+        _count_search(adjacency, closed[0] | closed[1], pushes + 2, len(heaps[0]) + len(heaps[1]))
+    if meeting is None:
+        return None, float('inf'), settled
+    return _walk(parent[0], meeting)[::-1] + _walk(parent[1], meeting)[1:], best, settled
+
+
+def _count_search(adjacency, closed, pushes, left_in_heap, unexpanded=None):
+    count(settled=len(closed), heap_pushes=pushes, heap_pops=pushes - left_in_heap,
+          edges_relaxed=scanned_edges(adjacency, (u for u in closed if u != unexpanded)))
+
+
+def _walk(parent, node):
+    chain = []
+    while node is not None:
+        chain.append(node)
+        node = parent[node]
+    return chain
+
+
+def get_anytime_path(graph, source, target, weight_type='distance', time_budget=0.05,
+                     max_expansions=None, epsilon=3.0, landmarks=None):
+    """Best route found within a latency budget, with a proven suboptimality bound.
+
+    Runs :class:`AnytimeSearch` for at most ``time_budget`` seconds and/or
+    ``max_expansions`` node expansions and returns it: ``search.path``,
+    ``search.cost`` and ``search.bound`` (cost <= bound x optimal), and
+    ``search.refine(...)`` keeps improving it when there is more time.
+    graph: networkx graph or CSRGraph; landmarks: optional LandmarkIndex
+    for ``weight_type`` (ALT heuristic instead of the calibrated
+    straight-line one). source/target may be (lon, lat) pairs.
+
+    A networkx graph is converted to a CSRGraph once per graph version
+    (:func:`snapshot_of`); any time that takes counts against
+    ``time_budget``. Unknown nodes give a finished search with no path and
+    cost inf, like the other routing entry points.
+    """
+    started = time.perf_counter()
+    csr = snapshot_of(graph)
+    source, target = locate(csr, source), locate(csr, target)
+    s = csr.node_index(source)
+    t = csr.node_index(target)
+    if s is None or t is None or weight_type not in csr.weights:
+        return AnytimeSearch.no_route()
+    if time_budget is not None:
+        time_budget = max(0.0, time_budget - (time.perf_counter() - started))
+    if landmarks is not None:
+        heuristic = landmarks.potential(t)
+    else:
+        heuristic = calibrated_heuristic(csr, t, weight_type)
+    search = AnytimeSearch(csr.adjacency(weight_type), s, t, heuristic, epsilon, node_ids=csr.node_ids)
+    search.refine(time_budget, max_expansions)
+    return search
+
+
+class AnytimeSearch:
+    """ARA*: a series of weighted A* searches with a shrinking inflation factor.
+
+    Each iteration expands nodes by ``g + epsilon * h`` and reuses the
+    previous iteration's g-values, so lowering epsilon only re-expands the
+    nodes whose costs can still improve. ``bound`` is proven from the
+    smallest ``g + h`` left in the open and inconsistent sets, a lower
+    bound on the optimal cost when ``heuristic`` is admissible and
+    consistent. ``done`` is set once the path is optimal (bound 1) or the
+    target turned out unreachable.
+    """
+
+    def __init__(self, adjacency, source, target, heuristic, epsilon=3.0, decrement=0.5, node_ids=None):
+        self.adjacency = adjacency
+        self.source = source
+        self.target = target
+        self.heuristic = heuristic
+        self.epsilon = max(1.0, epsilon)
+        self.decrement = decrement
+        self.node_ids = node_ids
+        self.expansions = 0
+        self.iterations = 0
+        self.done = False
+        self.g = {source: 0.0}
+        self.parent = {source: None}
+        self._h = {}
+        self._closed = set()
+        self._incons = set()
+        self._open = [(self.epsilon * self._estimate(source), 0.0, source)]
+        self._lower_bound = self._estimate(source)
+
+    @classmethod
+    def no_route(cls):
+        """A finished search without a route (unknown source or target)."""
+        search = cls([], None, None, lambda u: 0.0)
+        search.g, search.parent, search.done = {}, {}, True
+        return search
+
+    @property
+    def path(self):
+        """Best route found so far (node ids when ``node_ids`` was given), None before the first one."""
+        if self.target not in self.g:
+            return None
+        path = _walk(self.parent, self.target)[::-1]
+        return [self.node_ids[u] for u in path] if self.node_ids is not None else path
+
+    @property
+    def cost(self):
+        return self.g.get(self.target, float('inf'))
+
+    @property
+    def bound(self):
+        """cost <= bound x optimal cost (inf while no route is known or nothing is proven)."""
+        if self.done and self.target in self.g:
+            return 1.0
+        if self.target not in self.g or self._lower_bound <= 0:
+            return float('inf')
+        return max(1.0, self.cost / self._lower_bound)
+
+    @instrumented("astar.anytime")
+    def refine(self, time_budget=None, max_expansions=None):
+        """Keep improving for up to ``time_budget`` seconds / ``max_expansions`` expansions (None = no limit).
+
+        Returns ``(path, cost, bound)``; stops early once the route is optimal.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        limit = None if max_expansions is None else self.expansions + max_expansions
+        while not self.done:
+            if not self._improve(deadline, limit):
+                break
+            self._finish_iteration()
+        return self.path, self.cost, self.bound
+
+    def _estimate(self, u):
+        h = self._h.get(u)
+        if h is None:
+            h = self._h[u] = self.heuristic(u)
+        return h
+
+    def _improve(self, deadline, limit):
+        """Expand until the target's cost is within epsilon; False if the budget ran out first."""
+        heap, g, parent, closed, incons = self._open, self.g, self.parent, self._closed, self._incons
+        adjacency, target, epsilon, estimate = self.adjacency, self.target, self.epsilon, self._estimate
+        expanded = []
+        pushes = 0
+        finished = True
+        while heap and heap[0][0] < g.get(target, float('inf')):
+            if (limit is not None and self.expansions >= limit) or \
+                    (deadline is not None and time.perf_counter() >= deadline):
+                finished = False
+                break
+            _, g_current, current = heapq.heappop(heap)
+            if current in closed or g_current != g[current]:
+                continue
+            closed.add(current)
+            expanded.append(current)
+            self.expansions += 1
+            for neighbor, weight in adjacency[current]:
+                tentative_g_score = g_current + weight
+                if tentative_g_score < g.get(neighbor, float('inf')):
+                    g[neighbor] = tentative_g_score
+                    parent[neighbor] = current
+                    if neighbor in closed:
+                        incons.add(neighbor)
+                    else:
+                        heapq.heappush(heap, (tentative_g_score + epsilon * estimate(neighbor),
+                                              tentative_g_score, neighbor))
+                        pushes += 1
+        if STATE.enabled:
+            count(settled=len(expanded), heap_pushes=pushes, heap_pops=len(expanded),
+                  edges_relaxed=scanned_edges(adjacency, expanded))
+        return finished
 
-    pass
\ No newline at end of file
+    def _finish_iteration(self):
+        """Prove the bound, lower epsilon and requeue the open and inconsistent nodes."""
+        g, estimate = self.g, self._estimate
+        pending = {u for _, g_u, u in self._open if u not in self._closed and g_u == g[u]} | self._incons
+        self.iterations += 1
+        if self.target not in g:
+            self.done = True        # the open set ran empty: unreachable
+            return
+        if pending:
+            self._lower_bound = max(self._lower_bound, min(g[u] + estimate(u) for u in pending))
+        if not pending or self.epsilon <= 1.0 or self._lower_bound >= self.cost:
+            self.done = True
+            return
+        self.epsilon = max(1.0, min(self.epsilon - self.decrement, self.bound))
+        self._open = [(g[u] + self.epsilon * estimate(u), g[u], u) for u in pending]
+        heapq.heapify(self._open)
+        self._closed = set()
+        self._incons = set()
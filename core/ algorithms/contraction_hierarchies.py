@@ -0,0 +1,249 @@
+# core/algorithms/contraction_hierarchies.py
+import heapq
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from .instrumentation import STATE, count, instrumented, scanned_edges
+
+FORMAT_VERSION = 1
+
+
+class ContractionHierarchy:
+    """Contraction Hierarchies index for fast point-to-point queries on one metric.
+
+    Build once with :meth:`build` (slow, done offline), store with
+    :meth:`save` / :meth:`load`, then answer queries with :meth:`query`,
+    which returns the same ``(path, length)`` tuple as
+    ``get_shortest_path_dijkstra``.
+
+    The index keeps only the "upward" graph: for every node the arcs to
+    higher-ranked neighbours, including shortcuts.  ``up_middle`` holds the
+    contracted node a shortcut bypasses (-1 for original roads).
+    """
+
+    def __init__(self, weight_type, node_ids, rank, up_offsets, up_targets, up_weights, up_middle):
+        self.weight_type = weight_type
+        self.node_ids = list(node_ids)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.rank = np.asarray(rank, dtype=np.int64)
+        self.up_offsets = np.asarray(up_offsets, dtype=np.int64)
+        self.up_targets = np.asarray(up_targets, dtype=np.int64)
+        self.up_weights = np.asarray(up_weights, dtype=np.float64)
+        self.up_middle = np.asarray(up_middle, dtype=np.int64)
+        self._prepare()
+
+    def _prepare(self):
+        offsets = self.up_offsets.tolist()
+        targets = self.up_targets.tolist()
+        weights = self.up_weights.tolist()
+        middles = self.up_middle.tolist()
+        self._up = [list(zip(targets[offsets[i]:offsets[i + 1]], weights[offsets[i]:offsets[i + 1]]))
+                    for i in range(len(self.node_ids))]
+        # (lower, higher) -> middle node, used to unpack shortcuts
+        self._middle = {}
+        for u in range(len(self.node_ids)):
+            for k in range(offsets[u], offsets[u + 1]):
+                self._middle[(u, targets[k])] = middles[k]
+
+    @classmethod
+    @instrumented("contraction_hierarchies.build")
+    def build(cls, graph, weight_type='distance', witness_limit=500):
+        """Contract every node of ``graph`` (networkx graph or CSRGraph).
+
+        ``witness_limit`` bounds the number of nodes settled by each witness
+        search; a lower limit builds faster but may add redundant shortcuts
+        (queries stay exact either way).
+        """
+        csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        n = csr.num_nodes
+        adj = [dict() for _ in range(n)]
+        for u, arcs in enumerate(csr.adjacency(weight_type)):
+            for v, w in arcs:
+                if v != u and w < adj[u].get(v, (float('inf'), -1))[0]:
+                    adj[u][v] = (w, -1)
+                    adj[v][u] = (w, -1)
+
+        contracted = [False] * n
+        deleted_neighbors = [0] * n
+        rank = [0] * n
+        up = [None] * n
+
+        def shortcuts_for(v):
+            """Return the shortcuts (u, x, weight) needed to contract v."""
+            neighbors = [(u, w) for u, (w, _) in adj[v].items()]
+            shortcuts = []
+            for i, (u, wu) in enumerate(neighbors):
+                others = {x: wu + wx for x, wx in neighbors[i + 1:]}
+                if not others:
+                    continue
+                witness = _witness_search(adj, u, v, others, max(others.values()), witness_limit)
+                for x, through_v in others.items():
+                    if witness.get(x, float('inf')) > through_v:
+                        shortcuts.append((u, x, through_v))
+            return shortcuts
+
+        def priority(v):
+            return len(shortcuts_for(v)) - len(adj[v]) + deleted_neighbors[v]
+
+        queue = [(priority(v), v) for v in range(n)]
+        heapq.heapify(queue)
+        order = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            if contracted[v]:
+                continue
+            # Lazy update: re-check the priority before contracting
+            current = priority(v)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, v))
+                continue
+
+            for u, x, w in shortcuts_for(v):
+                if w < adj[u].get(x, (float('inf'), -1))[0]:
+                    adj[u][x] = (w, v)
+                    adj[x][u] = (w, v)
+            up[v] = [(u, w, middle) for u, (w, middle) in adj[v].items()]
+            for u in adj[v]:
+                del adj[u][v]
+                deleted_neighbors[u] += 1
+            adj[v] = {}
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+
+        up_offsets = np.zeros(n + 1, dtype=np.int64)
+        up_offsets[1:] = np.cumsum([len(arcs) for arcs in up])
+        flat = [arc for arcs in up for arc in arcs]
+        return cls(weight_type, csr.node_ids, rank, up_offsets,
+                   [u for u, _, _ in flat], [w for _, w, _ in flat], [m for _, _, m in flat])
+
+    @property
+    def num_shortcuts(self):
+        return int((self.up_middle >= 0).sum())
+
+    def save(self, filepath):
+        """Write the index to ``filepath`` (NumPy .npz)."""
+        np.savez(filepath,
+                 format_version=FORMAT_VERSION,
+                 weight_type=self.weight_type,
+                 node_ids=np.array(self.node_ids, dtype=str),
+                 rank=self.rank,
+                 up_offsets=self.up_offsets,
+                 up_targets=self.up_targets,
+                 up_weights=self.up_weights,
+                 up_middle=self.up_middle)
+
+    @classmethod
+    def load(cls, filepath):
+        """Load an index written by :meth:`save`."""
+        with np.load(filepath) as data:
+            if int(data["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported contraction hierarchy format in {filepath}")
+            return cls(str(data["weight_type"]), data["node_ids"].tolist(), data["rank"],
+                       data["up_offsets"], data["up_targets"], data["up_weights"], data["up_middle"])
+
+    @instrumented("contraction_hierarchies.query")
+    def query(self, source, target):
+        """Return ``(path, length)`` between two node ids, ``(None, inf)`` if unreachable."""
+        s = self.index.get(str(source))
+        t = self.index.get(str(target))
+        if s is None or t is None:
+            return None, float('inf')
+        if s == t:
+            return [self.node_ids[s]], 0.0
+
+        dist = ({s: 0.0}, {t: 0.0})
+        parent = ({s: None}, {t: None})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        settled = (set(), set())
+        best = float('inf')
+        meeting = None
+        side = 0
+        pushes = 0
+        while heaps[0] or heaps[1]:
+            # Alternate directions; a side is finished once its minimum exceeds the best path
+            if not heaps[side] or heaps[side][0][0] >= best:
+                if not heaps[1 - side] or heaps[1 - side][0][0] >= best:
+                    break
+                side = 1 - side
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                side = 1 - side
+                continue
+            settled[side].add(u)
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best = d + other
+                meeting = u
+            for v, w in self._up[u]:
+                nd = d + w
+                if nd < dist[side].get(v, float('inf')):
+                    dist[side][v] = nd
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (nd, v))
+                    pushes += 1
+            side = 1 - side
+
+        if STATE.enabled:
+            count(settled=len(settled[0]) + len(settled[1]), heap_pushes=pushes + 2,
+                  heap_pops=pushes + 2 - len(heaps[0]) - len(heaps[1]),
+                  edges_relaxed=scanned_edges(self._up, settled[0] | settled[1]))
+        if meeting is None:
+            return None, float('inf')
+        forward = _chain(parent[0], meeting)[::-1]
+        backward = _chain(parent[1], meeting)
+        nodes = [forward[0]]
+        for a, b in zip(forward[:-1] + backward[:-1], forward[1:] + backward[1:]):
+            self._unpack(a, b, nodes)
+        return [self.node_ids[i] for i in nodes], best
+
+    def _unpack(self, a, b, out):
+        """Append the original-road expansion of arc a->b (excluding a) to ``out``."""
+        stack = [(a, b)]
+        while stack:
+            u, v = stack.pop()
+            key = (u, v) if self.rank[u] < self.rank[v] else (v, u)
+            middle = self._middle[key]
+            if middle < 0:
+                out.append(v)
+            else:
+                stack.append((middle, v))
+                stack.append((u, middle))
+
+
+def build_contraction_hierarchies(graph, weight_types=('distance', 'travel_time'), witness_limit=500):
+    """Build one ContractionHierarchy per metric, returned as ``{weight_type: hierarchy}``."""
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    return {weight_type: ContractionHierarchy.build(csr, weight_type, witness_limit)
+            for weight_type in weight_types}
+
+
+def _witness_search(adj, source, excluded, targets, max_distance, limit):
+    """Local Dijkstra from ``source`` that ignores ``excluded``; returns reached distances."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    remaining = set(targets)
+    settled = 0
+    while heap and remaining and settled < limit:
+        d, u = heapq.heappop(heap)
+        if d > dist.get(u, float('inf')):
+            continue
+        if d > max_distance:
+            break
+        remaining.discard(u)
+        settled += 1
+        for v, (w, _) in adj[u].items():
+            if v == excluded:
+                continue
+            nd = d + w
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def _chain(parent, node):
+    chain = []
+    while node is not None:
+        chain.append(node)
+        node = parent[node]
+    return chain
@@ -1,30 +1,138 @@
 # core/algorithm/dijkstra.py
+import heapq
 import networkx as nx
+from ..models.csr_graph import CSRGraph
+from ..models.spatial_index import locate
 
-cache = {}
+from .route_cache import graph_version, route_cache as cache
+from .instrumentation import STATE, count, instrumented, scanned_edges
+
+@instrumented("dijkstra")
 def get_shortest_path_dijkstra(graph, source, target, weight_type='distance'):
-    key = (source, target, weight_type)
-    if key in cache:
-        print("Using cached result.")
-        return cache[key]
+    """source/target: node ids or (lon, lat) pairs, which snap to the nearest node.
+
+    While a CairoMap graph is unchanged since a DistanceStore was attached
+    to it (``CairoMap.set_distance_store``), routes come from the store's
+    precomputed tables instead of a search.
+    """
+    source, target = locate(graph, source), locate(graph, target)
+    key = ('dijkstra', str(source), str(target), weight_type)
+    cached = cache.get(graph, key)
+    if cached is not None:
+        return cached
     if weight_type not in ['distance', 'travel_time']:
         print("Invalid weight_type! Use 'distance' or 'travel_time'.")
         return None, None
-    try:
-        path = nx.dijkstra_path(graph, source=str(source), target=str(target), weight=weight_type)
-        length = nx.dijkstra_path_length(graph, source=str(source), target=str(target), weight=weight_type)
-        print(f"Shortest path from {source} to {target} by {weight_type}:")
-        for n in path:
-            if "name" in graph.nodes[n]:
-                print(f"- {graph.nodes[n]['name']} ({n})")
-            else:
-                print(f"- {n}")
-        print(f"Total {weight_type}: {length}")
+    stored = _stored_path(graph, source, target, weight_type)
+    if stored is not None:
+        return stored
+    if isinstance(graph, CSRGraph):
+        path, length = _shortest_path_csr(graph, source, target, weight_type)
+        cache.put(graph, key, (path, length), path)
         return path, length
+    try:
+        # One search gives both the length and the path
+        length, path = nx.single_source_dijkstra(graph, source=str(source), target=str(target), weight=weight_type)
     except nx.NetworkXNoPath:
-        print(f"No path from {source} to {target}")
-        return None, float('inf')
-    
-    cache[key] = (path, length)
+        path, length = None, float('inf')
+
+    cache.put(graph, key, (path, length), path)
     return path, length
-    pass
\ No newline at end of file
+
+
+def dijkstra_csr(csr, source, weight_type='distance', target=None, adjacency=None):
+    """Single-source Dijkstra over a CSRGraph.
+
+    source/target are integer node indices. Stops as soon as ``target`` is
+    settled when one is given. Returns ``(dist, parent)`` dicts holding only
+    the nodes the search touched.
+    """
+    if adjacency is None:
+        adjacency = csr.adjacency(weight_type)
+    dist = {source: 0.0}
+    parent = {source: None}
+    settled = set()
+    heap = [(0.0, source)]
+    pushes = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        if u == target:
+            break
+        for v, w in adjacency[u]:
+            nd = d + w
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                parent[v] = u
+                heapq.heappush(heap, (nd, v))
+                pushes += 1
+    if STATE.enabled:
+        count(settled=len(settled), heap_pushes=pushes + 1, heap_pops=pushes + 1 - len(heap),
+              edges_relaxed=scanned_edges(adjacency, settled - {target}))
+    return dist, parent
+
+
+def single_source_arrays(adjacency, num_nodes, source):
+    """Full single-source Dijkstra returning dense ``(dist, pred)`` lists.
+
+    ``dist[v]`` is inf and ``pred[v]`` is -1 for unreachable nodes; used by
+    the batched matrix and all-pairs code where every node is needed.
+    """
+    inf = float('inf')
+    dist = [inf] * num_nodes
+    pred = [-1] * num_nodes
+    done = [False] * num_nodes
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    pushes = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if done[u]:
+            continue
+        done[u] = True
+        for v, w in adjacency[u]:
+            nd = d + w
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(heap, (nd, v))
+                pushes += 1
+    if STATE.enabled:
+        settled = [u for u in range(num_nodes) if done[u]]
+        count(settled=len(settled), heap_pushes=pushes + 1, heap_pops=pushes + 1,
+              edges_relaxed=scanned_edges(adjacency, settled))
+    return dist, pred
+
+
+def csr_path(csr, parent, target):
+    """Rebuild the node-id path ending at index ``target`` from a parent map."""
+    path = []
+    current = target
+    while current is not None:
+        path.append(csr.node_ids[current])
+        current = parent[current]
+    return path[::-1]
+
+
+def _stored_path(graph, source, target, weight_type):
+    """``(path, length)`` from the graph's attached DistanceStore, or None if it can't answer."""
+    attached = graph.graph.get("distance_store") if hasattr(graph, "graph") else None
+    if attached is None or attached[0] != graph_version(graph):
+        return None
+    store = attached[1]
+    if weight_type not in store.weight_types or str(source) not in store.index or str(target) not in store.index:
+        return None
+    return store.path(source, target, weight_type)
+
+
+def _shortest_path_csr(csr, source, target, weight_type):
+    s = csr.node_index(source)
+    t = csr.node_index(target)
+    if s is None or t is None:
+        return None, float('inf')
+    dist, parent = dijkstra_csr(csr, s, weight_type, target=t)
+    if t not in dist:
+        return None, float('inf')
+    return csr_path(csr, parent, t), dist[t]
@@ -0,0 +1,250 @@
+# core/algorithms/emergency_catchments.py
+import heapq
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from .instrumentation import STATE, count, instrumented, scanned_edges
+from .route_cache import graph_version
+
+PERIODS = ("morning", "afternoon", "evening", "night")
+
+
+class EmergencyCatchments:
+    """Nearest facility of every node, per time period, kept up to date with the road graph.
+
+    One multi-source Dijkstra per period from all facilities of
+    ``facility_type`` gives every node its nearest facility, the travel
+    time to it and a predecessor towards it. :meth:`route` is then a walk
+    along the predecessors (O(path length)) and :meth:`partition` the
+    network Voronoi cells. :meth:`refresh` repairs the trees from the
+    graph's change log (closed roads, traffic updates) instead of
+    recomputing them.
+
+        catchments = EmergencyCatchments(cairo_map.G, "Medical")
+        path, minutes = catchments.route("7", "evening")
+    """
+
+    def __init__(self, graph, facility_type="Medical", periods=PERIODS):
+        self.graph = graph
+        self.facility_type = facility_type
+        self.periods = tuple(periods)
+        self._build()
+
+    @instrumented("emergency_catchments.build")
+    def _build(self):
+        csr = CSRGraph.from_networkx(self.graph)
+        self.version = graph_version(self.graph)
+        self.node_ids = csr.node_ids
+        self.index = csr.index
+        self.facilities = [csr.index[str(node)] for node, data in self.graph.nodes(data=True)
+                           if data.get('node_type') == 'facility' and data.get('type') == self.facility_type]
+        self.catchments = {period: Catchment(csr.adjacency_from(_period_weights(csr, period)), self.facilities)
+                           for period in self.periods}
+
+    def nearest(self, node, period="morning"):
+        """``(facility_id, travel_time)`` of the facility closest to ``node`` (None, inf if none is reachable)."""
+        catchment = self.catchments[period]
+        i = self.index[str(node)]
+        root = catchment.root[i]
+        return (self.node_ids[root] if root >= 0 else None), catchment.dist[i]
+
+    def route(self, node, period="morning"):
+        """Fastest route from the nearest facility to ``node``: ``(path, travel_time)``, (None, inf) if unreachable."""
+        catchment = self.catchments[period]
+        i = self.index[str(node)]
+        if catchment.root[i] < 0:
+            return None, float('inf')
+        path = []
+        while i >= 0:
+            path.append(self.node_ids[i])
+            i = catchment.pred[i]
+        return path[::-1], catchment.dist[self.index[str(node)]]
+
+    def partition(self, period="morning"):
+        """Network Voronoi cells: ``{facility_id: [node ids closest to it]}``; unreachable nodes are left out."""
+        cells = {self.node_ids[f]: [] for f in self.facilities}
+        for i, root in enumerate(self.catchments[period].root):
+            if root >= 0:
+                cells[self.node_ids[root]].append(self.node_ids[i])
+        return cells
+
+    def refresh(self):
+        """Catch up with the changes made to the graph since the last build or refresh.
+
+        Changed roads are repaired in place; if the change log no longer
+        reaches back far enough, or nodes were added (bulk changes), every
+        period is rebuilt. Returns the number of roads repaired, or None
+        after a rebuild.
+        """
+        version = graph_version(self.graph)
+        if version == self.version:
+            return 0
+        newer = [change for change in self.graph.graph.get("changes", ()) if change[0] > self.version]
+        if not newer or newer[0][0] != self.version + 1 or any(u is None for _, u, _, _ in newer):
+            self._build()
+            return None
+        roads = list(dict.fromkeys(_road_key(u, v) for _, u, v, kind in newer if kind != "neutral"))
+        if any(str(node) not in self.index for road in roads for node in road):
+            self._build()
+            return None
+        self.update_roads(roads)
+        self.version = version
+        return len(roads)
+
+    def update_roads(self, roads):
+        """Re-read ``roads`` (pairs of node ids) from the graph and repair every period; missing roads count as closed."""
+        for period, catchment in self.catchments.items():
+            changes = []
+            for u, v in roads:
+                data = self.graph.get_edge_data(u, v)
+                weight = None if data is None else road_time(data, period)
+                changes.append((self.index[str(u)], self.index[str(v)], weight))
+            catchment.update(changes)
+
+
+class Catchment:
+    """Shortest-path forest of one period rooted at the facilities.
+
+    ``dist[i]``, ``root[i]`` (nearest facility's node index, -1 if
+    unreachable) and ``pred[i]`` (next node towards it, -1 at facilities)
+    for every node index, over a mutable ``[(neighbor, weight), ...]``
+    adjacency.
+    """
+
+    def __init__(self, adjacency, sources):
+        n = len(adjacency)
+        self.adjacency = adjacency
+        self.dist = [float('inf')] * n
+        self.pred = [-1] * n
+        self.root = [-1] * n
+        for s in sources:
+            self.dist[s] = 0.0
+            self.root[s] = s
+        self._propagate([(0.0, s) for s in sources])
+
+    @instrumented("emergency_catchments.repair")
+    def update(self, changes):
+        """Apply ``(i, j, weight)`` road changes (weight None = closed) and repair the forest.
+
+        Roads that got slower or closed invalidate the subtree hanging below
+        them, which is reset and re-entered from its intact neighbours;
+        roads that got faster or opened are relaxed from both ends. Only
+        nodes whose distance changes are searched again.
+        """
+        inf = float('inf')
+        dist, pred, root, adjacency = self.dist, self.pred, self.root, self.adjacency
+        cut = []
+        for i, j, weight in changes:
+            old = self._set_weight(i, j, weight)
+            if old is not None and (weight is None or weight > old):
+                if pred[j] == i:
+                    cut.append(j)
+                elif pred[i] == j:
+                    cut.append(i)
+
+        heap = []
+        affected = self._subtrees(cut) if cut else ()
+        for v in affected:
+            dist[v] = inf
+            pred[v] = -1
+            root[v] = -1
+        for v in affected:
+            for u, w in adjacency[v]:
+                if dist[u] + w < dist[v]:
+                    dist[v] = dist[u] + w
+                    pred[v] = u
+                    root[v] = root[u]
+            if dist[v] < inf:
+                heap.append((dist[v], v))
+        for i, j, weight in changes:
+            if weight is None:
+                continue
+            for a, b in ((i, j), (j, i)):
+                if dist[a] + weight < dist[b]:
+                    dist[b] = dist[a] + weight
+                    pred[b] = a
+                    root[b] = root[a]
+                    heap.append((dist[b], b))
+        heapq.heapify(heap)
+        self._propagate(heap)
+
+    def _propagate(self, heap):
+        dist, pred, root, adjacency = self.dist, self.pred, self.root, self.adjacency
+        settled = []
+        pushes = len(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            settled.append(u)
+            for v, w in adjacency[u]:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    root[v] = root[u]
+                    heapq.heappush(heap, (nd, v))
+                    pushes += 1
+        if STATE.enabled:
+            count(settled=len(settled), heap_pushes=pushes, heap_pops=pushes,
+                  edges_relaxed=scanned_edges(adjacency, settled))
+
+    def _set_weight(self, i, j, weight):
+        """Replace (or remove, weight None) road i-j in the adjacency; returns its old weight."""
+        old = None
+        for a, b in ((i, j), (j, i)):
+            kept = []
+            for v, w in self.adjacency[a]:
+                if v == b:
+                    old = w
+                else:
+                    kept.append((v, w))
+            if weight is not None:
+                kept.append((b, weight))
+            self.adjacency[a] = kept
+        return old
+
+    def _subtrees(self, tops):
+        """Nodes at or below ``tops`` in the predecessor forest."""
+        pred = np.fromiter(self.pred, dtype=np.int64, count=len(self.pred))
+        order = np.argsort(pred, kind="stable")
+        offsets = np.searchsorted(pred[order], np.arange(len(pred) + 1)).tolist()
+        order = order.tolist()
+        seen = set(tops)
+        stack = list(seen)
+        while stack:
+            u = stack.pop()
+            for v in order[offsets[u]:offsets[u + 1]]:
+                if v not in seen:
+                    seen.add(v)
+                    stack.append(v)
+        return seen
+
+
+def road_time(data, period):
+    """Travel time of a road in ``period``: distance x (1 + traffic / capacity), as CairoMap computes travel_time.
+
+    Roads without that period's traffic or a capacity fall back to ``travel_time``.
+    """
+    traffic = data.get(f"{period}_traffic")
+    capacity = data.get('capacity')
+    if traffic is None or not capacity:
+        return data.get('travel_time', data.get('distance', 1))
+    return data['distance'] * (1 + traffic / capacity)
+
+
+def _period_weights(csr, period):
+    traffic = csr.weights.get(f"{period}_traffic")
+    capacity = csr.weights.get('capacity')
+    distance = csr.weights.get('distance', np.ones(csr.num_edges))
+    fallback = csr.weights.get('travel_time', distance)
+    fallback = np.where(np.isnan(fallback), np.nan_to_num(distance, nan=1.0), fallback)
+    if traffic is None or capacity is None:
+        return fallback
+    valid = ~np.isnan(traffic) & (np.nan_to_num(capacity) > 0)
+    timed = distance * (1 + np.nan_to_num(traffic) / np.where(valid, capacity, 1.0))
+    return np.where(valid, timed, fallback)
+
+
+def _road_key(a, b):
+    a, b = str(a), str(b)
+    return (a, b) if a <= b else (b, a)
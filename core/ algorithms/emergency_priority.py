@@ -1,11 +1,18 @@
-from .traffic_signal_optimizer import optimize_traffic_signal
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from .traffic_signal_optimizer import approach_direction, optimize_traffic_signal, optimize_traffic_signals
+from .instrumentation import instrumented
 
+# Longest share (%) the emergency direction can get
+MAX_EMERGENCY_GREEN = 60
+
+@instrumented("emergency_signal")
 def adjust_signal_for_emergency(intersection_data, emergency_direction):
     """
     يزيد الوقت بشكل جشع للاتجاه اللي فيه سيارة إسعاف
     """
     optimized = optimize_traffic_signal(intersection_data)
-    emergency_time = min(60, optimized[emergency_direction] * 1.5)
+    emergency_time = min(MAX_EMERGENCY_GREEN, optimized[emergency_direction] * 1.5)
     remaining = 100 - emergency_time
     other_dirs = [d for d in intersection_data if d != emergency_direction]
     total_other = sum(intersection_data[d] for d in other_dirs)
@@ -14,4 +21,61 @@ def adjust_signal_for_emergency(intersection_data, emergency_direction):
     for d in other_dirs:
         portion = (intersection_data[d] / total_other) if total_other else 1/len(other_dirs)
         result[d] = round(portion * remaining, 2)
-    return result
\ No newline at end of file
+    return result
+
+
+@instrumented("emergency_signal.batch")
+def adjust_signals_for_emergency(counts, emergency_directions, min_green=0):
+    """Batch adjust_signal_for_emergency: one emergency direction index per row of ``counts``.
+
+    min_green: minimum share (%) of every other direction, a scalar or one
+    value per direction. Those directions get their minimum plus their
+    share of what the emergency direction leaves; the emergency green is
+    cut if the minimums would not fit, down to 0 when they take the whole
+    cycle; minimums adding up to more than 100% are scaled down to 100. With min_green=0 each row is what
+    adjust_signal_for_emergency gives (up to rounding of the last decimal).
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    rows = np.arange(len(counts))
+    emergency_directions = np.asarray(emergency_directions, dtype=np.int64)
+    others = np.ones(counts.shape, dtype=bool)
+    others[rows, emergency_directions] = False
+
+    minimum = np.where(others, np.broadcast_to(np.asarray(min_green, dtype=np.float64), counts.shape), 0)
+    reserved = minimum.sum(axis=1)
+    # Minimums adding up to more than the whole cycle shrink to fit it
+    over = reserved > 100
+    minimum[over] *= (100 / reserved[over])[:, None]
+    reserved = np.minimum(reserved, 100)
+    optimized = optimize_traffic_signals(counts)[rows, emergency_directions]
+    emergency_time = np.minimum(MAX_EMERGENCY_GREEN, optimized * 1.5)
+    emergency_time = np.minimum(emergency_time, 100 - reserved)
+
+    other_counts = np.where(others, counts, 0)
+    total_other = other_counts.sum(axis=1, keepdims=True)
+    portion = np.divide(other_counts, total_other, out=others / max(counts.shape[1] - 1, 1),
+                        where=total_other != 0)
+    result = minimum + portion * (100 - emergency_time - reserved)[:, None]
+    result[rows, emergency_directions] = emergency_time
+    return np.round(result, 2)
+
+
+@instrumented("emergency_signal.route")
+def preempt_route(graph, counts, route, min_green=0):
+    """Green splits (%) for every intersection with emergency preemption along ``route``.
+
+    graph: the CSRGraph (or networkx graph) ``counts`` was built from, see
+    approach_counts; route: node ids in driving order. Each intersection
+    after the first gets the vehicle's approach, the direction of the
+    previous node, as its emergency direction; all others keep their
+    normal plan. Returns ``(splits, rows)`` with ``rows`` the preempted
+    intersections.
+    """
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    indices = np.array([csr.index[str(node)] for node in route], dtype=np.int64)
+    rows, previous = indices[1:], indices[:-1]
+    splits = optimize_traffic_signals(counts)
+    if len(rows):
+        directions = approach_direction(csr.pos[rows], csr.pos[previous])
+        splits[rows] = adjust_signals_for_emergency(np.asarray(counts)[rows], directions, min_green)
+    return splits, rows
\ No newline at end of file
@@ -1,7 +1,14 @@
 # core/algorithm/greedy.py
 import networkx as nx
+from ..models.csr_graph import CSRGraph
+from ..models.spatial_index import locate
+from .instrumentation import STATE, count, instrumented
 
+@instrumented("greedy")
 def greedy_search(graph, source, target, weight_type='distance'):
+    source, target = locate(graph, source), locate(graph, target)
+    if isinstance(graph, CSRGraph):
+        return _greedy_csr(graph, source, target, weight_type)
     source = str(source)
     target = str(target)
     path = [source]
@@ -10,8 +17,7 @@ def greedy_search(graph, source, target, weight_type='distance'):
     while current != target:
         neighbors = [n for n in graph.neighbors(current) if n not in visited]
         if not neighbors:
-            print("No Avaliable Path")
-            return None
+            return _counted(None, visited)
         min_cost = float('inf')
         next_node = None
         for neighbor in neighbors:
@@ -23,13 +29,35 @@ def greedy_search(graph, source, target, weight_type='distance'):
             except KeyError:
                 continue
         if next_node is None:
-            print("Path not found")
-            return None
+            return _counted(None, visited)
         path.append(next_node)
         visited.add(next_node)
         current = next_node
         if current == target:
-            print("Path founded")
-            return path
-    return path
-    pass
\ No newline at end of file
+            return _counted(path, visited)
+    return _counted(path, visited)
+
+
+def _greedy_csr(csr, source, target, weight_type):
+    current = csr.node_index(source)
+    goal = csr.node_index(target)
+    if current is None or goal is None:
+        return None
+    adjacency = csr.adjacency(weight_type)
+    path = [current]
+    visited = {current}
+    while current != goal:
+        candidates = [(w, v) for v, w in adjacency[current] if v not in visited]
+        if not candidates:
+            return _counted(None, visited)
+        min_cost, next_node = min(candidates)
+        path.append(next_node)
+        visited.add(next_node)
+        current = next_node
+    return _counted(csr.path_ids(path), visited)
+
+
+def _counted(result, visited):
+    if STATE.enabled:
+        count(settled=len(visited))
+    return result
@@ -0,0 +1,260 @@
+# core/algorithms/instrumentation.py
+"""Opt-in per-call metrics for the algorithms in this package.
+
+Disabled by default: an instrumented entry point then costs one attribute
+check, and the search loops keep their counters in local variables that
+are only reported when recording is on.
+
+    from core.algorithms import instrumentation
+    with instrumentation.profile() as run:
+        get_shortest_path_dijkstra(csr, "1", "F1")
+    run.stats()["dijkstra"]["settled_mean"]
+"""
+import bisect
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+COUNTERS = ("settled", "heap_pushes", "heap_pops", "edges_relaxed", "cache_hits", "cache_misses")
+
+# Histogram bucket upper bounds: 1-2.5-5 steps for seconds, powers of 4 for counters
+TIME_BUCKETS = tuple(float(f"{m}e{e}") for e in range(-6, 3) for m in (1, 2.5, 5))
+COUNT_BUCKETS = tuple(4**e for e in range(13))
+HISTOGRAM_METRICS = ("wall_time", "settled", "heap_pushes", "edges_relaxed")
+
+# How many individual calls ``recent_calls`` keeps
+RECENT_CALLS = 1000
+
+
+class _State:
+    enabled = False
+
+
+STATE = _State()
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` counts values <= ``buckets[i]``, the last slot is overflow."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def to_dict(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.total, "count": self.count}
+
+
+class Recorder:
+    """Aggregated metrics per algorithm name, plus a window of recent calls."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._totals = {}
+        self._histograms = {}
+        self.recent_calls = deque(maxlen=RECENT_CALLS)
+
+    def add(self, call):
+        totals = self._totals.setdefault(call["algorithm"], dict.fromkeys(("calls", "wall_time") + COUNTERS, 0))
+        totals["calls"] += 1
+        totals["wall_time"] += call["wall_time"]
+        for counter in COUNTERS:
+            totals[counter] += call[counter]
+        histograms = self._histograms.get(call["algorithm"])
+        if histograms is None:
+            histograms = self._histograms[call["algorithm"]] = {
+                metric: Histogram(TIME_BUCKETS if metric == "wall_time" else COUNT_BUCKETS)
+                for metric in HISTOGRAM_METRICS}
+        for metric, histogram in histograms.items():
+            histogram.add(call[metric])
+        self.recent_calls.append(call)
+
+    def stats(self, algorithm=None):
+        """Totals and per-call means per algorithm (or for one ``algorithm``)."""
+        result = {}
+        for name, totals in self._totals.items():
+            row = dict(totals)
+            calls = totals["calls"]
+            for metric in ("wall_time",) + COUNTERS:
+                row[f"{metric}_mean"] = totals[metric] / calls
+            result[name] = row
+        return result.get(algorithm, {}) if algorithm is not None else result
+
+    def histograms(self):
+        """``{algorithm: {metric: Histogram.to_dict()}}`` for every recorded algorithm."""
+        return {name: {metric: histogram.to_dict() for metric, histogram in metrics.items()}
+                for name, metrics in self._histograms.items()}
+
+
+_recorder = Recorder()
+
+
+def enable():
+    STATE.enabled = True
+
+
+def disable():
+    STATE.enabled = False
+
+
+def is_enabled():
+    return STATE.enabled
+
+
+def reset():
+    """Forget everything recorded so far."""
+    with _lock:
+        _recorder.reset()
+
+
+def stats(algorithm=None):
+    """Aggregated metrics since the last :func:`reset` (see :meth:`Recorder.stats`)."""
+    with _lock:
+        return _recorder.stats(algorithm)
+
+
+def recent_calls():
+    """The most recent per-call records, oldest first."""
+    with _lock:
+        return list(_recorder.recent_calls)
+
+
+def histograms():
+    with _lock:
+        return _recorder.histograms()
+
+
+@contextmanager
+def profile():
+    """Record metrics for the calls made inside the block.
+
+    Yields a :class:`Recorder` that sees only those calls; the global
+    recorder keeps collecting as well. Recording is switched back off
+    afterwards unless it was already on.
+    """
+    local = Recorder()
+    profiles = _active_profiles()
+    profiles.append(local)
+    was_enabled = STATE.enabled
+    STATE.enabled = True
+    try:
+        yield local
+    finally:
+        STATE.enabled = was_enabled
+        profiles.remove(local)
+
+
+def instrumented(name):
+    """Decorator recording wall time and search counters for every call of an entry point."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not STATE.enabled:
+                return fn(*args, **kwargs)
+            return _record_call(name, fn, args, kwargs)
+        return wrapper
+    return decorate
+
+
+def count(**counters):
+    """Add search counters (see COUNTERS) to the innermost instrumented call in progress.
+
+    Callers check ``STATE.enabled`` first so nothing is built when recording is off.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack:
+        call = stack[-1]
+        for counter, value in counters.items():
+            call[counter] += value
+
+
+def scanned_edges(adjacency, nodes):
+    """Edges looked at when expanding ``nodes`` -- computed afterwards, only while recording.
+
+    ``adjacency[u]`` is a list, or ``adjacency.degree(u)`` gives its length.
+    """
+    degree = getattr(adjacency, "degree", None)
+    if degree is not None:
+        return sum(degree(u) for u in nodes)
+    return sum(len(adjacency[u]) for u in nodes)
+
+
+def _active_profiles():
+    profiles = getattr(_local, "profiles", None)
+    if profiles is None:
+        profiles = _local.profiles = []
+    return profiles
+
+
+def _record_call(name, fn, args, kwargs):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    call = dict.fromkeys(COUNTERS, 0)
+    call["algorithm"] = name
+    stack.append(call)
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        call["wall_time"] = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            # A nested entry point (e.g. each departure of get_best_departure) also counts for its caller
+            for counter in COUNTERS:
+                stack[-1][counter] += call[counter]
+        with _lock:
+            _recorder.add(call)
+        for recorder in _active_profiles():
+            recorder.add(call)
+
+
+def export_histograms(filepath=None, fmt="json", recorder=None):
+    """Export the aggregated histograms as JSON or Prometheus text exposition format.
+
+    recorder: a :func:`profile` result; defaults to the global recorder.
+    Writes to ``filepath`` when given and returns the text either way.
+    """
+    if recorder is None:
+        data = histograms()
+    else:
+        data = recorder.histograms()
+    if fmt == "json":
+        text = json.dumps(data, indent=2)
+    elif fmt == "prometheus":
+        text = _prometheus(data)
+    else:
+        raise ValueError(f"Unknown histogram format: {fmt}")
+    if filepath is not None:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return text
+
+
+def _prometheus(data):
+    lines = []
+    for metric in HISTOGRAM_METRICS:
+        family = f"cairo_routing_{metric}" + ("_seconds" if metric == "wall_time" else "")
+        lines.append(f"# TYPE {family} histogram")
+        for algorithm, metrics in sorted(data.items()):
+            histogram = metrics[metric]
+            cumulative = 0
+            for bound, count in zip(histogram["buckets"] + ["+Inf"], histogram["counts"]):
+                cumulative += count
+                lines.append(f'{family}_bucket{{algorithm="{algorithm}",le="{bound}"}} {cumulative}')
+            lines.append(f'{family}_sum{{algorithm="{algorithm}"}} {histogram["sum"]}')
+            lines.append(f'{family}_count{{algorithm="{algorithm}"}} {histogram["count"]}')
+    return "\n".join(lines) + "\n"
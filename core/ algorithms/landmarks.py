@@ -0,0 +1,120 @@
+# core/algorithms/landmarks.py
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from .dijkstra import dijkstra_csr
+from .instrumentation import instrumented
+from .route_cache import graph_version
+
+
+class LandmarkIndex:
+    """Precomputed landmark distances for the ALT heuristic of A*.
+
+    ``distances[i, v]`` is the shortest ``weight_type`` distance from landmark
+    ``i`` to node ``v``.  Roads are undirected, so by the triangle inequality
+    ``|d(L, t) - d(L, v)|`` is a lower bound on ``d(v, t)`` for every landmark L.
+    """
+
+    def __init__(self, csr, weight_type, landmarks, distances):
+        self.csr = csr
+        self.weight_type = weight_type
+        self.landmarks = list(landmarks)
+        self.distances = np.asarray(distances, dtype=np.float64)
+        # Per-node rows as Python lists: much faster than NumPy for k ~ 8 values
+        self._rows = self.distances.T.tolist()
+
+    @classmethod
+    @instrumented("landmarks.build")
+    def build(cls, graph, weight_type='distance', num_landmarks=8, strategy='farthest',
+              facility_type=None, landmarks=None):
+        """Select landmarks and precompute their distance tables.
+
+        strategy:
+            'farthest'   -- farthest-point selection over the road graph
+            'facilities' -- facility nodes of the graph (optionally only
+                            ``facility_type``, e.g. 'Medical'); needs a networkx graph
+        ``landmarks`` may instead give the node ids to use explicitly.
+        The snapshot keeps ``graph``'s version, so A* can tell when the map
+        has changed since.
+        """
+        csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph, graph_version(graph))
+        if landmarks is not None:
+            chosen = [csr.node_index(node) for node in landmarks]
+            if None in chosen:
+                raise ValueError("Unknown landmark node id")
+            return cls(csr, weight_type, chosen, [_distance_row(csr, l, weight_type) for l in chosen])
+        if strategy == 'facilities':
+            if isinstance(graph, CSRGraph):
+                raise ValueError("The 'facilities' strategy needs the networkx graph (node attributes)")
+            ids = [node for node, data in graph.nodes(data=True)
+                   if data.get('node_type') == 'facility'
+                   and (facility_type is None or data.get('type') == facility_type)]
+            chosen = [csr.node_index(node) for node in ids[:num_landmarks]]
+            return cls(csr, weight_type, chosen, [_distance_row(csr, l, weight_type) for l in chosen])
+        if strategy != 'farthest':
+            raise ValueError(f"Unknown landmark strategy: {strategy}")
+
+        # Farthest-point selection: start from the node farthest from node 0,
+        # then repeatedly add the node farthest from all chosen landmarks.
+        if csr.num_nodes == 0:
+            return cls(csr, weight_type, [], np.zeros((0, 0)))
+        first = _distance_row(csr, 0, weight_type)
+        chosen = [int(np.argmax(np.where(np.isinf(first), -1, first)))]
+        rows = [_distance_row(csr, chosen[0], weight_type)]
+        nearest = rows[0].copy()
+        while len(chosen) < min(num_landmarks, csr.num_nodes):
+            # Unreached nodes (other components) are the best next candidates
+            candidate = np.where(np.isinf(nearest), np.finfo(np.float64).max, nearest)
+            candidate[chosen] = -1
+            nxt = int(np.argmax(candidate))
+            if candidate[nxt] <= 0:
+                break
+            chosen.append(nxt)
+            rows.append(_distance_row(csr, nxt, weight_type))
+            nearest = np.minimum(nearest, rows[-1])
+        return cls(csr, weight_type, chosen, rows)
+
+    @property
+    def landmark_ids(self):
+        return [self.csr.node_ids[l] for l in self.landmarks]
+
+    def potential(self, target):
+        """Return ``h(v)``, a lower bound on the distance from node index v to ``target``."""
+        target_row = [(k, d) for k, d in enumerate(self._rows[target]) if d != float('inf')]
+        rows = self._rows
+        inf = float('inf')
+
+        def heuristic(v):
+            row = rows[v]
+            best = 0.0
+            for k, dt in target_row:
+                dv = row[k]
+                if dv == inf:
+                    # The landmark reaches the target but not v: different components
+                    return inf
+                bound = dt - dv if dt > dv else dv - dt
+                if bound > best:
+                    best = bound
+            return best
+
+        return heuristic
+
+    def save(self, filepath):
+        """Write the landmark table to ``filepath`` (NumPy .npz)."""
+        np.savez(filepath, weight_type=self.weight_type, node_ids=np.array(self.csr.node_ids, dtype=str),
+                 landmarks=np.asarray(self.landmarks, dtype=np.int64), distances=self.distances)
+
+    @classmethod
+    def load(cls, filepath, graph):
+        """Load a table written by :meth:`save` for ``graph`` (the same road network)."""
+        csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph, graph_version(graph))
+        with np.load(filepath) as data:
+            if data["node_ids"].tolist() != csr.node_ids:
+                raise ValueError(f"Landmark table {filepath} was built for a different graph")
+            return cls(csr, str(data["weight_type"]), data["landmarks"].tolist(), data["distances"])
+
+
+def _distance_row(csr, source, weight_type):
+    dist, _ = dijkstra_csr(csr, source, weight_type)
+    row = np.full(csr.num_nodes, np.inf)
+    row[list(dist)] = list(dist.values())
+    return row
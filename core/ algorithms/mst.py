@@ -1,62 +1,218 @@
 # core/algorithm/mst.py
+import logging
+from collections import deque
 import networkx as nx
-import math
+import numpy as np
+from .instrumentation import instrumented
 
+logger = logging.getLogger(__name__)
+
+@instrumented("mst")
 def design_mst_network(graph, weight_criteria="distance", include_facilities=True):
+    nodes, index, edges, sources, targets, weights = edge_arrays(graph, weight_criteria)
+    tree, parent = kruskal(len(nodes), sources, targets, weights)
+
+    # Only node ids are copied; positions and names stay on ``graph``
     mst_graph = nx.Graph()
-    mst_graph.add_nodes_from(graph.nodes(data=True))
-    edges_with_weights = []
-
-    for u, v, data in graph.edges(data=True):
-        if weight_criteria == "distance":
-            weight = data['distance']
-        elif weight_criteria == "travel_time":
-            weight = data['travel_time']
-        elif weight_criteria == "congestion":
-            weight = data['avg_traffic'] / data['capacity']
-        else:
-            weight = data['distance']
-
-        pop_u = graph.nodes[u].get('population', 0)
-        pop_v = graph.nodes[v].get('population', 0)
-        avg_pop = (pop_u + pop_v) / 2
-        weight = weight / (math.log(avg_pop + 1))
-        edges_with_weights.append((u, v, weight))
-
-    parent = {node: node for node in graph.nodes()}
-
-    def find(u):
-        while parent[u] != u:
-            parent[u] = parent[parent[u]]
-            u = parent[u]
-        return u
-
-    def union(u, v):
-        u_root = find(u)
-        v_root = find(v)
+    mst_graph.add_nodes_from(nodes)
+    mst_graph.add_edges_from((edges[k][0], edges[k][1], edges[k][2]) for k in tree)
+
+    if include_facilities and nodes:
+        # ربط المرافق بأقرب نقطة في الشبكة إن لم تكن مرتبطة
+        # The MST spans every component of ``graph``, so a facility outside the
+        # first node's tree has no road to it at all
+        root = _find(parent, 0)
+        for node, data in graph.nodes(data=True):
+            if data.get('node_type') == 'facility' and _find(parent, index[node]) != root:
+                logger.warning("No path to reach %s", node)
+    return mst_graph
+
+
+def edge_arrays(graph, weight_criteria="distance"):
+    """Nodes, node index, edges and the edges' endpoint indices and MST weights as arrays.
+
+    The weight is the criterion divided by log(avg population + 1); roads
+    whose ends have no population (facility to facility) keep their
+    unscaled weight instead of dividing by log(1) = 0.
+    """
+    nodes = list(graph.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = list(graph.edges(data=True))
+    if weight_criteria == "travel_time":
+        weight = np.fromiter((data['travel_time'] for _, _, data in edges), dtype=np.float64, count=len(edges))
+    elif weight_criteria == "congestion":
+        weight = (np.fromiter((data['avg_traffic'] for _, _, data in edges), dtype=np.float64, count=len(edges))
+                  / np.fromiter((data['capacity'] for _, _, data in edges), dtype=np.float64, count=len(edges)))
+    else:
+        weight = np.fromiter((data['distance'] for _, _, data in edges), dtype=np.float64, count=len(edges))
+
+    population = np.fromiter((data.get('population', 0) for _, data in graph.nodes(data=True)),
+                             dtype=np.float64, count=len(nodes))
+    sources = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+    targets = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+    scale = np.log1p((population[sources] + population[targets]) / 2)
+    scale[scale == 0] = 1
+    return nodes, index, edges, sources, targets, weight / scale
+
+
+def kruskal(num_nodes, sources, targets, weights):
+    """Kruskal over edge arrays: indices of the spanning-forest edges and the union-find parents.
+
+    Edges are sorted once with a stable argsort, so equal weights keep their
+    input order; the scan stops as soon as num_nodes - 1 edges are taken.
+    """
+    parent = list(range(num_nodes))
+    tree = []
+    sources = sources.tolist()
+    targets = targets.tolist()
+    for k in np.argsort(weights, kind="stable").tolist():
+        u_root = _find(parent, sources[k])
+        v_root = _find(parent, targets[k])
         if u_root != v_root:
             parent[v_root] = u_root
+            tree.append(k)
+            if len(tree) == num_nodes - 1:
+                break
+    return tree, parent
 
-    edges_with_weights.sort(key=lambda x: x[2])
-
-    for u, v, weight in edges_with_weights:
-        if find(u) != find(v):
-            mst_graph.add_edge(u, v, **graph.edges[u, v])
-            union(u, v)
-
-    if include_facilities:
-        facilities = [node for node, data in graph.nodes(data=True) if data.get('node_type') == 'facility']
-        for facility in facilities:
-            # ربط المرافق بأقرب نقطة في الشبكة إن لم تكن مرتبطة
-            if not nx.has_path(mst_graph, facility, list(mst_graph.nodes())[0]):
-                try:
-                    path = nx.shortest_path(graph, source=facility, target=list(mst_graph.nodes())[0], weight=weight_criteria)
-                    for i in range(len(path)-1):
-                        u=path[i]
-                        v=path[i+1]
-                        if not mst_graph.has_edge(u, v):
-                            mst_graph.add_edge(u, v, **graph.edges[u, v])
-                except nx.NetworkXNoPath:
-                    print(f"Warning: No path to reach {facility}")
-    return mst_graph
-    pass
\ No newline at end of file
+
+def _find(parent, u):
+    while parent[u] != u:
+        parent[u] = parent[parent[u]]
+        u = parent[u]
+    return u
+
+
+def _key(u, v):
+    return (u, v) if u <= v else (v, u)
+
+
+class IncrementalMST:
+    """MST of the existing roads that proposed roads can be switched on and off.
+
+    Built once over the roads whose ``road_type`` is not "proposed". Turning
+    a proposed road on adds it to the tree if it is lighter than the heaviest
+    edge on the tree path between its ends (that edge is dropped); turning it
+    off reconnects the two halves with the lightest available road across
+    them. Each toggle is O(V) instead of a full Kruskal run, and the tree is
+    always the MST of the existing roads plus the active proposed ones.
+    """
+
+    def __init__(self, graph, weight_criteria="distance"):
+        self.graph = graph
+        nodes, _, edges, sources, targets, weights = edge_arrays(graph, weight_criteria)
+        existing = np.flatnonzero([data.get('road_type') != 'proposed' for _, _, data in edges])
+        tree, _ = kruskal(len(nodes), sources[existing], targets[existing], weights[existing])
+        existing = existing.tolist()
+        weights = weights.tolist()
+
+        self.weights = {}           # (u, v) -> weight, for base tree edges and proposed roads
+        self.proposed = set()
+        self.active = set()
+        self.adjacency = {node: {} for node in nodes}
+        for k in tree:
+            u, v, _ = edges[existing[k]]
+            self._link(u, v, weights[existing[k]])
+        self.base = set(self.weights)
+        for k, (u, v, data) in enumerate(edges):
+            if data.get('road_type') == 'proposed':
+                self.weights[_key(u, v)] = weights[k]
+                self.proposed.add(_key(u, v))
+
+    def toggle(self, from_node, to_node, on=None):
+        """Switch a proposed road on (True), off (False) or over (None); returns its new state."""
+        key = _key(from_node, to_node)
+        if key not in self.proposed:
+            raise KeyError(f"Not a proposed road: {from_node}-{to_node}")
+        if on is None:
+            on = key not in self.active
+        if on and key not in self.active:
+            self.active.add(key)
+            self._insert(*key)
+        elif not on and key in self.active:
+            self.active.discard(key)
+            if key in self.adjacency[key[0]]:
+                self._delete(*key)
+        return on
+
+    def set_active(self, roads):
+        """Make exactly ``roads`` (pairs of node ids) the active proposed roads."""
+        wanted = {_key(u, v) for u, v in roads}
+        for key in sorted(self.active - wanted):
+            self.toggle(*key, on=False)
+        for key in sorted(wanted - self.active):
+            self.toggle(*key, on=True)
+
+    def edges(self):
+        """Tree edges as ``(u, v, weight)``."""
+        return [(u, v, weight) for u, neighbors in self.adjacency.items()
+                for v, weight in neighbors.items() if u <= v]
+
+    def total_weight(self):
+        return sum(weight for _, _, weight in self.edges())
+
+    def to_graph(self):
+        """The current tree as a networkx graph, like :func:`design_mst_network` returns."""
+        mst_graph = nx.Graph()
+        mst_graph.add_nodes_from(self.adjacency)
+        mst_graph.add_edges_from((u, v, self.graph.edges[u, v]) for u, v, _ in self.edges())
+        return mst_graph
+
+    def _link(self, u, v, weight):
+        self.adjacency[u][v] = weight
+        self.adjacency[v][u] = weight
+        self.weights[_key(u, v)] = weight
+
+    def _unlink(self, u, v):
+        del self.adjacency[u][v]
+        del self.adjacency[v][u]
+
+    def _insert(self, u, v):
+        weight = self.weights[_key(u, v)]
+        path = self._tree_path(u, v)
+        if path is None:
+            self._link(u, v, weight)
+            return
+        # أثقل طريق في الدورة
+        a, b = max(zip(path, path[1:]), key=lambda edge: self.adjacency[edge[0]][edge[1]])
+        if weight < self.adjacency[a][b]:
+            self._unlink(a, b)
+            self._link(u, v, weight)
+
+    def _delete(self, u, v):
+        self._unlink(u, v)
+        side = self._component(u)
+        best = None
+        for key in self.base | self.active:
+            a, b = key
+            if (a in side) != (b in side) and b not in self.adjacency[a]:
+                if best is None or self.weights[key] < self.weights[best]:
+                    best = key
+        if best is not None:
+            self._link(*best, self.weights[best])
+
+    def _tree_path(self, source, target):
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = [target]
+                while previous[path[-1]] is not None:
+                    path.append(previous[path[-1]])
+                return path
+            for neighbor in self.adjacency[node]:
+                if neighbor not in previous:
+                    previous[neighbor] = node
+                    queue.append(neighbor)
+        return None
+
+    def _component(self, source):
+        seen = {source}
+        stack = [source]
+        while stack:
+            for neighbor in self.adjacency[stack.pop()]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        return seen
\ No newline at end of file
@@ -1,5 +1,15 @@
 # core/algorithms/public_transit_scheduler.py
+import heapq
+import numpy as np
+from .instrumentation import instrumented
 
+# Timetable assumptions for transit_trips (hours of day, minutes)
+SERVICE_HOURS = (5.0, 24.0)
+BUS_MINUTES_PER_STOP = 6.0
+METRO_MINUTES_PER_STATION = 2.5
+METRO_HEADWAY_MINUTES = 5.0
+
+@instrumented("transit_scheduler")
 def schedule_transit(lines, max_buses):
     """
     جدولة خطوط الباص أو المترو لتقليل وقت الانتظار وزيادة التغطية.
@@ -14,35 +24,112 @@ def schedule_transit(lines, max_buses):
 
     max_buses: عدد الباصات المتاح.
 
+    Weighted interval scheduling in O(n log n): predecessors are binary
+    searched over the sorted end times. ``lines`` is left untouched.
+
     يرجع: الخطوط المختارة + مجموع الركاب
     """
+    lines = list(lines)
+    chosen, total = _weighted_interval_schedule(lines)
+    return [lines[i] for i in chosen], total
+
+
+def _weighted_interval_schedule(lines):
+    """Indices of the best compatible subset (ordered by end time) and its total demand."""
     n = len(lines)
-    lines.sort(key=lambda x: x["end_time"])
+    if n == 0:
+        return [], 0
+    starts = np.array([line["start_time"] for line in lines], dtype=np.float64)
+    ends = np.array([line["end_time"] for line in lines], dtype=np.float64)
+    order = np.argsort(ends, kind="stable")
+    sorted_ends = ends[order]
+    # prev[i]: آخر خط لا يتعارض مع الخط i (in end-time order), -1 if none
+    prev = np.searchsorted(sorted_ends, starts[order], side="right") - 1
+    prev = np.minimum(prev, np.arange(n) - 1).tolist()
+    order = order.tolist()
+    demand = [lines[i]["passenger_demand"] for i in order]
 
     # DP[i]: أقصى عدد ركاب ممكن ننقلهم باختيار من أول خط حتى الخط i
     dp = [0] * (n + 1)
-    prev = [-1] * n  # prev[i] = آخر خط لا يتعارض مع الخط i
-
-    for i in range(n):
-        for j in range(i-1, -1, -1):
-            if lines[j]["end_time"] <= lines[i]["start_time"]:
-                prev[i] = j
-                break
-
     for i in range(1, n + 1):
-        include = lines[i-1]["passenger_demand"]
-        if prev[i-1] != -1:
-            include += dp[prev[i-1] + 1]
+        include = demand[i-1] + dp[prev[i-1] + 1]
         dp[i] = max(dp[i-1], include)
 
     # استرجاع الخطوط المختارة
-    result = []
+    chosen = []
     i = n
     while i > 0:
         if dp[i] != dp[i-1]:
-            result.append(lines[i-1])
+            chosen.append(order[i-1])
             i = prev[i-1] + 1
         else:
             i -= 1
+    return chosen[::-1], dp[n]
+
+
+@instrumented("transit_scheduler.fleet")
+def schedule_fleet(lines, vehicles):
+    """Assign trips to ``vehicles`` parallel vehicles (greedy heuristic, O(n log n)).
+
+    Trips are taken in start order and a min-heap of availability times
+    gives the vehicle that frees up first. When every vehicle is busy the
+    trip replaces the lowest-demand trip still running, if that one carries
+    fewer passengers. Not guaranteed optimal for vehicles > 1; with a single
+    vehicle use :func:`schedule_transit`, which is exact.
+
+    يرجع: قائمة (رقم الباص، الخط) بترتيب البداية + مجموع الركاب
+    """
+    lines = list(lines)
+    order = sorted(range(len(lines)), key=lambda i: (lines[i]["start_time"], lines[i]["end_time"]))
+    free_at = [float('-inf')] * vehicles
+    free = [(free_at[vehicle], vehicle) for vehicle in range(vehicles)]
+    running = []   # (demand, trip, vehicle); entries go stale when a trip is replaced
+    assigned = {}
+    for i in order:
+        line = lines[i]
+        start = line["start_time"]
+        while free and free[0][0] != free_at[free[0][1]]:
+            heapq.heappop(free)
+        if free and free[0][0] <= start:
+            _, vehicle = heapq.heappop(free)
+        else:
+            while running and (assigned.get(running[0][1]) != running[0][2]
+                               or lines[running[0][1]]["end_time"] <= start):
+                heapq.heappop(running)
+            if not running or running[0][0] >= line["passenger_demand"]:
+                continue
+            _, replaced, vehicle = heapq.heappop(running)
+            del assigned[replaced]
+        assigned[i] = vehicle
+        free_at[vehicle] = line["end_time"]
+        heapq.heappush(free, (line["end_time"], vehicle))
+        heapq.heappush(running, (line["passenger_demand"], i, vehicle))
+
+    assignments = [(assigned[i], lines[i]) for i in order if i in assigned]
+    return assignments, sum(line["passenger_demand"] for _, line in assignments)
+
+
+def transit_trips(bus_routes, metro_lines, service_hours=SERVICE_HOURS):
+    """Yield a full day of individual trips for every bus route and metro line.
+
+    Times are hours of the day. A bus route's headway is its round trip
+    divided by ``buses_assigned``; metro lines run every METRO_HEADWAY_MINUTES.
+    Each trip carries an equal share of the line's ``daily_passengers``.
+    """
+    for route in bus_routes:
+        ride = max(len(route["stops"]) - 1, 1) * BUS_MINUTES_PER_STOP
+        headway = 2 * ride / max(route.get("buses_assigned", 1), 1)
+        yield from _line_trips(route["route_id"], ride, headway, route["daily_passengers"], service_hours)
+    for line in metro_lines:
+        ride = max(len(line["stations"]) - 1, 1) * METRO_MINUTES_PER_STATION
+        yield from _line_trips(line["line_id"], ride, METRO_HEADWAY_MINUTES, line["daily_passengers"], service_hours)
+
 
-    return result[::-1], dp[n]
+def _line_trips(line_id, ride_minutes, headway_minutes, daily_passengers, service_hours):
+    first, last = service_hours
+    departures = max(int((last - first) * 60 // headway_minutes), 1)
+    demand = daily_passengers // departures
+    for k in range(departures):
+        start = first + k * headway_minutes / 60
+        yield {"line_id": f"{line_id}-{k}", "start_time": start,
+               "end_time": start + ride_minutes / 60, "passenger_demand": demand}
@@ -0,0 +1,165 @@
+# core/algorithms/road_impact.py
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from .instrumentation import instrumented
+from .travel_matrix import compute_travel_matrix
+
+# Below this many candidates a process pool costs more than it saves
+MIN_PARALLEL_CANDIDATES = 8
+# Default largest set tried by best_combinations; the search grows as C**max_roads
+MAX_COMBINATION_ROADS = 3
+
+
+class RoadImpactEvaluator:
+    """Passenger-weighted travel-time savings of proposed roads over the demand pairs.
+
+    ``matrix`` holds the base network's shortest distances (existing roads
+    only) between the *terminals*: every demand origin and destination and
+    every proposed road's endpoints. Adding a road (u, v, w) changes a
+    distance only through u or v,
+
+        d'(a, b) = min(d(a, b), d(a, u) + w + d(v, b), d(a, v) + w + d(u, b)),
+
+    and every term is again between terminals, so a road is scored with one
+    O(T^2) matrix update (:func:`insert_edge`) instead of re-running a
+    search for every demand pair. Repeated insertions stay exact, which is
+    how combinations of roads are scored.
+    """
+
+    def __init__(self, terminals, matrix, candidates, demand, weight_type):
+        self.terminals = list(terminals)
+        self.index = {node: i for i, node in enumerate(self.terminals)}
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.candidates = list(candidates)
+        self.weight_type = weight_type
+        self.rows = np.array([self.index[a] for a, _, _ in demand], dtype=np.int64)
+        self.cols = np.array([self.index[b] for _, b, _ in demand], dtype=np.int64)
+        self.passengers = np.array([p for _, _, p in demand], dtype=np.float64)
+
+    @classmethod
+    @instrumented("road_impact.build")
+    def build(cls, cairo_map, weight_type='travel_time', processes=None):
+        """Distance matrix between the terminals of ``cairo_map``'s demand pairs and proposed roads.
+
+        Candidates are the graph's "proposed" roads, each a dict with
+        ``from``, ``to``, ``weight`` (its ``weight_type``) and ``cost``.
+        """
+        graph = cairo_map.G
+        base = nx.subgraph_view(graph, filter_edge=lambda u, v: graph.edges[u, v].get('road_type') != 'proposed')
+        candidates = [{"from": str(u), "to": str(v), "weight": data[weight_type], "cost": data.get('cost', 0)}
+                      for u, v, data in graph.edges(data=True) if data.get('road_type') == 'proposed']
+        demand = [(str(d["from_id"]), str(d["to_id"]), d["daily_passengers"])
+                  for d in cairo_map.public_transport_demand]
+        terminals = list(dict.fromkeys([node for a, b, _ in demand for node in (a, b)]
+                                       + [node for c in candidates for node in (c["from"], c["to"])]))
+        matrix = compute_travel_matrix(CSRGraph.from_networkx(base), terminals, terminals, weight_type, processes)
+        return cls(terminals, matrix, candidates, demand, weight_type)
+
+    def insert(self, matrix, candidate):
+        """``matrix`` with the candidate road added (a new array)."""
+        return insert_edge(matrix, self.index[candidate["from"]], self.index[candidate["to"]], candidate["weight"])
+
+    def score(self, matrix):
+        """``(savings, connected)`` of ``matrix`` against the base network.
+
+        savings: sum of passengers x time saved over pairs already connected;
+        connected: passengers of pairs that had no route before.
+        """
+        return _score(self.matrix, matrix, self.rows, self.cols, self.passengers)
+
+    @instrumented("road_impact")
+    def score_candidates(self, processes=None):
+        """Score every proposed road on its own, best first.
+
+        Returns dicts with ``from``, ``to``, ``cost``, ``savings`` and ``connected``.
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        roads = [(self.index[c["from"]], self.index[c["to"]], c["weight"]) for c in self.candidates]
+        if processes <= 1 or len(roads) < MIN_PARALLEL_CANDIDATES:
+            scores = [_score(self.matrix, insert_edge(self.matrix, *road), self.rows, self.cols, self.passengers)
+                      for road in roads]
+        else:
+            # Workers get the matrix and the demand pairs once (initializer)
+            chunksize = max(1, len(roads) // (processes * 4))
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                     initargs=(self.matrix, self.rows, self.cols, self.passengers)) as pool:
+                scores = list(pool.map(_score_one, roads, chunksize=chunksize))
+        results = [dict(candidate, savings=savings, connected=connected)
+                   for candidate, (savings, connected) in zip(self.candidates, scores)]
+        return sorted(results, key=lambda r: (-r["connected"], -r["savings"], r["cost"]))
+
+    @instrumented("road_impact.combinations")
+    def best_combinations(self, budget, top=10, max_roads=MAX_COMBINATION_ROADS):
+        """The ``top`` sets of proposed roads whose total ``cost`` fits ``budget``.
+
+        Sets are enumerated depth first, so each one costs a single
+        :func:`insert_edge` on top of its parent set's matrix; ``max_roads``
+        limits the set size. With C candidates that is up to
+        O(C**max_roads) sets of O(T^2) each: fine for the default of 3,
+        while ``max_roads=None`` tries every affordable subset, which is
+        exponential in C and only usable for a handful of candidates.
+        Returns dicts with ``roads`` (candidate dicts), ``cost``,
+        ``savings`` and ``connected``, best first.
+        """
+        order = sorted(range(len(self.candidates)), key=lambda k: self.candidates[k]["cost"])
+        best = []
+        chosen = []
+        counter = 0
+
+        def visit(start, matrix, cost):
+            nonlocal counter
+            for position in range(start, len(order)):
+                candidate = self.candidates[order[position]]
+                if cost + candidate["cost"] > budget:
+                    break   # الباقي أغلى
+                updated = self.insert(matrix, candidate)
+                chosen.append(candidate)
+                savings, connected = self.score(updated)
+                counter += 1
+                entry = ((connected, savings, -(cost + candidate["cost"])), counter, list(chosen))
+                if len(best) < top:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heappushpop(best, entry)
+                if max_roads is None or len(chosen) < max_roads:
+                    visit(position + 1, updated, cost + candidate["cost"])
+                chosen.pop()
+
+        visit(0, self.matrix, 0)
+        return [{"roads": roads, "cost": -rank[2], "savings": rank[1], "connected": rank[0]}
+                for rank, _, roads in sorted(best, reverse=True)]
+
+
+def insert_edge(matrix, i, j, weight):
+    """All-pairs distances after adding an undirected edge i-j of ``weight``, in O(n^2)."""
+    via_ij = matrix[:, i, None] + weight + matrix[None, j, :]
+    via_ji = matrix[:, j, None] + weight + matrix[None, i, :]
+    return np.minimum(matrix, np.minimum(via_ij, via_ji, out=via_ij), out=via_ij)
+
+
+def _score(base, matrix, rows, cols, passengers):
+    before = base[rows, cols]
+    after = matrix[rows, cols]
+    reachable = np.isfinite(before)
+    savings = float(np.dot(passengers[reachable], before[reachable] - after[reachable]))
+    connected = float(passengers[~reachable & np.isfinite(after)].sum())
+    return savings, connected
+
+
+_worker_state = None
+
+
+def _init_worker(matrix, rows, cols, passengers):
+    global _worker_state
+    _worker_state = (matrix, rows, cols, passengers)
+
+
+def _score_one(road):
+    matrix, rows, cols, passengers = _worker_state
+    return _score(matrix, insert_edge(matrix, *road), rows, cols, passengers)
@@ -1,33 +1,111 @@
 # core/algorithms/road_maintenance_optimizer.py
+import math
+import numpy as np
+from .instrumentation import instrumented
 
-def optimize_road_maintenance(roads, budget):
+# Repair cost (EGP) per km of a fully worn road (condition 0); cheaper the better the road
+REPAIR_COST_PER_KM = 1_000_000
+
+# scale='auto' keeps the DP row within MAX_COLUMNS and the selection bitset within MAX_SELECTION_BYTES
+MAX_COLUMNS = 2**20
+MAX_SELECTION_BYTES = 256 * 2**20
+
+@instrumented("road_maintenance")
+def optimize_road_maintenance(roads, budget, scale=1):
     """
     roads: قائمة بالطرق:
         [
             {"road_id": str, "repair_cost": int, "urgency": int}
         ]
     budget: الحد الأقصى للميزانية
+    scale: 1 = exact; an integer > 1 (or 'auto') prices roads in units of
+    ``scale`` pounds for multi-million budgets, see solve_knapsack for the bound.
 
     يرجع: الطرق المختارة + إجمالي الأهمية
     """
-    n = len(roads)
-    dp = [[0] * (budget + 1) for _ in range(n + 1)]
-
-    for i in range(1, n + 1):
-        cost = roads[i-1]["repair_cost"]
-        urgency = roads[i-1]["urgency"]
-        for w in range(budget + 1):
-            if cost <= w:
-                dp[i][w] = max(dp[i-1][w], dp[i-1][w - cost] + urgency)
-            else:
-                dp[i][w] = dp[i-1][w]
-
-    # استرجاع الطرق المختارة
-    selected = []
-    w = budget
-    for i in range(n, 0, -1):
-        if dp[i][w] != dp[i-1][w]:
-            selected.append(roads[i-1])
-            w -= roads[i-1]["repair_cost"]
+    selected, total, _ = solve_knapsack([road["repair_cost"] for road in roads],
+                                        [road["urgency"] for road in roads], budget, scale)
+    return [roads[i] for i in selected], total
+
+
+def solve_knapsack(costs, values, budget, scale=1):
+    """0/1 knapsack on a single rolling NumPy row.
+
+    ``best[w]`` (best value within capacity w) is updated once per item with
+    a vectorised max, and each item keeps one bit per capacity recording
+    whether it was taken, so memory is n * budget / 8 bytes instead of a
+    (n + 1) x (budget + 1) table of Python ints.
+
+    scale > 1 (or 'auto', see :func:`auto_scale`) solves in units of
+    ``scale``: costs are rounded up and the budget down, so the chosen roads
+    always fit the real budget, and since each one is overcharged by less
+    than ``scale`` the value is at least OPT(budget - n * scale).
+    ``upper_bound`` comes from the same DP with costs rounded down, a
+    relaxation, so OPT(budget) <= upper_bound. Fractional costs are
+    rounded the same way (up for the selection, down for the bound).
+
+    Returns ``(indices, value, upper_bound)``; exact mode has upper_bound == value.
+    """
+    costs = np.asarray(costs)
+    values = np.asarray(values)
+    if len(costs) and costs.min() < 0:
+        raise ValueError("Costs must be non-negative")
+    floor_costs = np.floor(costs).astype(np.int64)
+    costs = np.ceil(costs).astype(np.int64)
+    if scale == 'auto':
+        scale = auto_scale(len(costs), budget)
+    capacity = max(int(budget), 0) // scale
+    selected, value = _rolling_knapsack(-(-costs // scale), values, capacity, keep=True)
+    if scale == 1 and np.array_equal(costs, floor_costs):
+        return selected, value, value
+    _, upper_bound = _rolling_knapsack(floor_costs // scale, values, capacity, keep=False)
+    return selected, value, upper_bound
 
-    return selected[::-1], dp[n][budget]
+
+def auto_scale(num_items, budget, max_columns=MAX_COLUMNS, max_bytes=MAX_SELECTION_BYTES):
+    """Smallest cost unit that keeps the DP row and the selection bitset within bounds."""
+    return max(1, math.ceil((budget + 1) / max_columns), math.ceil(num_items * (budget + 1) / 8 / max_bytes))
+
+
+def maintenance_candidates(cairo_map, max_condition=10, cost_per_km=REPAIR_COST_PER_KM):
+    """Repair candidates for every road of ``cairo_map.existing_roads`` below ``max_condition``.
+
+    repair_cost (EGP) grows with the road's length and wear (10 - condition);
+    urgency is the wear weighted by capacity, so busy roads come first.
+    """
+    candidates = []
+    for road in cairo_map.existing_roads:
+        if road["condition"] >= max_condition:
+            continue
+        wear = 10 - road["condition"]
+        candidates.append({"road_id": f"{road['from_id']}-{road['to_id']}",
+                           "repair_cost": int(round(road["distance_km"] * cost_per_km * wear / 10)),
+                           "urgency": wear * road["capacity"] // 100})
+    return candidates
+
+
+def _rolling_knapsack(costs, values, capacity, keep):
+    n = len(costs)
+    best = np.zeros(capacity + 1, dtype=np.float64 if values.dtype.kind == 'f' else np.int64)
+    taken = np.zeros((n, (capacity + 8) // 8), dtype=np.uint8) if keep else None
+    row = np.zeros(capacity + 1, dtype=bool)
+    for i, (cost, value) in enumerate(zip(costs.tolist(), values.tolist())):
+        if cost > capacity or value <= 0:
+            continue
+        candidate = best[:capacity + 1 - cost] + value
+        if keep:
+            row[:cost] = False
+            np.greater(candidate, best[cost:], out=row[cost:])
+            taken[i] = np.packbits(row)
+        np.maximum(best[cost:], candidate, out=best[cost:])
+
+    selected = []
+    if keep:
+        # packbits is big-endian: bit w of a row is (byte w // 8) >> (7 - w % 8)
+        w = capacity
+        for i in range(n - 1, -1, -1):
+            if taken[i, w >> 3] >> (7 - (w & 7)) & 1:
+                selected.append(i)
+                w -= int(costs[i])
+        selected.reverse()
+    return selected, best[capacity].item()
@@ -0,0 +1,124 @@
+# core/algorithms/route_cache.py
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from .instrumentation import STATE, count
+
+
+class RouteCache:
+    """Bounded LRU (+ optional TTL) cache of routing results.
+
+    Entries remember the graph object they were computed on, the graph's
+    modification counter (``graph.graph["version"]`` for networkx graphs kept
+    by CairoMap, ``graph.version`` for CSR snapshots) and the roads on the
+    returned path.  When the graph changes, CairoMap's change log is used to
+    drop only what is stale: any cheaper or new road may create a better
+    route, so it invalidates every entry, while a slower or closed road only
+    invalidates the routes that use it.  Safe to share between threads
+    (the GUI runs routing jobs on a pool).
+    """
+
+    def __init__(self, maxsize=4096, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, graph, key):
+        """Return the cached value for ``key`` on ``graph``, or None on a miss."""
+        with self._lock:
+            value = self._get(graph, key)
+        if STATE.enabled:
+            count(**{"cache_hits" if value is not None else "cache_misses": 1})
+        return value
+
+    def _get(self, graph, key):
+        full_key = (id(graph),) + tuple(key)
+        entry = self._entries.get(full_key)
+        if entry is None:
+            self.misses += 1
+            return None
+        graph_ref, version, edges, created, value = entry
+        if graph_ref() is not graph or (self.ttl is not None and time.monotonic() - created > self.ttl):
+            del self._entries[full_key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        current = graph_version(graph)
+        if version != current:
+            if _is_stale(graph, version, edges):
+                del self._entries[full_key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries[full_key] = (graph_ref, current, edges, created, value)
+        self._entries.move_to_end(full_key)
+        self.hits += 1
+        return value
+
+    def put(self, graph, key, value, path=None):
+        """Store ``value`` for ``key``; ``path`` is the node list it depends on."""
+        full_key = (id(graph),) + tuple(key)
+        edges = frozenset(_edge_key(a, b) for a, b in zip(path[:-1], path[1:])) if path else frozenset()
+        entry = (weakref.ref(graph), graph_version(graph), edges, time.monotonic(), value)
+        with self._lock:
+            self._entries[full_key] = entry
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def graph_version(graph):
+    """Modification counter of a networkx graph or CSR snapshot (0 if untracked)."""
+    if hasattr(graph, "graph"):
+        return graph.graph.get("version", 0)
+    return getattr(graph, "version", 0)
+
+
+def _is_stale(graph, version, edges):
+    changes = graph.graph.get("changes", ()) if hasattr(graph, "graph") else ()
+    newer = [change for change in changes if change[0] > version]
+    # The log is bounded; if it no longer reaches back to ``version`` we can't tell
+    if not newer or newer[0][0] != version + 1:
+        return True
+    for _, u, v, kind in newer:
+        if kind == "decrease":
+            return True
+        if kind == "increase" and _edge_key(u, v) in edges:
+            return True
+    return False
+
+
+def _edge_key(a, b):
+    a, b = str(a), str(b)
+    return (a, b) if a <= b else (b, a)
+
+
+# Shared by the Dijkstra, A* and time-dependent entry points
+route_cache = RouteCache()
@@ -1,43 +1,205 @@
 # core/algorithms/time_dependent_dijkstra.py
-import networkx as nx
+import heapq
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from ..models.spatial_index import locate
+from .route_cache import route_cache
+from .instrumentation import STATE, count, instrumented, scanned_edges
 
+# Hour of day each traffic count in the data is taken to represent
+PERIOD_HOURS = (("night", 2.0), ("morning", 8.0), ("afternoon", 13.0), ("evening", 18.0))
+BREAKPOINTS = tuple(hour for _, hour in PERIOD_HOURS)
+
+
+@instrumented("time_dependent")
 def get_time_dependent_path(graph, source, target, current_time):
     """
-    current_time: int -> ساعة اليوم (مثلاً 8 تعني 8 صباحاً)
+    current_time: ساعة المغادرة (مثلاً 8 تعني 8 صباحاً، 8.5 تعني 8:30)
+    source/target: node ids or (lon, lat) pairs, which snap to the nearest node.
+
+    Every road gets a 24-hour piecewise-linear travel-time profile built from
+    its morning/afternoon/evening/night traffic (same formula as CairoMap's
+    travel_time, in minutes). The clock advances along the path, so each road
+    is priced at the time the vehicle actually reaches it.
+
+    Returns (path, minutes) -- the travel time from departure to arrival.
     """
-    def get_weight(u, v):
-        base = graph[u][v].get('distance', 1)
-        rush_hours = (7 <= current_time <= 9) or (16 <= current_time <= 18)
-        traffic_factor = graph[u][v].get('traffic_multiplier', 1.0)
-        if rush_hours:
-            return base * traffic_factor  # مضاعفة الوزن في الزحمة
-        return base
+    source, target = locate(graph, source), locate(graph, target)
+    key = ('time_dependent', str(source), str(target), float(current_time) % 24.0)
+    cached = route_cache.get(graph, key)
+    if cached is not None:
+        return cached
+    path, minutes = _time_dependent_path(graph, source, target, current_time)
+    route_cache.put(graph, key, (path, minutes), path)
+    return path, minutes
+
+
+def _time_dependent_path(graph, source, target, current_time):
+    if isinstance(graph, CSRGraph):
+        s = graph.node_index(source)
+        t = graph.node_index(target)
+        if s is None or t is None:
+            return None, float('inf')
+        path, minutes = time_dependent_search(csr_profile_adjacency(graph), s, t, current_time)
+        return (graph.path_ids(path) if path else None), minutes
 
     source = str(source)
     target = str(target)
-    visited = set()
-    distance = {node: float('inf') for node in graph.nodes()}
-    distance[source] = 0
+    if source not in graph or target not in graph:
+        return None, float('inf')
+    return time_dependent_search(_NxProfiles(graph), source, target, current_time)
+
+
+@instrumented("time_dependent.best_departure")
+def get_best_departure(graph, source, target, window_start, window_end, step_minutes=15):
+    """Profile query: the sampled departure in [window_start, window_end] hours with the shortest trip.
+
+    Departures are tried every ``step_minutes`` plus at every profile
+    breakpoint inside the window, so this is an approximation at that
+    resolution: a better departure between two samples (where a road
+    reached later in the trip crosses a breakpoint) can be missed.
+    Returns (departure_hour, path, minutes), or (None, None, inf) if no path.
+    """
+    source, target = locate(graph, source), locate(graph, target)
+    departures = set(np.arange(window_start, window_end, step_minutes / 60.0).tolist())
+    departures.add(float(window_end))
+    for day in (0.0, 24.0):
+        departures.update(b + day for b in BREAKPOINTS if window_start <= b + day <= window_end)
+
+    best = (None, None, float('inf'))
+    for departure in sorted(departures):
+        path, minutes = get_time_dependent_path(graph, source, target, departure)
+        if minutes < best[2]:
+            best = (departure, path, minutes)
+    return best
+
+
+def time_dependent_search(adjacency, source, target, departure_hour):
+    """Dijkstra on arrival times with a binary heap, stopping at ``target``.
+
+    ``adjacency[u]`` yields ``(neighbor, profile)`` where ``profile`` holds
+    the travel times (minutes) at BREAKPOINTS. Profiles are FIFO, so
+    label-setting on the earliest arrival is exact.
+    """
+    arrival = {source: 0.0}
     parent = {source: None}
-    nodes = list(graph.nodes())
-
-    while nodes:
-        u = min((n for n in nodes if n not in visited), key=lambda x: distance[x], default=None)
-        if u is None or distance[u] == float('inf'):
-            break
-        visited.add(u)
-        nodes.remove(u)
-        for v in graph.neighbors(u):
-            weight = get_weight(u, v)
-            if distance[u] + weight < distance[v]:
-                distance[v] = distance[u] + weight
+    settled = set()
+    heap = [(0.0, source)]
+    pushes = 0
+    while heap:
+        elapsed, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        if u == target:
+            if STATE.enabled:
+                count(settled=len(settled), heap_pushes=pushes + 1, heap_pops=pushes + 1 - len(heap),
+                      edges_relaxed=scanned_edges(adjacency, settled - {target}))
+            path = []
+            while u is not None:
+                path.append(u)
+                u = parent[u]
+            return path[::-1], elapsed
+        hour = departure_hour + elapsed / 60.0
+        for v, profile in adjacency[u]:
+            if v in settled:
+                continue
+            candidate = elapsed + travel_time_at(profile, hour)
+            if candidate < arrival.get(v, float('inf')):
+                arrival[v] = candidate
                 parent[v] = u
+                heapq.heappush(heap, (candidate, v))
+                pushes += 1
+    if STATE.enabled:
+        count(settled=len(settled), heap_pushes=pushes + 1, heap_pops=pushes + 1,
+              edges_relaxed=scanned_edges(adjacency, settled))
+    return None, float('inf')
 
-    path = []
-    current = target
-    while current is not None:
-        path.insert(0, current)
-        current = parent.get(current)
-    if path[0] != source:
-        return None, float('inf')
-    return path, distance[target]
+
+def travel_time_at(profile, hour):
+    """Evaluate a cyclic piecewise-linear profile at ``hour`` (any real number)."""
+    hour %= 24.0
+    b = BREAKPOINTS
+    if hour < b[0] or hour >= b[-1]:
+        # Wrap-around segment from the last breakpoint to the first one of the next day
+        start, end = b[-1], b[0] + 24.0
+        offset = hour if hour >= b[-1] else hour + 24.0
+        lo, hi = profile[-1], profile[0]
+    else:
+        i = 0
+        while hour >= b[i + 1]:
+            i += 1
+        start, end = b[i], b[i + 1]
+        offset = hour
+        lo, hi = profile[i], profile[i + 1]
+    return lo + (hi - lo) * (offset - start) / (end - start)
+
+
+def edge_profile(data):
+    """Travel times (minutes) at BREAKPOINTS for one road's attribute dict."""
+    distance = data.get('distance', 1)
+    capacity = data.get('capacity')
+    if not capacity or any(f"{period}_traffic" not in data for period, _ in PERIOD_HOURS):
+        constant = data.get('travel_time', distance)
+        return [constant] * len(BREAKPOINTS)
+    values = [distance * (1 + data[f"{period}_traffic"] / capacity) for period, _ in PERIOD_HOURS]
+    return _enforce_fifo(values)
+
+
+def csr_profile_adjacency(csr):
+    """Per-node ``[(neighbor, profile), ...]`` lists for a CSRGraph, built once per snapshot."""
+    cached = csr.__dict__.get("_td_adjacency")
+    if cached is not None:
+        return cached
+    distance = csr.weights.get('distance', np.ones(csr.num_edges))
+    distance = np.where(np.isnan(distance), 1.0, distance)
+    constant = csr.weights.get('travel_time', distance)
+    constant = np.where(np.isnan(constant), distance, constant)
+    columns = [csr.weights.get(f"{period}_traffic") for period, _ in PERIOD_HOURS]
+    capacity = csr.weights.get('capacity')
+    if capacity is None or any(column is None for column in columns):
+        table = np.repeat(constant[:, None], len(BREAKPOINTS), axis=1)
+    else:
+        traffic = np.stack(columns, axis=1)
+        valid = ~np.isnan(traffic).any(axis=1) & (np.nan_to_num(capacity) > 0)
+        safe_capacity = np.where(valid, capacity, 1.0)
+        table = distance[:, None] * (1 + np.nan_to_num(traffic) / safe_capacity[:, None])
+        table = np.where(valid[:, None], table, constant[:, None])
+    profiles = [_enforce_fifo(row) for row in table.tolist()]
+    offsets = csr.offsets.tolist()
+    targets = csr.targets.tolist()
+    adjacency = [[(targets[k], profiles[k]) for k in range(offsets[i], offsets[i + 1])]
+                 for i in range(csr.num_nodes)]
+    csr.__dict__["_td_adjacency"] = adjacency
+    return adjacency
+
+
+def _enforce_fifo(values):
+    """Raise breakpoints so travel time never drops faster than the clock.
+
+    Leaving later must never mean arriving earlier, i.e. the slope is at least
+    -60 minutes per hour on every (cyclic) segment.
+    """
+    values = list(values)
+    n = len(values)
+    for _ in range(2):  # second pass settles the wrap-around segment
+        for i in range(n):
+            j = (i + 1) % n
+            span = (BREAKPOINTS[j] - BREAKPOINTS[i]) % 24.0
+            floor = values[i] - 60.0 * span
+            if values[j] < floor:
+                values[j] = floor
+    return values
+
+
+class _NxProfiles:
+    """``adjacency[u]`` view of a networkx graph yielding ``(neighbor, profile)``."""
+
+    def __init__(self, graph):
+        self._adj = graph.adj
+
+    def __getitem__(self, u):
+        return ((v, edge_profile(data)) for v, data in self._adj[u].items())
+
+    def degree(self, u):
+        return len(self._adj[u])
@@ -1,3 +1,11 @@
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from .instrumentation import instrumented
+
+# Column order of the batch API's (intersections x directions) arrays
+DIRECTIONS = ("north", "south", "east", "west")
+
+@instrumented("traffic_signal")
 def optimize_traffic_signal(car_counts):
     total = sum(car_counts.values())
     if total == 0:
@@ -8,5 +16,46 @@ def optimize_traffic_signal(car_counts):
         for direction, count in car_counts.items()
     }
 
-test_data = {'north': 50, 'south': 30, 'east': 70, 'west': 20}
-print(optimize_traffic_signal(test_data))
+@instrumented("traffic_signal.batch")
+def optimize_traffic_signals(counts):
+    """Green splits (%) for many intersections at once.
+
+    counts: array of shape (intersections, directions), e.g. from
+    :func:`approach_counts`. Each row follows optimize_traffic_signal:
+    proportional to the counts, rounded to 2 decimals, equal split (25 each
+    for four directions) where an intersection has no cars.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum(axis=1, keepdims=True)
+    splits = np.divide(counts * 100, total, out=np.full_like(counts, 100 / max(counts.shape[1], 1)),
+                       where=total != 0)
+    return np.round(splits, 2)
+
+
+def approach_counts(graph, period="morning"):
+    """Per-intersection traffic by approach direction, from the roads' ``{period}_traffic``.
+
+    graph: networkx graph or CSRGraph. A road counts for the approach of
+    each end it enters from: "north" if the other end lies to the north
+    (mostly vertical roads), and so on; period "avg" uses ``avg_traffic``.
+    Returns ``(node_ids, counts)`` with counts of shape (nodes, 4) in
+    DIRECTIONS order.
+    """
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    traffic = np.nan_to_num(csr.weight("avg_traffic" if period == "avg" else f"{period}_traffic"))
+    sources = np.repeat(np.arange(csr.num_nodes), np.diff(csr.offsets))
+    direction = approach_direction(csr.pos[sources], csr.pos[csr.targets])
+    counts = np.zeros((csr.num_nodes, len(DIRECTIONS)), dtype=np.float64)
+    np.add.at(counts, (sources, direction), traffic)
+    return csr.node_ids, counts
+
+
+def approach_direction(at, towards):
+    """DIRECTIONS index of ``towards`` as seen from ``at`` (arrays of (x, y) positions)."""
+    dx = towards[..., 0] - at[..., 0]
+    dy = towards[..., 1] - at[..., 1]
+    return np.where(np.abs(dy) >= np.abs(dx), np.where(dy > 0, 0, 1), np.where(dx > 0, 2, 3))
+
+if __name__ == "__main__":
+    test_data = {'north': 50, 'south': 30, 'east': 70, 'west': 20}
+    print(optimize_traffic_signal(test_data))
@@ -0,0 +1,134 @@
+# core/algorithms/travel_matrix.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from .dijkstra import single_source_arrays
+from .instrumentation import instrumented
+
+# Below this many distinct origins a process pool costs more than it saves
+MIN_PARALLEL_SOURCES = 8
+
+
+@instrumented("travel_matrix")
+def compute_travel_matrix(graph, origins, destinations, weight_type='distance',
+                          processes=None, return_predecessors=False):
+    """Origin-destination cost matrix with one single-source search per distinct origin.
+
+    graph: networkx graph or CSRGraph.
+    origins / destinations: node ids.
+    processes: worker processes (None = all cores, 1 = run in this process).
+
+    Returns ``matrix`` of shape (len(origins), len(destinations)) with inf
+    for unreachable pairs.  With ``return_predecessors=True`` returns
+    ``(matrix, predecessors)`` where ``predecessors[i]`` is the shortest-path
+    tree of ``origins[i]`` as node indices (-1 = unreachable, the origin
+    points to itself); see :func:`matrix_path`.
+    """
+    csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    origin_idx = _indices(csr, origins)
+    destination_idx = _indices(csr, destinations)
+
+    sources = [int(source) for source in dict.fromkeys(origin_idx.tolist())]
+    dist, pred = _solve_sources(csr, weight_type, sources, processes)
+    row_of = {source: i for i, source in enumerate(sources)}
+    rows = np.array([row_of[o] for o in origin_idx], dtype=np.int64)
+
+    matrix = dist[rows][:, destination_idx] if len(rows) else np.zeros((0, len(destination_idx)))
+    if return_predecessors:
+        return matrix, pred[rows]
+    return matrix
+
+
+def matrix_path(graph, predecessors, origin_row, destination):
+    """Rebuild the node-id path to ``destination`` from one predecessor row (None if unreachable)."""
+    csr = graph if isinstance(graph, CSRGraph) else None
+    node_ids = csr.node_ids if csr else [str(node) for node in graph.nodes()]
+    index = csr.index if csr else {node: i for i, node in enumerate(node_ids)}
+    row = predecessors[origin_row]
+    current = index[str(destination)]
+    path = [current]
+    while row[current] != current:
+        if row[current] < 0:
+            return None
+        current = int(row[current])
+        path.append(current)
+    return [node_ids[i] for i in reversed(path)]
+
+
+def demand_pair_costs(cairo_map, weight_type='travel_time', processes=None):
+    """Cost of every ``public_transport_demand`` pair.
+
+    Returns a list of ``(from_id, to_id, daily_passengers, cost)``.
+    """
+    demand = cairo_map.public_transport_demand
+    origins = sorted({str(d["from_id"]) for d in demand})
+    destinations = sorted({str(d["to_id"]) for d in demand})
+    matrix = compute_travel_matrix(cairo_map.freeze(), origins, destinations, weight_type, processes)
+    row = {node: i for i, node in enumerate(origins)}
+    col = {node: j for j, node in enumerate(destinations)}
+    return [(str(d["from_id"]), str(d["to_id"]), d["daily_passengers"],
+             float(matrix[row[str(d["from_id"])], col[str(d["to_id"])]]))
+            for d in demand]
+
+
+def neighborhood_facility_matrix(cairo_map, weight_type='travel_time', processes=None):
+    """All neighborhoods x all facilities.
+
+    Returns ``(neighborhood_ids, facility_ids, matrix)``.
+    """
+    neighborhoods = [str(area["ID"]) for area in cairo_map.neighborhoods]
+    facilities = [str(facility["id"]) for facility in cairo_map.facilities]
+    matrix = compute_travel_matrix(cairo_map.freeze(), neighborhoods, facilities, weight_type, processes)
+    return neighborhoods, facilities, matrix
+
+
+def _indices(csr, nodes):
+    indices = []
+    for node in nodes:
+        i = csr.node_index(node)
+        if i is None:
+            raise ValueError(f"Unknown node id: {node}")
+        indices.append(i)
+    return np.array(indices, dtype=np.int64)
+
+
+def _solve_sources(csr, weight_type, sources, processes):
+    n = csr.num_nodes
+    dist = np.empty((len(sources), n), dtype=np.float64)
+    pred = np.empty((len(sources), n), dtype=np.int32 if n < 2**31 else np.int64)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes <= 1 or len(sources) < MIN_PARALLEL_SOURCES:
+        adjacency = csr.adjacency(weight_type)
+        for i, source in enumerate(sources):
+            dist[i], pred[i] = single_source_arrays(adjacency, n, source)
+            pred[i, source] = source
+        return dist, pred
+
+    # Workers get the raw CSR arrays once (initializer) and rebuild adjacency lists locally
+    chunksize = max(1, len(sources) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(csr.offsets, csr.targets, csr.weight(weight_type))) as pool:
+        for i, (row_dist, row_pred) in enumerate(pool.map(_solve_one, sources, chunksize=chunksize)):
+            dist[i] = row_dist
+            pred[i] = row_pred
+            pred[i, sources[i]] = sources[i]
+    return dist, pred
+
+
+_worker_adjacency = None
+
+
+def _init_worker(offsets, targets, values):
+    global _worker_adjacency
+    csr = CSRGraph([str(i) for i in range(len(offsets) - 1)], offsets, targets, {"w": values},
+                   np.zeros((len(offsets) - 1, 2)))
+    _worker_adjacency = csr.adjacency("w")
+
+
+def _solve_one(source):
+    dist, pred = single_source_arrays(_worker_adjacency, len(_worker_adjacency), source)
+    return np.asarray(dist, dtype=np.float64), np.asarray(pred, dtype=np.int64)
@@ -0,0 +1,144 @@
+import numpy as np
+
+
+# Numeric edge attributes copied into the snapshot when present on the graph
+EDGE_WEIGHTS = (
+    "distance",
+    "travel_time",
+    "capacity",
+    "morning_traffic",
+    "afternoon_traffic",
+    "evening_traffic",
+    "night_traffic",
+    "avg_traffic",
+)
+
+
+class CSRGraph:
+    """Immutable compressed-sparse-row snapshot of a CairoMap road graph.
+
+    Nodes are renumbered 0..n-1 (``node_ids[i]`` is the original id), the
+    neighbours of node ``i`` are ``targets[offsets[i]:offsets[i+1]]`` and every
+    weight is a float array aligned with ``targets``.  Undirected roads are
+    stored once per direction.
+    """
+
+    def __init__(self, node_ids, offsets, targets, weights, pos, version=0):
+        self.node_ids = list(node_ids)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self.offsets = _frozen(offsets)
+        self.targets = _frozen(targets)
+        self.weights = {name: _frozen(values) for name, values in weights.items()}
+        self.pos = _frozen(pos)
+        self.version = version
+
+    @classmethod
+    def from_networkx(cls, graph, version=0):
+        """Build a snapshot from a networkx graph (both directions for undirected graphs)."""
+        node_ids = [str(node) for node in graph.nodes()]
+        index = {node: i for i, node in enumerate(graph.nodes())}
+        n = len(node_ids)
+
+        sources = []
+        targets = []
+        columns = {name: [] for name in EDGE_WEIGHTS}
+        directed = graph.is_directed()
+        for u, v, data in graph.edges(data=True):
+            pairs = [(index[u], index[v])] if directed else [(index[u], index[v]), (index[v], index[u])]
+            for a, b in pairs:
+                sources.append(a)
+                targets.append(b)
+                for name in EDGE_WEIGHTS:
+                    columns[name].append(data.get(name, np.nan))
+
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind="stable")
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+
+        weights = {}
+        for name, values in columns.items():
+            values = np.asarray(values, dtype=np.float64)[order]
+            if not np.isnan(values).all():
+                weights[name] = values
+
+        pos = np.array([graph.nodes[node].get("pos", (0, 0)) for node in graph.nodes()],
+                       dtype=np.float64).reshape(n, 2)
+        return cls(node_ids, offsets, np.asarray(targets, dtype=np.int64)[order],
+                   weights, pos, version=version)
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        """Number of directed arcs (each undirected road counts twice)."""
+        return len(self.targets)
+
+    def node_index(self, node):
+        """Return the integer index of an original node id, or None if unknown."""
+        return self.index.get(str(node))
+
+    def weight(self, weight_type):
+        """Return the weight array for ``weight_type`` (KeyError if the graph has none)."""
+        return self.weights[weight_type]
+
+    def neighbors(self, i):
+        """Return the neighbour indices of node ``i``."""
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def adjacency(self, weight_type):
+        """Return per-node ``[(neighbour, weight), ...]`` lists for tight Python loops.
+
+        Arcs whose weight is missing (NaN) are skipped, matching how the
+        networkx-based algorithms skip edges without the requested attribute.
+        The result is cached on the snapshot since the snapshot never changes.
+        """
+        cache = self.__dict__.setdefault("_adjacency", {})
+        if weight_type not in cache:
+            cache[weight_type] = self.adjacency_from(self.weight(weight_type))
+        return cache[weight_type]
+
+    def adjacency_from(self, values):
+        """Like :meth:`adjacency` but for an arbitrary per-arc weight array (not cached)."""
+        targets = self.targets.tolist()
+        values = np.asarray(values, dtype=np.float64).tolist()
+        offsets = self.offsets.tolist()
+        adjacency = []
+        for i in range(self.num_nodes):
+            adjacency.append([(targets[k], values[k])
+                              for k in range(offsets[i], offsets[i + 1])
+                              if values[k] == values[k]])
+        return adjacency
+
+    def path_ids(self, path):
+        """Translate a list of node indices back to original node ids."""
+        return [self.node_ids[i] for i in path]
+
+    def __repr__(self):
+        return f"CSRGraph(nodes={self.num_nodes}, arcs={self.num_edges}, weights={sorted(self.weights)})"
+
+
+def snapshot_of(graph):
+    """CSRGraph of ``graph``: the graph itself if it already is one.
+
+    Graphs with a modification counter (``graph.graph["version"]``, kept by
+    CairoMap) get their snapshot built once per version and kept in
+    ``graph.graph``; untracked graphs are converted on every call.
+    """
+    if isinstance(graph, CSRGraph):
+        return graph
+    version = graph.graph.get("version")
+    if version is None:
+        return CSRGraph.from_networkx(graph)
+    cached = graph.graph.get("_csr_snapshot")
+    if cached is None or cached.version != version:
+        cached = graph.graph["_csr_snapshot"] = CSRGraph.from_networkx(graph, version)
+    return cached
+
+
+def _frozen(values):
+    array = np.array(values, copy=True)
+    array.setflags(write=False)
+    return array
@@ -1,6 +1,20 @@
 import math
 import heapq
+from collections import deque
 import networkx as nx
+from .csr_graph import CSRGraph
+from .spatial_index import grid_index
+from ..services.data_loader import build_traffic_index, road_key, split_road
+
+# How many edge changes CairoMap remembers for cache invalidation
+CHANGE_LOG_SIZE = 10000
+
+# Edge attributes that make a route slower when they go up (capacity: when it goes down)
+SLOWER_WHEN_HIGHER = ("distance", "travel_time", "morning_traffic", "afternoon_traffic",
+                      "evening_traffic", "night_traffic", "avg_traffic")
+
+TRAFFIC_PERIODS = ("morning", "afternoon", "evening", "night")
+DEFAULT_TRAFFIC = {"morning": 1000, "afternoon": 800, "evening": 900, "night": 500}
 
 class CairoMap:
     def __init__(self):
@@ -15,71 +29,334 @@ class CairoMap:
         self.public_transport_demand = []
         
         # Create empty graph
-        self.G = nx.Graph()
+        self._G = nx.Graph()
+        self._fill_graph = None
+        # Modification counter and recent edge changes, read by the route cache
+        self._G.graph["version"] = 0
+        self._G.graph["changes"] = deque(maxlen=CHANGE_LOG_SIZE)
+        self._snapshot = None
+        # (traffic_patterns list, road_key -> pattern) -- rebuilt if the list is replaced
+        self._traffic_index = None
+        # Attributes built on first access, see defer()
+        self._deferred = {}
+
+    @property
+    def G(self):
+        """The editable networkx road graph (filled on first access after ``defer_graph``)."""
+        if self._fill_graph is not None:
+            fill, self._fill_graph = self._fill_graph, None
+            fill(self._G)
+        return self._G
+
+    @G.setter
+    def G(self, graph):
+        self._G = graph
+        self._fill_graph = None
+
+    def defer_graph(self, fill):
+        """Call ``fill(graph)`` to add the nodes and roads only when ``G`` is first read.
+
+        The version and change log stay readable meanwhile, so ``freeze``
+        and the route cache work without building the graph.
+        """
+        self._fill_graph = fill
+
+    def defer(self, **builders):
+        """Build these attributes on first access: name -> zero-argument callable returning the value."""
+        for name, build in builders.items():
+            self.__dict__.pop(name, None)
+            self._deferred[name] = build
+
+    def __getattr__(self, name):
+        # Only reached for attributes that are not set, such as deferred ones
+        deferred = self.__dict__.get("_deferred")
+        if not deferred or name not in deferred:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        value = deferred.pop(name)()
+        setattr(self, name, value)
+        return value
+
+    @property
+    def version(self):
+        """Modification counter, bumped on every change made through CairoMap."""
+        return self._G.graph["version"]
+
+    def _record_change(self, u, v, kind):
+        """Bump the version and log an edge change.
+
+        kind: "increase" (road got slower or closed), "decrease" (faster or
+        new road, or any bulk change) or "neutral" (no routing attribute).
+        """
+        self._record_changes([(u, v, kind)])
+
+    def _record_changes(self, changes):
+        """Log a batch of ``(u, v, kind)`` edge changes under a single version bump."""
+        self._G.graph["version"] += 1
+        version = self._G.graph["version"]
+        self._G.graph["changes"].extend((version, u, v, kind) for u, v, kind in changes)
+
+    def update_edge(self, from_node, to_node, **attrs):
+        """Add or update a road and record whether routes through it got slower or faster."""
+        from_node, to_node = str(from_node), str(to_node)
+        if not self.G.has_edge(from_node, to_node):
+            self.G.add_edge(from_node, to_node, **attrs)
+            self._record_change(from_node, to_node, "decrease")
+            return
+        data = self.G.edges[from_node, to_node]
+        kind = _change_kind(data, attrs)
+        data.update(attrs)
+        self._record_change(from_node, to_node, kind)
+
+    def ingest_traffic(self, updates):
+        """Apply a batch of live traffic counts to existing roads in place.
+
+        updates: iterable of dicts shaped like ``traffic_patterns`` entries,
+        e.g. ``{"road": "1-3", "morning": 2900}``; periods left out keep their
+        current count. ``avg_traffic`` and ``travel_time`` are recomputed with
+        the same formula as the initial build (missing counts default to
+        DEFAULT_TRAFFIC), the stored traffic pattern is updated too, and the
+        whole batch counts as one version.
+        Updates for roads that are not in the graph, or that have no
+        distance or capacity to price them, are skipped. The batch is
+        checked before anything is changed, so a bad update leaves the map
+        untouched. Returns the number of roads updated.
+        """
+        # First pass: new counts per road, nothing modified yet
+        pending = {}
+        for update in updates:
+            from_node, to_node = split_road(update["road"])
+            if not self.G.has_edge(from_node, to_node):
+                continue
+            data = self.G.edges[from_node, to_node]
+            if not data.get("distance") or not data.get("capacity"):
+                continue
+            key = road_key(from_node, to_node)
+            current = pending[key][2] if key in pending else {
+                period: data.get(f"{period}_traffic", DEFAULT_TRAFFIC[period]) for period in TRAFFIC_PERIODS}
+            counts = {period: update.get(period, current[period]) for period in TRAFFIC_PERIODS}
+            pending[key] = (from_node, to_node, counts)
+
+        updated = []
+        for from_node, to_node, counts in pending.values():
+            data = self.G.edges[from_node, to_node]
+            attrs = {f"{period}_traffic": count for period, count in counts.items()}
+            attrs["avg_traffic"] = sum(counts.values()) / len(TRAFFIC_PERIODS)
+            attrs["travel_time"] = data["distance"] * (1 + attrs["avg_traffic"] / data["capacity"])
+            updated.append((from_node, to_node, counts, attrs, _change_kind(data, attrs)))
+
+        index = self._traffic_lookup()
+        changes = []
+        for from_node, to_node, counts, attrs, kind in updated:
+            self.G.edges[from_node, to_node].update(attrs)
+            changes.append((from_node, to_node, kind))
+            key = road_key(from_node, to_node)
+            pattern = index.get(key)
+            if pattern is None:
+                pattern = index[key] = {"road": f"{from_node}-{to_node}"}
+                self.traffic_patterns.append(pattern)
+            pattern.update(counts)
+        if changes:
+            self._record_changes(changes)
+        return len(changes)
+
+    def remove_edge(self, from_node, to_node):
+        """Close a road."""
+        from_node, to_node = str(from_node), str(to_node)
+        self.G.remove_edge(from_node, to_node)
+        self._record_change(from_node, to_node, "increase")
         
     def _add_nodes(self):
         """Add neighborhood and facility nodes to the graph"""
         for area in self.neighborhoods:
-            self.G.add_node(str(area["ID"]), 
-                        name=area["Name"],
-                        population=area["Population"],
-                        type=area["Type"],
-                        pos=(area["X"], area["Y"]),
-                        node_type="neighborhood",  # <-- أضف هذا السطر
-                        importance=math.log(area["Population"]))
-        
+            self._add_neighborhood(area)
         for facility in self.facilities:
-            self.G.add_node(facility["id"],
-                        name=facility["name"],
-                        type=facility["type"],
-                        pos=(facility["longitude"], facility["latitude"]),
-                        node_type="facility",  # <-- أضف هذا السطر
-                        importance=3)
+            self._add_facility(facility)
+        self._record_change(None, None, "decrease")
+
+    def _add_neighborhood(self, area):
+        self.G.add_node(str(area["ID"]), 
+                    name=area["Name"],
+                    population=area["Population"],
+                    type=area["Type"],
+                    pos=(area["X"], area["Y"]),
+                    node_type="neighborhood",  # <-- أضف هذا السطر
+                    importance=math.log(area["Population"]))
+
+    def _add_facility(self, facility):
+        self.G.add_node(facility["id"],
+                    name=facility["name"],
+                    type=facility["type"],
+                    pos=(facility["longitude"], facility["latitude"]),
+                    node_type="facility",  # <-- أضف هذا السطر
+                    importance=3)
 
     def _add_edges(self):
         """Add road edges to the graph"""
         for road in self.existing_roads:
-            from_node = str(road["from_id"])
-            to_node = str(road["to_id"])
-            traffic = self._get_traffic_data(from_node, to_node)
-            avg_traffic = (traffic["morning"] + traffic["afternoon"] + traffic["evening"] + traffic["night"]) / 4
-            travel_time = road["distance_km"] * (1 + avg_traffic / road["capacity"])
-            self.G.add_edge(from_node, to_node,
-                            distance=road["distance_km"],
-                            capacity=road["capacity"],
-                            condition=road["condition"],
-                            morning_traffic=traffic["morning"],
-                            afternoon_traffic=traffic["afternoon"],
-                            evening_traffic=traffic["evening"],
-                            night_traffic=traffic["night"],
-                            avg_traffic=avg_traffic,
-                            travel_time=travel_time,
-                            road_type="existing")
-        
+            self._add_road(road)
         for road in self.new_roads:
-            from_node = str(road["from"])
-            to_node = str(road["to"])
-            traffic = self._get_traffic_data(from_node, to_node)
-            avg_traffic = (traffic["morning"] + traffic["afternoon"] + traffic["evening"] + traffic["night"]) / 4
-            travel_time = road["distance"] * (1 + avg_traffic / road["capacity"])
-            self.G.add_edge(from_node, to_node,
-                            distance=road["distance"],
-                            capacity=road["capacity"],
-                            cost=road["cost"],
-                            morning_traffic=traffic["morning"],
-                            afternoon_traffic=traffic["afternoon"],
-                            evening_traffic=traffic["evening"],
-                            night_traffic=traffic["night"],
-                            avg_traffic=avg_traffic,
-                            travel_time=travel_time,
-                            road_type="proposed")
+            self._add_proposed_road(road)
+        self._record_change(None, None, "decrease")
+
+    def _add_road(self, road):
+        from_node = str(road["from_id"])
+        to_node = str(road["to_id"])
+        traffic = self._get_traffic_data(from_node, to_node)
+        avg_traffic = (traffic["morning"] + traffic["afternoon"] + traffic["evening"] + traffic["night"]) / 4
+        travel_time = road["distance_km"] * (1 + avg_traffic / road["capacity"])
+        self.G.add_edge(from_node, to_node,
+                        distance=road["distance_km"],
+                        capacity=road["capacity"],
+                        condition=road["condition"],
+                        morning_traffic=traffic["morning"],
+                        afternoon_traffic=traffic["afternoon"],
+                        evening_traffic=traffic["evening"],
+                        night_traffic=traffic["night"],
+                        avg_traffic=avg_traffic,
+                        travel_time=travel_time,
+                        road_type="existing")
+
+    def _add_proposed_road(self, road):
+        from_node = str(road["from"])
+        to_node = str(road["to"])
+        traffic = self._get_traffic_data(from_node, to_node)
+        avg_traffic = (traffic["morning"] + traffic["afternoon"] + traffic["evening"] + traffic["night"]) / 4
+        travel_time = road["distance"] * (1 + avg_traffic / road["capacity"])
+        self.G.add_edge(from_node, to_node,
+                        distance=road["distance"],
+                        capacity=road["capacity"],
+                        cost=road["cost"],
+                        morning_traffic=traffic["morning"],
+                        afternoon_traffic=traffic["afternoon"],
+                        evening_traffic=traffic["evening"],
+                        night_traffic=traffic["night"],
+                        avg_traffic=avg_traffic,
+                        travel_time=travel_time,
+                        road_type="proposed")
+
+    def consume(self, section, records, keep_records=True):
+        """Add streamed records of one data section straight to the map.
+
+        section: "neighborhoods", "facilities", "existing_roads", "new_roads",
+        "traffic_patterns", "metro_lines", "bus_routes" or
+        "public_transport_demand"; records: any iterable of dicts in the
+        data/*.json schema (e.g. from ``core.services.stream_loader``).
+        Nodes and roads go into the graph as they arrive; with
+        ``keep_records=False`` their raw dicts are not kept in the lists.
+        Traffic patterns must be consumed before the roads they describe.
+        Returns the number of records consumed.
+        """
+        add = {"neighborhoods": self._add_neighborhood, "facilities": self._add_facility,
+               "existing_roads": self._add_road, "new_roads": self._add_proposed_road}.get(section)
+        if add is None:
+            if section not in ("traffic_patterns", "metro_lines", "bus_routes", "public_transport_demand"):
+                raise ValueError(f"Unknown data section: {section}")
+            target = getattr(self, section)
+            index = self._traffic_lookup() if section == "traffic_patterns" else None
+            count = 0
+            for record in records:
+                target.append(record)
+                if index is not None:
+                    index.setdefault(road_key(*split_road(record["road"])), record)
+                count += 1
+            return count
+
+        kept = getattr(self, section) if keep_records else None
+        count = 0
+        for record in records:
+            add(record)
+            if kept is not None:
+                kept.append(record)
+            count += 1
+        if count:
+            self._record_change(None, None, "decrease")
+        return count
+
+    def freeze(self):
+        """Return an immutable CSRGraph snapshot of the current road graph.
+
+        The networkx graph stays the editable model.  The snapshot is reused
+        until the map's version changes.
+        """
+        if self._snapshot is None or self._snapshot.version != self.version:
+            self._snapshot = CSRGraph.from_networkx(self.G, version=self.version)
+        return self._snapshot
+
+    def spatial_index(self):
+        """GridIndex over node positions and roads of the current snapshot (see ``freeze``)."""
+        return grid_index(self.freeze())
+
+    def nearest_nodes(self, points, k=1):
+        """Nearest ``k`` node ids of every (lon, lat) point: ``(ids, distances)``.
+
+        ids is a list per point for k > 1 (closest first), with None where
+        the map has fewer than k nodes; distances are in degrees.
+        """
+        index = self.spatial_index()
+        found, distances = index.nearest(points, k)
+        ids = [index.node_ids[i] if i >= 0 else None for i in found.ravel()]
+        if k > 1:
+            ids = [ids[i:i + k] for i in range(0, len(ids), k)]
+        return ids, distances
+
+    def nearest_node(self, lon, lat):
+        """Id of the node closest to (lon, lat), or None for an empty map."""
+        return self.nearest_nodes([(lon, lat)])[0][0]
+
+    def snap_to_road(self, points):
+        """Snap (lon, lat) points onto the closest road.
+
+        Returns a list of ``(from_id, to_id, offset_km, (lon, lat))`` per
+        point -- offset_km is how far along the road from ``from_id`` the
+        snapped point lies -- or None where the map has no roads.
+        """
+        index = self.spatial_index()
+        edges, fraction, snapped, _ = index.snap(points)
+        snaps = []
+        for edge, part, point in zip(edges.tolist(), fraction.tolist(), snapped.tolist()):
+            if edge < 0:
+                snaps.append(None)
+                continue
+            u, v = index.node_ids[index.sources[edge]], index.node_ids[index.targets[edge]]
+            length = self.G.edges[u, v].get("distance", 0.0)
+            snaps.append((u, v, part * length, tuple(point)))
+        return snaps
+
+    def set_distance_store(self, store):
+        """Answer Dijkstra routes on ``G`` from a precomputed DistanceStore until the map changes.
+
+        The store is tied to the current version: any later edit makes the
+        routing entry point search again. ``None`` detaches it.
+        """
+        self.G.graph["distance_store"] = None if store is None else (self.version, store)
+
+    def set_traffic_index(self, index):
+        """Use a prebuilt ``road_key`` -> pattern index (e.g. ``DataLoader.traffic_index``) for ``traffic_patterns``."""
+        self._traffic_index = (self.traffic_patterns, index)
+
+    def _traffic_lookup(self):
+        if self._traffic_index is None or self._traffic_index[0] is not self.traffic_patterns:
+            self.set_traffic_index(build_traffic_index(self.traffic_patterns))
+        return self._traffic_index[1]
 
     def _get_traffic_data(self, from_node, to_node):
         """Helper method to get traffic data for a road"""
-        road1 = f"{from_node}-{to_node}"
-        road2 = f"{to_node}-{from_node}"
-        for pattern in self.traffic_patterns:
-            if pattern["road"] == road1 or pattern["road"] == road2:
-                return pattern
+        pattern = self._traffic_lookup().get(road_key(from_node, to_node))
         # Default traffic values if no specific pattern found
-        return {"morning": 1000, "afternoon": 800, "evening": 900, "night": 500}
\ No newline at end of file
+        return pattern if pattern is not None else dict(DEFAULT_TRAFFIC)
+
+
+def _change_kind(data, attrs):
+    """Classify applying ``attrs`` to a road as "increase", "decrease" or "neutral" for routing."""
+    slower = faster = False
+    for key, value in attrs.items():
+        old = data.get(key)
+        if old is None or old == value:
+            continue
+        if key in SLOWER_WHEN_HIGHER:
+            slower |= value > old
+            faster |= value < old
+        elif key == "capacity":
+            slower |= value < old
+            faster |= value > old
+    return "decrease" if faster else "increase" if slower else "neutral"
\ No newline at end of file
@@ -0,0 +1,357 @@
+import numpy as np
+from .csr_graph import CSRGraph
+
+# Average number of nodes per grid cell
+NODES_PER_CELL = 4
+# Roads whose bounding box covers more cells than this are not bucketed but checked on every query
+MAX_SEGMENT_CELLS = 16
+# Candidate (point, item) pairs held in memory at once by nearest() and snap()
+MAX_CANDIDATE_PAIRS = 2_000_000
+
+
+class GridIndex:
+    """Uniform grid over node positions and road segments, for window (viewport) queries.
+
+    Cells are numbered row-major and bucketed like CSRGraph: the nodes in
+    cell ``c`` are ``node_items[node_offsets[c]:node_offsets[c+1]]``, the
+    roads whose bounding box touches it ``edge_items[edge_offsets[c]:...]``.
+    A window query reads only the cells it overlaps, so its cost follows
+    what is in view, not the size of the network. Node and road numbers
+    are the CSRGraph node indices and positions in ``sources``/``targets``.
+    """
+
+    def __init__(self, xy, sources, targets, cell_size=None, node_ids=None, nodes=None, edges=None):
+        self.xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+        self.node_ids = node_ids
+        self._segment_cache = None
+        # Only these nodes and roads are indexed (all by default); numbering stays global
+        nodes = np.arange(len(self.xy)) if nodes is None else np.asarray(nodes, dtype=np.int64)
+        edges = np.arange(len(self.sources)) if edges is None else np.asarray(edges, dtype=np.int64)
+        self.origin = self.xy.min(axis=0) if len(self.xy) else np.zeros(2)
+        span = (self.xy.max(axis=0) - self.origin) if len(self.xy) else np.zeros(2)
+        if cell_size is None:
+            # A near-flat axis (a corridor) would shrink the cells to slivers: give it a floor
+            count = max(len(nodes) or len(edges), 1)
+            short = max(span.max() / np.sqrt(count), 1e-9)
+            area = max(span[0], short) * max(span[1], short)
+            cell_size = np.sqrt(area * NODES_PER_CELL / count)
+        self.cell_size = float(cell_size) or 1.0
+        self.cols, self.rows = (np.floor(span / self.cell_size).astype(np.int64) + 1).tolist()
+
+        self.node_offsets, self.node_items = self._bucket(self._cells(self.xy[nodes]), nodes)
+
+        # Every road goes into each cell its bounding box covers
+        a, b = self.xy[self.sources[edges]], self.xy[self.targets[edges]]
+        low = self._cell_xy(np.minimum(a, b))
+        high = self._cell_xy(np.maximum(a, b))
+        width = high[:, 0] - low[:, 0] + 1
+        covered = width * (high[:, 1] - low[:, 1] + 1)
+        long = covered > MAX_SEGMENT_CELLS
+        self.long_edges = edges[long]
+        short = np.flatnonzero(~long)
+        counts = covered[short]
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        width = np.repeat(width[short], counts)
+        cx = np.repeat(low[short, 0], counts) + local % width
+        cy = np.repeat(low[short, 1], counts) + local // width
+        self.edge_offsets, self.edge_items = self._bucket(cy * self.cols + cx, np.repeat(edges[short], counts))
+
+    @classmethod
+    def from_csr(cls, csr, cell_size=None):
+        """Index a CSRGraph's ``pos``; each undirected road is indexed once (source < target)."""
+        sources = np.repeat(np.arange(len(csr.node_ids)), np.diff(csr.offsets))
+        once = sources < csr.targets
+        return cls(csr.pos, sources[once], csr.targets[once], cell_size, csr.node_ids)
+
+    def subset(self, nodes=None, edges=None):
+        """Index over some of the nodes and roads only, with the same numbering."""
+        return GridIndex(self.xy, self.sources, self.targets, node_ids=self.node_ids, nodes=nodes, edges=edges)
+
+    def count_in(self, xmin, ymin, xmax, ymax):
+        """Upper bounds of ``(nodes, roads)`` in the window, from the bucket sizes of the cells it overlaps."""
+        nodes = self._window_size(self.node_offsets, xmin, ymin, xmax, ymax)
+        edges = self._window_size(self.edge_offsets, xmin, ymin, xmax, ymax) + len(self.long_edges)
+        return nodes, edges
+
+    def nodes_in(self, xmin, ymin, xmax, ymax):
+        """Indices of the nodes inside the window."""
+        items = self._window(self.node_offsets, self.node_items, xmin, ymin, xmax, ymax)
+        x, y = self.xy[items, 0], self.xy[items, 1]
+        return items[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)]
+
+    def edges_in(self, xmin, ymin, xmax, ymax):
+        """Road numbers whose bounding box meets the window (each once, ascending)."""
+        items = np.concatenate([self._window(self.edge_offsets, self.edge_items, xmin, ymin, xmax, ymax),
+                                self.long_edges])
+        a, b = self.xy[self.sources[items]], self.xy[self.targets[items]]
+        low, high = np.minimum(a, b), np.maximum(a, b)
+        inside = (high[:, 0] >= xmin) & (low[:, 0] <= xmax) & (high[:, 1] >= ymin) & (low[:, 1] <= ymax)
+        return np.unique(items[inside])
+
+    def nearest(self, points, k=1):
+        """Nearest ``k`` nodes of every point in a batch: ``(indices, distances)``.
+
+        points: (lon, lat) pairs. Shapes are (len(points),) for k=1 and
+        (len(points), k) otherwise, closest first; -1 / inf pad when there
+        are fewer than k nodes. Each point searches the cells around its
+        own, widening the block until the k-th candidate is closer than
+        anything outside it, all points of a round at once.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        px, py = points[:, 0].copy(), points[:, 1].copy()
+        x, y = self.xy[:, 0].copy(), self.xy[:, 1].copy()
+
+        def measure(rows, candidates):
+            return (px[rows] - x[candidates]) ** 2 + (py[rows] - y[candidates]) ** 2, None
+
+        found, distance, _ = self._search(points, self.node_offsets, self.node_items, None, k, measure)
+        return (found[:, 0], distance[:, 0]) if k == 1 else (found, distance)
+
+    def snap(self, points):
+        """Closest point on a road for every point in a batch.
+
+        Returns ``(edges, fraction, snapped, distances)``: the road number
+        (-1 if there are no roads), how far along it from ``sources[e]`` to
+        ``targets[e]`` (0..1), the snapped (lon, lat) and the distance to it.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not len(self.sources):
+            q = len(points)
+            return np.full(q, -1, dtype=np.int64), np.zeros(q), np.full((q, 2), np.nan), np.full(q, np.inf)
+        px, py = points[:, 0].copy(), points[:, 1].copy()
+        ax, ay, dx, dy, inverse = self._segment_arrays()
+
+        def measure(rows, candidates):
+            ex, ey = px[rows] - ax[candidates], py[rows] - ay[candidates]
+            sx, sy = dx[candidates], dy[candidates]
+            fraction = ((ex * sx + ey * sy) * inverse[candidates]).clip(0.0, 1.0)
+            ex -= fraction * sx
+            ey -= fraction * sy
+            return ex * ex + ey * ey, fraction
+
+        found, distance, fraction = self._search(points, self.edge_offsets, self.edge_items, self.long_edges, 1,
+                                                 measure)
+        edges, fraction = found[:, 0], fraction[:, 0]
+        a = self.xy[self.sources[edges.clip(0)]]
+        b = self.xy[self.targets[edges.clip(0)]]
+        snapped = np.where((edges >= 0)[:, None], a + fraction[:, None] * (b - a), np.nan)
+        return edges, fraction, snapped, distance[:, 0]
+
+    def _segment_arrays(self):
+        """Start x/y, direction x/y and 1 / squared length of every road, computed once."""
+        if self._segment_cache is None:
+            a, b = self.xy[self.sources], self.xy[self.targets]
+            direction = b - a
+            length = (direction ** 2).sum(axis=1)
+            inverse = np.divide(1.0, length, out=np.zeros_like(length), where=length > 0)
+            self._segment_cache = (a[:, 0].copy(), a[:, 1].copy(), direction[:, 0].copy(), direction[:, 1].copy(),
+                                   inverse)
+        return self._segment_cache
+
+    def segments(self, edges):
+        """``(len(edges), 2, 2)`` end coordinates of roads, for a LineCollection."""
+        return np.stack([self.xy[self.sources[edges]], self.xy[self.targets[edges]]], axis=1)
+
+    def _cell_xy(self, xy):
+        cells = np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, [self.cols - 1, self.rows - 1])
+
+    def _cells(self, xy):
+        cells = self._cell_xy(xy)
+        return cells[:, 1] * self.cols + cells[:, 0]
+
+    def _bucket(self, cells, items):
+        order = np.argsort(cells, kind="stable")
+        offsets = np.zeros(self.rows * self.cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.rows * self.cols), out=offsets[1:])
+        return offsets, items[order]
+
+    def _search(self, points, offsets, items, extra, k, measure):
+        """k closest items per point: grow a (2r+1)^2 block of cells around each point until it is exact.
+
+        ``measure(points, items)`` gives squared distances (and an optional
+        attribute per pair); ``extra`` items (long roads) are candidates of
+        every point. Returns ``(items, distances, attributes)`` of shape
+        (len(points), k). Points far outside the grid need large blocks and
+        are much slower than points among the nodes.
+        """
+        q = len(points)
+        found = np.full((q, k), -1, dtype=np.int64)
+        distance = np.full((q, k), np.inf)
+        attribute = np.zeros((q, k))
+        cells = self._cell_xy(points)
+        todo = np.arange(q)
+        radius = 1
+        while len(todo):
+            # Points far outside the grid need big blocks: bound the pairs held at once
+            extent = 2 * radius + 1
+            per_point = extent * extent * (len(items) / max(self.rows * self.cols, 1) + 1) + len(extra if extra is not None else ())
+            step = max(1, int(MAX_CANDIDATE_PAIRS // per_point))
+            for chunk in range(0, len(todo), step):
+                self._search_block(points, todo[chunk:chunk + step], cells, radius, offsets, items, extra, k, measure,
+                                   found, distance, attribute)
+            todo = todo[distance[todo, k - 1] > self._block_bound(points[todo], cells[todo], radius) ** 2]
+            radius *= 2
+        return found, np.sqrt(distance), attribute
+
+    def _block(self, cells, radius):
+        cx, cy = cells[:, 0], cells[:, 1]
+        return (np.maximum(cx - radius, 0), np.minimum(cx + radius, self.cols - 1),
+                np.maximum(cy - radius, 0), np.minimum(cy + radius, self.rows - 1))
+
+    def _search_block(self, points, todo, cells, radius, offsets, items, extra, k, measure, found, distance, attribute):
+        """Merge the items of each point's block into its k best so far."""
+        c0, c1, r0, r1 = self._block(cells[todo], radius)
+
+        # One run of cells per block row; rows past the grid are empty runs
+        rows = cells[todo, 1][:, None] + np.arange(-radius, radius + 1)
+        valid = (rows >= r0[:, None]) & (rows <= r1[:, None])
+        rows = rows.clip(0, self.rows - 1)
+        start = np.where(valid, offsets[rows * self.cols + c0[:, None]], 0).ravel()
+        end = np.where(valid, offsets[rows * self.cols + c1[:, None] + 1], 0).ravel()
+        sizes = end - start
+        positions = np.repeat(start - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+        owner = np.repeat(np.repeat(np.arange(len(todo)), 2 * radius + 1), sizes)
+        candidates = items[positions]
+        if extra is not None and len(extra):
+            owner = np.concatenate([owner, np.repeat(np.arange(len(todo)), len(extra))])
+            candidates = np.concatenate([candidates, np.tile(extra, len(todo))])
+        d, values = measure(todo[owner], candidates)
+        if k == 1:
+            self._merge_closest(todo, owner, candidates, d, values, found, distance, attribute)
+            return
+
+        # k smallest per point: sort by (point, distance), keep the first k of each
+        order = np.lexsort((d, owner))
+        owner, candidates, d = owner[order], candidates[order], d[order]
+        rank = np.arange(len(owner)) - np.searchsorted(owner, np.arange(len(todo)))[owner]
+        keep = rank < k
+        rows_kept, rank = todo[owner[keep]], rank[keep]
+        found[rows_kept, rank] = candidates[keep]
+        distance[rows_kept, rank] = d[keep]
+        if values is not None:
+            attribute[rows_kept, rank] = values[order][keep]
+
+    @staticmethod
+    def _merge_closest(todo, owner, candidates, d, values, found, distance, attribute):
+        """k=1 without sorting: minimum per point with reduceat over the (grouped) pairs."""
+        if len(owner) and (owner[1:] < owner[:-1]).any():
+            order = np.argsort(owner, kind="stable")
+            owner, candidates, d = owner[order], candidates[order], d[order]
+            values = None if values is None else values[order]
+        counts = np.bincount(owner, minlength=len(todo))
+        present = np.flatnonzero(counts)
+        if not len(present):
+            return
+        starts = (np.cumsum(counts) - counts)[present]
+        best = np.minimum.reduceat(d, starts)
+        hits = np.flatnonzero(d == np.repeat(best, counts[present]))
+        hits = hits[np.searchsorted(owner[hits], present)]     # first minimum of each point
+        rows = todo[present]
+        found[rows, 0] = candidates[hits]
+        distance[rows, 0] = best
+        if values is not None:
+            attribute[rows, 0] = values[hits]
+
+    def _block_bound(self, points, cells, radius):
+        """Distance beyond which items outside each point's block lie (grid edges have nothing beyond)."""
+        c0, c1, r0, r1 = self._block(cells, radius)
+        x, y = points[:, 0], points[:, 1]
+        left = np.where(c0 > 0, x - (self.origin[0] + c0 * self.cell_size), np.inf)
+        right = np.where(c1 < self.cols - 1, self.origin[0] + (c1 + 1) * self.cell_size - x, np.inf)
+        bottom = np.where(r0 > 0, y - (self.origin[1] + r0 * self.cell_size), np.inf)
+        top = np.where(r1 < self.rows - 1, self.origin[1] + (r1 + 1) * self.cell_size - y, np.inf)
+        return np.minimum(np.minimum(left, right), np.minimum(bottom, top))
+
+    def _window_rows(self, xmin, ymin, xmax, ymax):
+        """``(start, end)`` cell numbers of the window in each grid row (one contiguous run per row)."""
+        if xmax < self.origin[0] or ymax < self.origin[1]:
+            return []
+        (c0, r0), (c1, r1) = self._cell_xy(np.array([[xmin, ymin], [xmax, ymax]], dtype=np.float64)).tolist()
+        return [(r * self.cols + c0, r * self.cols + c1 + 1) for r in range(r0, r1 + 1)]
+
+    def _window(self, offsets, items, xmin, ymin, xmax, ymax):
+        runs = self._window_rows(xmin, ymin, xmax, ymax)
+        return np.concatenate([items[offsets[start]:offsets[end]] for start, end in runs] + [items[:0]])
+
+    def _window_size(self, offsets, xmin, ymin, xmax, ymax):
+        return sum(int(offsets[end] - offsets[start]) for start, end in self._window_rows(xmin, ymin, xmax, ymax))
+
+
+class LevelOfDetail:
+    """Nested grid indexes over the most important nodes and roads.
+
+    Level k holds the ``limit * 4**k`` highest-ranked nodes and roads, the
+    last level all of them. A window query answers from the most detailed
+    level that has at most ``limit`` items in view, so zoomed out only the
+    major roads and busiest nodes are returned, zoomed in everything, and
+    a query never touches many more than ``limit`` items.
+    """
+
+    def __init__(self, index, node_order, edge_order, node_limit, edge_limit):
+        self.index = index
+        self.node_limit = node_limit
+        self.edge_limit = edge_limit
+        node_order = np.asarray(node_order, dtype=np.int64)
+        edge_order = np.asarray(edge_order, dtype=np.int64)
+        self.node_levels = self._levels(node_order, node_limit, lambda part: index.subset(nodes=part, edges=[]))
+        self.edge_levels = self._levels(edge_order, edge_limit, lambda part: index.subset(nodes=[], edges=part))
+
+    def nodes_in(self, xmin, ymin, xmax, ymax):
+        level = self._pick(self.node_levels, self.node_limit, 0, xmin, ymin, xmax, ymax)
+        return level.nodes_in(xmin, ymin, xmax, ymax)
+
+    def edges_in(self, xmin, ymin, xmax, ymax):
+        level = self._pick(self.edge_levels, self.edge_limit, 1, xmin, ymin, xmax, ymax)
+        return level.edges_in(xmin, ymin, xmax, ymax)
+
+    def _levels(self, order, limit, build):
+        levels = []
+        size = max(limit, 1)
+        while size < len(order):
+            levels.append(build(order[:size]))
+            size *= 4
+        levels.append(self.index)
+        return levels
+
+    @staticmethod
+    def _pick(levels, limit, which, xmin, ymin, xmax, ymax):
+        for level in reversed(levels):
+            if level.count_in(xmin, ymin, xmax, ymax)[which] <= limit:
+                return level
+        return levels[0]
+
+
+def grid_index(csr):
+    """GridIndex of a CSRGraph, built on first use and kept with the snapshot."""
+    index = csr.__dict__.get("_grid_index")
+    if index is None:
+        index = csr.__dict__["_grid_index"] = GridIndex.from_csr(csr)
+    return index
+
+
+def locate(graph, location):
+    """Node id for ``location``: node ids pass through, (lon, lat) pairs snap to the nearest node.
+
+    Lets the routing entry points take raw coordinates. The index is built
+    once per graph version (CSRGraph snapshot, or networkx graph kept by
+    CairoMap).
+    """
+    if isinstance(location, str) or np.ndim(location) != 1 or len(location) != 2:
+        return location
+    if np.asarray(location).dtype.kind not in "iuf":
+        return location
+    if isinstance(graph, CSRGraph):
+        index = grid_index(graph)
+    else:
+        key = (graph.graph.get("version", 0), graph.number_of_nodes())
+        cached = graph.graph.get("_grid_index")
+        if cached is None or cached[0] != key:
+            ids = [str(node) for node in graph.nodes()]
+            xy = np.array([graph.nodes[node].get("pos", (0, 0)) for node in graph.nodes()], dtype=np.float64)
+            cached = graph.graph["_grid_index"] = (key, GridIndex(xy, [], [], node_ids=ids))
+        index = cached[1]
+    node, _ = index.nearest([location])
+    return index.node_ids[node[0]] if node[0] >= 0 else None
@@ -1,26 +1,29 @@
 import json
+import os
+from .stream_loader import TRANSPORT_SECTIONS, iter_json_sections
 
 class DataLoader:
     def __init__(self, json_filepath):
         self.json_filepath = json_filepath
-        self.data = None
         self.traffic_patterns = []
         self.metro_lines = []
         self.bus_routes = []
         self.public_transport_demand = []
+        self.traffic_index = {}
 
         self.load_data()
 
     def load_data(self):
-        """Load JSON data from file and initialize datasets."""
-        with open(self.json_filepath, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
+        """Load the datasets from the JSON file in one streaming pass.
 
-        # Extract datasets
-        self.traffic_patterns = self.data.get("traffic_patterns", [])
-        self.metro_lines = self.data.get("metro_lines", [])
-        self.bus_routes = self.data.get("bus_routes", [])
-        self.public_transport_demand = self.data.get("public_transport_demand", [])
+        Records go straight into the lists below; the parsed file is never
+        held as a whole.
+        """
+        for section in TRANSPORT_SECTIONS:
+            setattr(self, section, [])
+        for section, record in iter_json_sections(self.json_filepath, TRANSPORT_SECTIONS):
+            getattr(self, section).append(record)
+        self.traffic_index = build_traffic_index(self.traffic_patterns)
 
     def get_traffic_patterns(self):
         """Return the list of traffic patterns."""
@@ -39,11 +42,49 @@ class DataLoader:
         return self.public_transport_demand
 
     def find_traffic_by_road(self, road_id):
-        """Return traffic data for a specific road."""
-        for pattern in self.traffic_patterns:
-            if pattern["road"] == road_id:
-                return pattern
-        return None
+        """Return traffic data for a specific road ("1-3" and "3-1" are the same road)."""
+        return self.traffic_index.get(road_key(*split_road(road_id)))
+
+def split_road(road_id):
+    """Split a ``"from-to"`` road id into its two node ids."""
+    from_node, _, to_node = str(road_id).partition("-")
+    return from_node, to_node
+
+def road_key(from_node, to_node):
+    """Order-insensitive key of the road between two nodes."""
+    from_node, to_node = str(from_node), str(to_node)
+    return (from_node, to_node) if from_node <= to_node else (to_node, from_node)
+
+def build_traffic_index(traffic_patterns):
+    """Map ``road_key`` -> traffic pattern; the first pattern listed for a road wins."""
+    index = {}
+    for pattern in traffic_patterns:
+        index.setdefault(road_key(*split_road(pattern["road"])), pattern)
+    return index
+
+def load_cairo_map(cairo_map, data_dir="data"):
+    """Fill a CairoMap from the JSON files in ``data_dir`` and build its graph."""
+    with open(os.path.join(data_dir, "neighborhoods.json"), 'r', encoding='utf-8') as f:
+        cairo_map.neighborhoods = json.load(f)
+
+    with open(os.path.join(data_dir, "facilities.json"), 'r', encoding='utf-8') as f:
+        cairo_map.facilities = json.load(f)
+
+    with open(os.path.join(data_dir, "roads.json"), 'r', encoding='utf-8') as f:
+        roads_data = json.load(f)
+        cairo_map.existing_roads = roads_data.get("existing_roads", [])
+        cairo_map.new_roads = roads_data.get("new_roads", [])
+
+    transport_loader = DataLoader(os.path.join(data_dir, "transport.json"))
+    cairo_map.traffic_patterns = transport_loader.get_traffic_patterns()
+    cairo_map.metro_lines = transport_loader.get_metro_lines()
+    cairo_map.bus_routes = transport_loader.get_bus_routes()
+    cairo_map.public_transport_demand = transport_loader.get_public_transport_demand()
+    cairo_map.set_traffic_index(transport_loader.traffic_index)
+
+    cairo_map._add_nodes()
+    cairo_map._add_edges()
+    return cairo_map
 
 # Example usage:
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from ..algorithms.travel_matrix import compute_travel_matrix
+
+FORMAT_VERSION = 1
+WEIGHT_TYPES = ("distance", "travel_time")
+MANIFEST = "manifest.json"
+DEFAULT_STORE = "distance_store"
+
+
+def source_checksum(data_dir="data"):
+    """SHA-256 over every JSON file in ``data_dir`` (names and contents)."""
+    digest = hashlib.sha256(f"format={FORMAT_VERSION}".encode())
+    for name in sorted(os.listdir(data_dir)):
+        if not name.endswith(".json"):
+            continue
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(data_dir, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def precompute_distance_store(cairo_map, store_dir, data_dir="data", processes=None):
+    """Write all-pairs distance/travel_time tables and next-hop tables as .npy files.
+
+    ``next_hop_<weight>[s, t]`` is the index of the node after ``s`` on the
+    shortest ``s -> t`` route (``t`` itself when adjacent, -1 if unreachable).
+    The manifest records the node order and the checksum of ``data_dir``.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    csr = cairo_map.freeze()
+    nodes = csr.node_ids
+    for weight_type in WEIGHT_TYPES:
+        matrix, predecessors = compute_travel_matrix(csr, nodes, nodes, weight_type, processes,
+                                                     return_predecessors=True)
+        # Roads are undirected: the predecessor of s in the tree rooted at t is s's next hop to t
+        _save(os.path.join(store_dir, f"{weight_type}.npy"), matrix)
+        _save(os.path.join(store_dir, f"next_hop_{weight_type}.npy"),
+              np.ascontiguousarray(predecessors.T))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "checksum": source_checksum(data_dir),
+        "node_ids": nodes,
+        "weight_types": list(WEIGHT_TYPES),
+    }
+    tmp = os.path.join(store_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(store_dir, MANIFEST))
+
+
+class DistanceStore:
+    """Read-only view of a precomputed store; tables are memory-mapped, not loaded."""
+
+    def __init__(self, store_dir, data_dir="data", verify=True):
+        with open(os.path.join(store_dir, MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Distance store in {store_dir} has an unsupported format")
+        if verify and manifest["checksum"] != source_checksum(data_dir):
+            raise ValueError(f"Distance store in {store_dir} is stale: {data_dir} changed since it was built")
+        self.node_ids = manifest["node_ids"]
+        self.weight_types = list(manifest["weight_types"])
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self._tables = {}
+        self._next_hop = {}
+        for weight_type in manifest["weight_types"]:
+            self._tables[weight_type] = np.load(os.path.join(store_dir, f"{weight_type}.npy"), mmap_mode="r")
+            self._next_hop[weight_type] = np.load(os.path.join(store_dir, f"next_hop_{weight_type}.npy"),
+                                                  mmap_mode="r")
+
+    def lookup(self, source, target, weight_type="distance"):
+        """Shortest ``weight_type`` between two node ids (inf if unreachable)."""
+        return float(self._tables[weight_type][self._index(source), self._index(target)])
+
+    def row(self, source, weight_type="distance"):
+        """Distances from ``source`` to every node, in ``node_ids`` order (zero-copy)."""
+        return self._tables[weight_type][self._index(source)]
+
+    def path(self, source, target, weight_type="distance"):
+        """Return ``(path, length)`` like get_shortest_path_dijkstra, from the next-hop table."""
+        s, t = self._index(source), self._index(target)
+        next_hop = self._next_hop[weight_type]
+        path = [s]
+        while path[-1] != t:
+            hop = int(next_hop[path[-1], t])
+            if hop < 0:
+                return None, float("inf")
+            path.append(hop)
+        return [self.node_ids[i] for i in path], float(self._tables[weight_type][s, t])
+
+    def _index(self, node):
+        i = self.index.get(str(node))
+        if i is None:
+            raise KeyError(f"Node {node} is not in the distance store")
+        return i
+
+
+def attach_distance_store(cairo_map, data_dir="data", store_dir=None):
+    """Let ``cairo_map`` answer routes from the store in ``store_dir``, if there is a current one.
+
+    A missing store, or one built from different ``data_dir`` files (the
+    checksum check), leaves the map searching as usual. Returns the store or None.
+    """
+    store_dir = store_dir or os.path.join(data_dir, DEFAULT_STORE)
+    if not os.path.exists(os.path.join(store_dir, MANIFEST)):
+        return None
+    try:
+        store = DistanceStore(store_dir, data_dir)
+    except ValueError as e:
+        print(f"Distance store not used ({e})")
+        return None
+    cairo_map.set_distance_store(store)
+    return store
+
+
+def _save(filepath, array):
+    tmp = filepath + ".tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, filepath)
+
+
+# Usage: python -m core.services.distance_store [--data data] [--out data/distance_store]
+if __name__ == "__main__":
+    import argparse
+    from ..models.data_module import CairoMap
+    from .data_loader import load_cairo_map
+
+    parser = argparse.ArgumentParser(description="Precompute the all-pairs distance store")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--out", default=os.path.join("data", DEFAULT_STORE))
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    cairo_map = load_cairo_map(CairoMap(), args.data)
+    precompute_distance_store(cairo_map, args.out, args.data, args.processes)
+    print(f"Distance store for {cairo_map.G.number_of_nodes()} nodes written to {args.out}")
@@ -0,0 +1,311 @@
+import json
+import os
+import struct
+
+import numpy as np
+from ..models.csr_graph import CSRGraph
+from ..models.data_module import CairoMap
+from .data_loader import load_cairo_map
+from .distance_store import source_checksum
+
+MAGIC = b"CAIRONET"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DEFAULT_SNAPSHOT = "network.snapshot"
+SEPARATOR = "\x1f"
+
+NODE_TYPES = ("neighborhood", "facility")
+ROAD_TYPES = ("existing", "proposed")
+EDGE_COLUMNS = ("distance", "capacity", "condition", "cost", "morning_traffic", "afternoon_traffic",
+                "evening_traffic", "night_traffic", "avg_traffic", "travel_time")
+# Columns stored as float64 that hold integers in the JSON files
+INTEGER_COLUMNS = ("capacity", "condition", "cost", "morning_traffic", "afternoon_traffic",
+                   "evening_traffic", "night_traffic")
+
+
+def compile_snapshot(data_dir="data", snapshot_path=None):
+    """Compile ``data_dir/*.json`` into one versioned binary network snapshot.
+
+    Layout: magic, format version, header length, JSON header (array table,
+    source fingerprint, transit data), then 64-byte aligned raw arrays:
+    columnar node and edge attributes (edge travel_time/avg_traffic already
+    computed) and separator-joined string tables.
+    """
+    snapshot_path = snapshot_path or os.path.join(data_dir, DEFAULT_SNAPSHOT)
+    cairo_map = load_cairo_map(CairoMap(), data_dir)
+    graph = cairo_map.G
+    nodes = list(graph.nodes(data=True))
+    index = {node: i for i, (node, _) in enumerate(nodes)}
+    edges = list(graph.edges(data=True))
+
+    arrays = {
+        "node_x": np.array([data.get("pos", (0, 0))[0] for _, data in nodes], dtype=np.float64),
+        "node_y": np.array([data.get("pos", (0, 0))[1] for _, data in nodes], dtype=np.float64),
+        "node_population": np.array([data.get("population", -1) for _, data in nodes], dtype=np.int64),
+        "node_importance": np.array([data.get("importance", 0) for _, data in nodes], dtype=np.float64),
+        "node_kind": np.array([NODE_TYPES.index(data.get("node_type", "neighborhood")) for _, data in nodes],
+                              dtype=np.uint8),
+        "edge_from": np.array([index[u] for u, _, _ in edges], dtype=np.int64),
+        "edge_to": np.array([index[v] for _, v, _ in edges], dtype=np.int64),
+        "edge_kind": np.array([ROAD_TYPES.index(data.get("road_type", "existing")) for _, _, data in edges],
+                              dtype=np.uint8),
+    }
+    for column in EDGE_COLUMNS:
+        arrays[f"edge_{column}"] = np.array([data.get(column, np.nan) for _, _, data in edges], dtype=np.float64)
+    for name, values in (("node_ids", [node for node, _ in nodes]),
+                         ("node_names", [data.get("name", node) for node, data in nodes]),
+                         ("node_types", [data.get("type", "") for _, data in nodes]),
+                         ("traffic_roads", [p["road"] for p in cairo_map.traffic_patterns])):
+        arrays[f"{name}_text"] = np.frombuffer(SEPARATOR.join(values).encode("utf-8"), dtype=np.uint8)
+    # The raw road lists are kept separately: the graph merges duplicate roads
+    roads = ([("existing", r["from_id"], r["to_id"], r["distance_km"], r["capacity"], r["condition"])
+              for r in cairo_map.existing_roads] +
+             [("proposed", r["from"], r["to"], r["distance"], r["capacity"], r["cost"])
+              for r in cairo_map.new_roads])
+    arrays["road_kind"] = np.array([ROAD_TYPES.index(r[0]) for r in roads], dtype=np.uint8)
+    arrays["road_from_text"] = np.frombuffer(SEPARATOR.join(str(r[1]) for r in roads).encode("utf-8"), np.uint8)
+    arrays["road_to_text"] = np.frombuffer(SEPARATOR.join(str(r[2]) for r in roads).encode("utf-8"), np.uint8)
+    arrays["road_distance"] = np.array([r[3] for r in roads], dtype=np.float64)
+    arrays["road_capacity"] = np.array([r[4] for r in roads], dtype=np.float64)
+    arrays["road_extra"] = np.array([r[5] for r in roads], dtype=np.float64)
+    for period in ("morning", "afternoon", "evening", "night"):
+        arrays[f"traffic_{period}"] = np.array([p[period] for p in cairo_map.traffic_patterns], dtype=np.float64)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "sources": _source_stats(data_dir),
+        "checksum": source_checksum(data_dir),
+        "num_nodes": len(nodes),
+        "num_edges": len(edges),
+        "num_roads": len(roads),
+        "num_traffic_patterns": len(cairo_map.traffic_patterns),
+        "transit": {
+            "metro_lines": cairo_map.metro_lines,
+            "bus_routes": cairo_map.bus_routes,
+            "public_transport_demand": cairo_map.public_transport_demand,
+        },
+        "arrays": {},
+    }
+    # Array offsets are relative to the aligned end of the header
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += _aligned(array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp = snapshot_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, array in arrays.items():
+            f.write(np.ascontiguousarray(array).tobytes())
+            f.write(b"\0" * (_aligned(array.nbytes) - array.nbytes))
+    os.replace(tmp, snapshot_path)
+    return snapshot_path
+
+
+def read_header(snapshot_path):
+    """Header of a snapshot and where its arrays start: ``(header, data_start)``; maps nothing."""
+    with open(snapshot_path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{snapshot_path} is not a network snapshot")
+        version, header_length = struct.unpack("<II", f.read(8))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{snapshot_path} has snapshot format {version}, expected {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    return header, _aligned(len(MAGIC) + 8 + header_length)
+
+
+def read_snapshot(snapshot_path):
+    """Memory-map a snapshot; returns ``(header, {name: array})``."""
+    header, data_start = read_header(snapshot_path)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            arrays[name] = np.memmap(snapshot_path, dtype=spec["dtype"], mode="r",
+                                     offset=data_start + spec["offset"], shape=shape)
+    return header, arrays
+
+
+def is_stale(header, data_dir="data"):
+    """True if a source JSON file changed since the snapshot was compiled.
+
+    File sizes and modification times are compared first; only when they
+    differ is the content checksum recomputed.
+    """
+    if header["sources"] == _source_stats(data_dir):
+        return False
+    return header["checksum"] != source_checksum(data_dir)
+
+
+def load_snapshot(cairo_map, data_dir="data", snapshot_path=None):
+    """Fill ``cairo_map`` from the compiled snapshot, recompiling it first if missing or stale.
+
+    Staleness is decided from the header alone, so no array of the old
+    file is mapped while it is replaced (Windows refuses to replace a
+    mapped file). The CSR snapshot (``freeze``) is built straight from the
+    mapped columns; the networkx graph and the raw record lists are only
+    built from them when first read (``CairoMap.defer``).
+    """
+    snapshot_path = snapshot_path or os.path.join(data_dir, DEFAULT_SNAPSHOT)
+    if not os.path.exists(snapshot_path) or is_stale(read_header(snapshot_path)[0], data_dir):
+        compile_snapshot(data_dir, snapshot_path)
+    header, arrays = read_snapshot(snapshot_path)
+    node_ids = _strings(arrays["node_ids_text"], header["num_nodes"])
+
+    cairo_map.metro_lines = header["transit"]["metro_lines"]
+    cairo_map.bus_routes = header["transit"]["bus_routes"]
+    cairo_map.public_transport_demand = header["transit"]["public_transport_demand"]
+    cairo_map._record_change(None, None, "decrease")
+    cairo_map._snapshot = _csr_from_columns(node_ids, arrays, cairo_map.version)
+    cairo_map.defer_graph(lambda graph: _fill_graph(graph, header, arrays, node_ids))
+    cairo_map.defer(neighborhoods=lambda: _neighborhoods(header, arrays, node_ids),
+                    facilities=lambda: _facilities(header, arrays, node_ids),
+                    existing_roads=lambda: _roads(header, arrays, 0),
+                    new_roads=lambda: _roads(header, arrays, 1),
+                    traffic_patterns=lambda: _traffic_patterns(header, arrays))
+    return cairo_map
+
+
+def _node_columns(header, arrays, kind):
+    """Rows of nodes of one NODE_TYPES kind: ``(rows, names, types, xs, ys, population)``."""
+    rows = np.flatnonzero(arrays["node_kind"] == kind)
+    names = _strings(arrays["node_names_text"], header["num_nodes"])
+    types = _strings(arrays["node_types_text"], header["num_nodes"])
+    return (rows.tolist(), names, types, arrays["node_x"][rows].tolist(), arrays["node_y"][rows].tolist(),
+            arrays["node_population"][rows].tolist())
+
+
+def _neighborhoods(header, arrays, node_ids):
+    rows, names, types, xs, ys, population = _node_columns(header, arrays, 0)
+    return [{"ID": _raw_id(node_ids[i]), "Name": names[i], "Population": population[k], "Type": types[i],
+             "X": xs[k], "Y": ys[k]} for k, i in enumerate(rows)]
+
+
+def _facilities(header, arrays, node_ids):
+    rows, names, types, xs, ys, _ = _node_columns(header, arrays, 1)
+    return [{"id": node_ids[i], "name": names[i], "type": types[i], "longitude": xs[k], "latitude": ys[k]}
+            for k, i in enumerate(rows)]
+
+
+def _fill_graph(graph, header, arrays, node_ids):
+    """Add the snapshot's nodes and roads, with their attributes, to an empty networkx graph."""
+    names = _strings(arrays["node_names_text"], header["num_nodes"])
+    types = _strings(arrays["node_types_text"], header["num_nodes"])
+    xs, ys = arrays["node_x"].tolist(), arrays["node_y"].tolist()
+    population = arrays["node_population"].tolist()
+    importance = arrays["node_importance"].tolist()
+    kinds = arrays["node_kind"].tolist()
+    nodes = []
+    for i, node in enumerate(node_ids):
+        attrs = {"name": names[i], "type": types[i], "pos": (xs[i], ys[i]), "node_type": NODE_TYPES[kinds[i]]}
+        if kinds[i] == 0:
+            attrs["population"] = population[i]
+            attrs["importance"] = importance[i]
+        else:
+            attrs["importance"] = _number(importance[i])   # integer, stored in the float column
+        nodes.append((node, attrs))
+    graph.add_nodes_from(nodes)
+
+    columns = {column: arrays[f"edge_{column}"].tolist() for column in EDGE_COLUMNS}
+    for column in INTEGER_COLUMNS:
+        columns[column] = [_number(value) for value in columns[column]]
+    columns = [(column, values) for column, values in columns.items()]
+    edge_from = arrays["edge_from"].tolist()
+    edge_to = arrays["edge_to"].tolist()
+    edge_kind = arrays["edge_kind"].tolist()
+    edges = []
+    for k in range(header["num_edges"]):
+        attrs = {column: values[k] for column, values in columns if values[k] == values[k]}
+        attrs["road_type"] = ROAD_TYPES[edge_kind[k]]
+        edges.append((node_ids[edge_from[k]], node_ids[edge_to[k]], attrs))
+    graph.add_edges_from(edges)
+
+
+def _roads(header, arrays, kind):
+    """Raw ``existing_roads`` (kind 0) or ``new_roads`` (kind 1) records."""
+    rows = np.flatnonzero(arrays["road_kind"] == kind)
+    road_from = _strings(arrays["road_from_text"], header["num_roads"])
+    road_to = _strings(arrays["road_to_text"], header["num_roads"])
+    distance = arrays["road_distance"][rows].tolist()
+    capacity = arrays["road_capacity"][rows].tolist()
+    extra = arrays["road_extra"][rows].tolist()
+    if kind == 0:
+        return [{"from_id": _raw_id(road_from[i]), "to_id": _raw_id(road_to[i]), "distance_km": distance[k],
+                 "capacity": _number(capacity[k]), "condition": _number(extra[k])} for k, i in enumerate(rows.tolist())]
+    return [{"from": _raw_id(road_from[i]), "to": _raw_id(road_to[i]), "distance": distance[k],
+             "capacity": _number(capacity[k]), "cost": _number(extra[k])} for k, i in enumerate(rows.tolist())]
+
+
+def _traffic_patterns(header, arrays):
+    roads = _strings(arrays["traffic_roads_text"], header["num_traffic_patterns"])
+    periods = {p: arrays[f"traffic_{p}"].tolist() for p in ("morning", "afternoon", "evening", "night")}
+    return [dict({"road": road}, **{p: _number(values[i]) for p, values in periods.items()})
+            for i, road in enumerate(roads)]
+
+
+def _csr_from_columns(node_ids, arrays, version):
+    """Build the CSR snapshot straight from the edge columns, skipping the networkx walk."""
+    n = len(node_ids)
+    sources = np.concatenate([arrays["edge_from"], arrays["edge_to"]])
+    targets = np.concatenate([arrays["edge_to"], arrays["edge_from"]])
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    weights = {}
+    for column in EDGE_COLUMNS:
+        if column in ("condition", "cost"):
+            continue
+        values = np.concatenate([arrays[f"edge_{column}"]] * 2)[order]
+        if not np.isnan(values).all():
+            weights[column] = values
+    pos = np.stack([arrays["node_x"], arrays["node_y"]], axis=1)
+    return CSRGraph(node_ids, offsets, targets[order], weights, pos, version=version)
+
+
+def _source_stats(data_dir):
+    stats = {}
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith(".json"):
+            st = os.stat(os.path.join(data_dir, name))
+            stats[name] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def _strings(blob, count):
+    if count == 0:
+        return []
+    return blob.tobytes().decode("utf-8").split(SEPARATOR)
+
+
+def _raw_id(node):
+    return int(node) if node.isdigit() else node
+
+
+def _number(value):
+    return int(value) if value == value and float(value).is_integer() else value
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+# Usage: python -m core.services.network_snapshot [--data data] [--out data/network.snapshot]
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Compile data/*.json into a binary network snapshot")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = compile_snapshot(args.data, args.out)
+    print(f"Snapshot written to {path} in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+import re
+from itertools import groupby
+from operator import itemgetter
+
+# Characters read from disk per refill of the parse buffer
+CHUNK_SIZE = 1 << 16
+
+TRANSPORT_SECTIONS = ("traffic_patterns", "metro_lines", "bus_routes", "public_transport_demand")
+
+_WHITESPACE = re.compile(r"\s*")
+_DECODER = json.JSONDecoder()
+
+
+class _JsonStream:
+    """Cursor over a JSON text that is read from ``file`` one chunk at a time.
+
+    Only the part of the text that has not been consumed yet is buffered, so
+    an array can be walked element by element without loading the whole file.
+    """
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self._file = file
+        self._chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read(self):
+        text = self._file.read(self._chunk_size)
+        if not text:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it ('' at the end of the input)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found or 'end of input'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value at the cursor."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read()
+
+    def items(self):
+        """Yield the elements of the array at the cursor."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {separator or 'end of input'!r}")
+
+    def keys(self):
+        """Yield the keys of the object at the cursor; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON object, found {separator or 'end of input'!r}")
+
+    def skip(self):
+        """Consume the value at the cursor; arrays are walked so they never sit in memory whole."""
+        if self.peek() == "[":
+            for _ in self.items():
+                pass
+        else:
+            self.value()
+
+
+def iter_json_array(filepath, key=None, chunk_size=CHUNK_SIZE):
+    """Yield the records of a JSON array one at a time.
+
+    key: name of the array inside a top-level object (e.g. "traffic_patterns"
+    in transport.json); None when the file itself is an array
+    (neighborhoods.json, facilities.json). A missing key yields nothing.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        if key is None:
+            yield from stream.items()
+            return
+        for name in stream.keys():
+            if name == key and stream.peek() == "[":
+                yield from stream.items()
+                return
+            stream.skip()
+
+
+def iter_json_sections(filepath, keys=None, chunk_size=CHUNK_SIZE):
+    """Yield ``(section, record)`` for every array of a top-level JSON object in one pass.
+
+    keys: only these sections (others are skipped without being kept).
+    Non-array values are skipped.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        for name in stream.keys():
+            if stream.peek() == "[" and (keys is None or name in keys):
+                for record in stream.items():
+                    yield name, record
+            else:
+                stream.skip()
+
+
+def iter_ndjson(filepath):
+    """Yield one record per non-blank line of a newline-delimited JSON file."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_csv(filepath):
+    """Yield one dict per CSV row, with numbers and JSON lists/objects decoded.
+
+    e.g. a traffic export with the columns road,morning,afternoon,evening,night.
+    """
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            yield {column: _csv_value(value) for column, value in row.items()}
+
+
+def iter_records(filepath, key=None):
+    """Records of ``filepath`` by extension: .ndjson/.jsonl, .csv, otherwise a JSON array."""
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return iter_ndjson(filepath)
+    if extension == ".csv":
+        return iter_csv(filepath)
+    return iter_json_array(filepath, key)
+
+
+def stream_cairo_map(cairo_map, data_dir="data", keep_records=True):
+    """Fill a CairoMap from ``data_dir`` without loading any JSON file whole.
+
+    Same result as ``load_cairo_map``, but records go straight from the
+    parser into the map (see ``CairoMap.consume``). Traffic is read before the
+    roads so every edge gets its counts as it is added.
+    keep_records=False leaves the raw neighborhoods/facilities/roads lists
+    empty and keeps only the graph.
+    """
+    cairo_map.consume("neighborhoods", iter_json_array(os.path.join(data_dir, "neighborhoods.json")), keep_records)
+    cairo_map.consume("facilities", iter_json_array(os.path.join(data_dir, "facilities.json")), keep_records)
+    for path, keys in ((os.path.join(data_dir, "transport.json"), TRANSPORT_SECTIONS),
+                       (os.path.join(data_dir, "roads.json"), ("existing_roads", "new_roads"))):
+        for section, records in groupby(iter_json_sections(path, keys), key=itemgetter(0)):
+            cairo_map.consume(section, (record for _, record in records), keep_records)
+    return cairo_map
+
+
+def _csv_value(value):
+    if value is None or value == "":
+        return value
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    if value[0] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
@@ -0,0 +1,308 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+# Layout: a jittered street lattice clipped to a disc around downtown Cairo
+CAIRO_CENTER = (31.24, 30.04)
+BLOCK_DEGREES = 0.004          # ~400 m between neighbouring intersections
+KM_PER_DEGREE = (96.4, 110.9)  # longitude, latitude at Cairo's latitude
+ARTERIAL_EVERY = 8             # every 8th lattice row/column is an arterial road
+CITY_POPULATION = 20_000_000
+
+AREA_TYPES = ("Residential", "Mixed", "Business", "Industrial", "Government")
+CENTRAL_AREA_WEIGHTS = (0.20, 0.30, 0.35, 0.00, 0.15)
+OUTER_AREA_WEIGHTS = (0.55, 0.20, 0.10, 0.15, 0.00)
+FACILITY_TYPES = ("Medical", "Education", "Commercial", "Transit Hub", "Business",
+                  "Sports", "Tourism", "Airport")
+FACILITY_WEIGHTS = (0.30, 0.25, 0.15, 0.10, 0.08, 0.06, 0.05, 0.01)
+
+# Share of the morning peak seen in the other periods
+PERIOD_FACTORS = {"morning": 1.0, "afternoon": 0.55, "evening": 0.9, "night": 0.25}
+
+
+def generate_network(num_nodes, seed=0):
+    """Build a Cairo-like dataset with ``num_nodes`` intersections (neighborhoods + facilities).
+
+    Returns a dict with the same sections as the files in data/:
+    ``neighborhoods``, ``facilities``, ``existing_roads``, ``new_roads``,
+    ``traffic_patterns``, ``metro_lines``, ``bus_routes`` and
+    ``public_transport_demand``. Every section except the transit lines is
+    a generator, so :func:`write_dataset` can stream millions of records
+    straight to disk.
+    """
+    if num_nodes < 10:
+        raise ValueError("num_nodes must be at least 10")
+    rng = np.random.default_rng(seed)
+
+    cells = _disc_cells(num_nodes)
+    radius = np.hypot(cells[:, 0], cells[:, 1])
+    centrality = np.exp(-radius / max(radius.max() / 2.5, 1.0))
+    xy = np.empty((num_nodes, 2))
+    xy[:, 0] = CAIRO_CENTER[0] + (cells[:, 0] + rng.uniform(-0.3, 0.3, num_nodes)) * BLOCK_DEGREES
+    xy[:, 1] = CAIRO_CENTER[1] + (cells[:, 1] + rng.uniform(-0.3, 0.3, num_nodes)) * BLOCK_DEGREES
+
+    num_facilities = max(3, num_nodes // 100)
+    is_facility = np.zeros(num_nodes, dtype=bool)
+    is_facility[rng.choice(num_nodes, num_facilities, replace=False)] = True
+    ids = np.empty(num_nodes, dtype=object)
+    ids[~is_facility] = np.arange(1, num_nodes - num_facilities + 1)
+    ids[is_facility] = [f"F{k}" for k in range(1, num_facilities + 1)]
+    ids = ids.tolist()
+
+    lookup = _CellLookup(cells)
+    u, v, arterial = _street_edges(cells, lookup, is_facility, rng)
+    capacity = np.where(arterial, rng.integers(38, 51, len(u)) * 100, rng.integers(12, 31, len(u)) * 100)
+    distance = _road_km(xy[u], xy[v], rng)
+    load = 0.55 + 0.4 * (centrality[u] + centrality[v]) / 2
+    morning = capacity * load * rng.uniform(0.85, 1.15, len(u))
+    population = _population(num_nodes - num_facilities, centrality[~is_facility], rng)
+
+    return {
+        "neighborhoods": _neighborhoods(ids, xy, is_facility, centrality, population, rng),
+        "facilities": _facilities(ids, xy, is_facility, rng),
+        "existing_roads": ({"from_id": ids[a], "to_id": ids[b], "distance_km": d, "capacity": c,
+                            "condition": k}
+                           for a, b, d, c, k in zip(u.tolist(), v.tolist(), distance.tolist(),
+                                                    capacity.tolist(), rng.integers(3, 11, len(u)).tolist())),
+        "new_roads": _new_roads(ids, cells, xy, lookup, set(zip(u.tolist(), v.tolist())), rng),
+        "traffic_patterns": ({"road": f"{ids[a]}-{ids[b]}",
+                              **{period: int(m * factor) for period, factor in PERIOD_FACTORS.items()}}
+                             for a, b, m in zip(u.tolist(), v.tolist(), morning.tolist())),
+        "metro_lines": _metro_lines(ids, cells, lookup, rng),
+        "bus_routes": _bus_routes(ids, cells, lookup, rng),
+        "public_transport_demand": _demand(ids, is_facility, population, rng),
+    }
+
+
+def write_dataset(out_dir, num_nodes, seed=0):
+    """Write neighborhoods.json, facilities.json, roads.json and transport.json to ``out_dir``.
+
+    Records are written one per line as they are generated. Returns the
+    number of records written per section.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    network = generate_network(num_nodes, seed)
+    counts = {}
+    for filename, sections in (("neighborhoods.json", None), ("facilities.json", None),
+                               ("roads.json", ("existing_roads", "new_roads")),
+                               ("transport.json", ("traffic_patterns", "metro_lines", "bus_routes",
+                                                   "public_transport_demand"))):
+        with open(os.path.join(out_dir, filename), 'w', encoding='utf-8') as f:
+            if sections is None:
+                section = filename[:-len(".json")]
+                counts[section] = _write_array(f, network[section], "")
+                f.write("\n")
+                continue
+            f.write("{\n")
+            for i, section in enumerate(sections):
+                f.write(f'  "{section}": ')
+                counts[section] = _write_array(f, network[section], "  ")
+                f.write(",\n" if i < len(sections) - 1 else "\n")
+            f.write("}\n")
+    return counts
+
+
+def _write_array(f, records, indent):
+    count = 0
+    f.write("[")
+    for record in records:
+        f.write(",\n" if count else "\n")
+        f.write(indent + "  " + json.dumps(record, ensure_ascii=False))
+        count += 1
+    f.write(f"\n{indent}]" if count else "]")
+    return count
+
+
+def _disc_cells(num_nodes):
+    """The ``num_nodes`` lattice cells closest to the origin, ordered by distance."""
+    half = math.ceil(math.sqrt(num_nodes / math.pi)) + 2
+    axis = np.arange(-half, half + 1)
+    gx, gy = np.meshgrid(axis, axis, indexing="ij")
+    cells = np.stack([gx.ravel(), gy.ravel()], axis=1)
+    order = np.argsort(cells[:, 0]**2 + cells[:, 1]**2, kind="stable")
+    return cells[order[:num_nodes]]
+
+
+class _CellLookup:
+    """Vectorised lattice cell -> node index lookup (-1 where there is no node)."""
+
+    def __init__(self, cells):
+        self._offset = int(np.abs(cells).max()) + 8
+        self._width = 2 * self._offset + 1
+        keys = self._keys(cells)
+        self._order = np.argsort(keys)
+        self._sorted = keys[self._order]
+
+    def _keys(self, cells):
+        return (cells[:, 0] + self._offset) * self._width + (cells[:, 1] + self._offset)
+
+    def __call__(self, cells):
+        cells = np.atleast_2d(cells)
+        inside = (np.abs(cells) < self._offset).all(axis=1)
+        keys = self._keys(np.where(inside[:, None], cells, 0))
+        pos = np.minimum(np.searchsorted(self._sorted, keys), len(self._sorted) - 1)
+        found = inside & (self._sorted[pos] == keys)
+        return np.where(found, self._order[pos], -1)
+
+
+def _street_edges(cells, lookup, is_facility, rng):
+    """Lattice streets (a random spanning tree plus most other blocks) and a few diagonals.
+
+    Like data/roads.json, facilities only connect to neighborhoods.
+    """
+    sources, targets = [], []
+    for step in ((1, 0), (0, 1)):
+        neighbor = lookup(cells + np.array(step))
+        present = (neighbor >= 0) & ~(is_facility & is_facility[neighbor])
+        sources.append(np.nonzero(present)[0])
+        targets.append(neighbor[present])
+    u = np.concatenate(sources)
+    v = np.concatenate(targets)
+    arterial = (cells[u, 0] % ARTERIAL_EVERY == 0) & (cells[v, 0] % ARTERIAL_EVERY == 0) \
+        | (cells[u, 1] % ARTERIAL_EVERY == 0) & (cells[v, 1] % ARTERIAL_EVERY == 0)
+
+    # Keep the network connected: a random spanning tree always stays
+    parent = list(range(len(cells)))
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    order = rng.permutation(len(u))
+    in_tree = np.zeros(len(u), dtype=bool)
+    for k, a, b in zip(order.tolist(), u[order].tolist(), v[order].tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+            in_tree[k] = True
+    keep = in_tree | arterial | (rng.random(len(u)) < 0.75)
+
+    diagonal = lookup(cells + np.array((1, 1)))
+    with_diagonal = np.nonzero((diagonal >= 0) & ~(is_facility & is_facility[diagonal])
+                               & (rng.random(len(cells)) < 0.08))[0]
+    u = np.concatenate([u[keep], with_diagonal])
+    v = np.concatenate([v[keep], diagonal[with_diagonal]])
+    arterial = np.concatenate([arterial[keep], np.zeros(len(with_diagonal), dtype=bool)])
+    return u, v, arterial
+
+
+def _road_km(a, b, rng):
+    dx = (a[:, 0] - b[:, 0]) * KM_PER_DEGREE[0]
+    dy = (a[:, 1] - b[:, 1]) * KM_PER_DEGREE[1]
+    # Streets are never perfectly straight
+    return np.round(np.maximum(np.hypot(dx, dy) * rng.uniform(1.05, 1.3, len(a)), 0.1), 2)
+
+
+def _population(count, centrality, rng):
+    weight = rng.lognormal(0.0, 0.6, count) * (0.5 + 1.5 * centrality)
+    return np.maximum(np.round(weight / weight.sum() * CITY_POPULATION, -2), 100).astype(np.int64)
+
+
+def _neighborhoods(ids, xy, is_facility, centrality, population, rng):
+    rows = np.nonzero(~is_facility)[0]
+    central = centrality[rows] > 0.6
+    types = np.where(central,
+                     rng.choice(len(AREA_TYPES), len(rows), p=CENTRAL_AREA_WEIGHTS),
+                     rng.choice(len(AREA_TYPES), len(rows), p=OUTER_AREA_WEIGHTS))
+    for i, kind, people in zip(rows.tolist(), types.tolist(), population.tolist()):
+        yield {"ID": ids[i], "Name": f"District {ids[i]}", "Population": people,
+               "Type": AREA_TYPES[kind], "X": round(xy[i, 0], 5), "Y": round(xy[i, 1], 5)}
+
+
+def _facilities(ids, xy, is_facility, rng):
+    rows = np.nonzero(is_facility)[0]
+    types = rng.choice(len(FACILITY_TYPES), len(rows), p=FACILITY_WEIGHTS)
+    for i, kind in zip(rows.tolist(), types.tolist()):
+        yield {"id": ids[i], "name": f"{FACILITY_TYPES[kind]} {ids[i]}", "type": FACILITY_TYPES[kind],
+               "longitude": round(xy[i, 0], 5), "latitude": round(xy[i, 1], 5)}
+
+
+def _new_roads(ids, cells, xy, lookup, existing, rng):
+    """Proposed bypasses between intersections a few blocks apart."""
+    count = max(5, len(ids) // 50)
+    start = rng.integers(0, len(ids), count)
+    offsets = rng.integers(2, 6, (count, 2)) * rng.choice((-1, 1), (count, 2))
+    end = lookup(cells[start] + offsets)
+    distance = _road_km(xy[start], xy[np.maximum(end, 0)], rng)
+    capacity = rng.integers(30, 46, count) * 100
+    seen = set()
+    for a, b, d, c in zip(start.tolist(), end.tolist(), distance.tolist(), capacity.tolist()):
+        key = (min(a, b), max(a, b))
+        if b < 0 or key in seen or key in existing:
+            continue
+        seen.add(key)
+        yield {"from": ids[a], "to": ids[b], "distance": d, "capacity": c,
+               "cost": int(d * rng.uniform(18, 22))}
+
+
+def _line_stops(ids, cells, lookup, start, end, spacing):
+    """Node ids sampled every ``spacing`` cells along the straight line ``start`` -> ``end``."""
+    steps = max(2, int(np.hypot(*(end - start)) / spacing) + 1)
+    points = np.rint(start + np.linspace(0.0, 1.0, steps)[:, None] * (end - start)).astype(np.int64)
+    stops = []
+    for i in lookup(points).tolist():
+        if i >= 0 and (not stops or stops[-1] != ids[i]):
+            stops.append(ids[i])
+    return stops
+
+
+def _metro_lines(ids, cells, lookup, rng):
+    """Straight lines through downtown at evenly spread angles."""
+    count = int(np.clip(3 + math.log2(max(len(ids) / 1000, 1)), 3, 12))
+    reach = np.abs(cells).max() * 0.9
+    lines = []
+    for k in range(count):
+        angle = math.pi * k / count + rng.uniform(-0.1, 0.1)
+        direction = np.array((math.cos(angle), math.sin(angle))) * reach
+        stations = _line_stops(ids, cells, lookup, -direction, direction, max(reach / 8, 2))
+        lines.append({"line_id": f"M{k + 1}", "name": f"Line {k + 1}", "stations": stations,
+                      "daily_passengers": int(rng.uniform(4, 16)) * 100000})
+    return lines
+
+
+def _bus_routes(ids, cells, lookup, rng):
+    count = max(10, len(ids) // 100)
+    start = cells[rng.integers(0, len(cells), count)]
+    end = start + rng.integers(-30, 31, (count, 2))
+    routes = []
+    for k in range(count):
+        stops = _line_stops(ids, cells, lookup, start[k], end[k], rng.uniform(2, 5))
+        if len(stops) < 2:
+            continue
+        buses = int(rng.integers(10, 36))
+        routes.append({"route_id": f"B{k + 1}", "stops": stops, "buses_assigned": buses,
+                       "daily_passengers": buses * int(rng.integers(12, 16)) * 100})
+    return routes
+
+
+def _demand(ids, is_facility, population, rng):
+    """Origin-destination pairs drawn by population, 30% of them to facilities."""
+    neighborhoods = np.nonzero(~is_facility)[0]
+    facilities = np.nonzero(is_facility)[0]
+    count = max(20, len(ids) // 10)
+    origins = rng.choice(neighborhoods, count, p=population / population.sum())
+    to_facility = rng.random(count) < 0.3
+    destinations = np.where(to_facility, rng.choice(facilities, count), rng.choice(neighborhoods, count))
+    passengers = np.round(rng.lognormal(np.log(15000), 0.5, count), -3).astype(np.int64)
+    for a, b, p in zip(origins.tolist(), destinations.tolist(), passengers.tolist()):
+        if a != b:
+            yield {"from_id": ids[a], "to_id": ids[b], "daily_passengers": p}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Cairo-like dataset in the data/*.json schema.")
+    parser.add_argument("--nodes", type=int, default=1000, help="number of intersections (10^3 .. 10^6)")
+    parser.add_argument("--out", required=True, help="directory to write the four JSON files to")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    counts = write_dataset(args.out, args.nodes, args.seed)
+    print(", ".join(f"{section}: {count}" for section, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,48 @@ from tkinter import ttk, messagebox, simpledialog
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import networkx as nx
-import contextily as ctx
+import numpy as np
 from matplotlib.patches import Patch
 from matplotlib.lines import Line2D
-import contextily as ctx
+from matplotlib.legend import Legend
 from core.algorithms import (
     get_shortest_path_dijkstra,
     get_shortest_path_astar,
-    greedy_search,
+    get_anytime_path,
     design_mst_network,
     optimize_traffic_signal,
     adjust_signal_for_emergency,
+    approach_counts,
+    preempt_route,
     schedule_transit,
     optimize_road_maintenance,
+    maintenance_candidates,
     get_time_dependent_path
 )
+from gui.jobs import JobRunner
+from gui.map_layers import MapLayers, line_collection
+from gui.tile_cache import TileStore
+from core.algorithms.traffic_signal_optimizer import DIRECTIONS
+from core.models.spatial_index import GridIndex, LevelOfDetail
+
+# Seconds the "Fast" routing mode may search before showing its best path
+FAST_ROUTE_BUDGET = 0.05
+# The search runs in this many slices, reporting progress in between
+FAST_ROUTE_STEPS = 5
+# Zoom level of the basemap tiles
+BASEMAP_ZOOM = 12
+# Level of detail: at most this many roads / nodes are drawn, the most important first
+MAX_VISIBLE_ROADS = 5000
+MAX_VISIBLE_NODES = 2000
+# At most one node label per cell of this (columns, rows) screen grid
+LABEL_GRID = (10, 8)
 
 class CairoMapGUI:
-    def __init__(self, master, cairo_map):
+    def __init__(self, master, cairo_map, tiles=None):
         self.master = master
         self.cairo_map = cairo_map
+        # خريطة القاعدة من مخزن محلي للبلاطات (يعمل بدون إنترنت بعد التحميل المسبق)
+        self.tiles = tiles if tiles is not None else TileStore()
         master.title("Smart Transportation System - Cairo")
         master.geometry("1300x800")
         plt.ioff()
@@ -30,12 +52,25 @@ class CairoMapGUI:
         # تعريف متغيرات التحكم
         self.show_metro = tk.BooleanVar(value=True)
         self.show_bus = tk.BooleanVar(value=True)
+        self.offline_tiles = tk.BooleanVar(value=self.tiles.offline)
+        # Last route drawn on the map (node ids), None when there is none
+        self.route = None
+
+        # الحسابات الطويلة تعمل في الخلفية حتى تبقى الخريطة تستجيب
+        self.jobs = JobRunner(master, on_update=self.show_jobs)
+        master.protocol("WM_DELETE_WINDOW", self.close)
         
         # إنشاء واجهة المستخدم
         self.create_control_frame()
         self.create_map_frame()
         self.setup_algorithm_tabs()
+        self.create_status_frame()
         self.populate_locations()
+
+    def close(self):
+        """Drop running jobs and close the window"""
+        self.jobs.shutdown()
+        self.master.destroy()
         
     def create_control_frame(self):
         """Create the left control section"""
@@ -46,6 +81,47 @@ class CairoMapGUI:
         title = tk.Label(self.control_frame, text="Smart Transportation System", font=("Arial", 16, "bold"))
         title.pack(pady=10)
 
+    def create_status_frame(self):
+        """Progress of background jobs, with a button to cancel them"""
+        frame = ttk.Frame(self.control_frame)
+        frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(frame, textvariable=self.status_var).pack(side=tk.TOP, anchor="w")
+        self.progress = ttk.Progressbar(frame, mode="determinate", maximum=1.0)
+        self.progress.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.cancel_button = ttk.Button(frame, text="Cancel", state=tk.DISABLED,
+                                        command=self.cancel_jobs)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+    def show_jobs(self, jobs):
+        """Update the progress bar from the running jobs (called on the Tk thread)"""
+        if not jobs:
+            self.progress.stop()
+            self.progress.config(mode="determinate", value=0)
+            self.cancel_button.config(state=tk.DISABLED)
+            if self.status_var.get().endswith("..."):
+                self.status_var.set("Ready")
+            return
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_var.set(", ".join(job.description for job in jobs) + "...")
+        fractions = [job.progress for job in jobs]
+        if None in fractions:
+            if str(self.progress.cget("mode")) != "indeterminate":
+                self.progress.config(mode="indeterminate", maximum=100)
+                self.progress.start(20)
+        else:
+            self.progress.stop()
+            self.progress.config(mode="determinate", maximum=1.0, value=min(fractions))
+
+    def cancel_jobs(self):
+        """Cancel every running job; their results are discarded"""
+        self.jobs.cancel()
+        self.status_var.set("Cancelled")
+
+    def show_error(self, error):
+        messagebox.showerror("Error", f"An error occurred: {str(error)}")
+
     def create_map_frame(self):
         """Create the map display section"""
         self.map_frame = tk.Frame(self.master, padx=10, pady=10)
@@ -60,11 +136,15 @@ class CairoMapGUI:
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         # إضافة شريط أدوات التكبير/التصغير
-        toolbar = NavigationToolbar2Tk(self.canvas, self.map_frame)
-        toolbar.update()
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.map_frame)
+        self.toolbar.update()
         self.canvas._tkcanvas.pack(fill=tk.BOTH, expand=True)
-        
+
+        # الطبقات الثابتة تُرسم مرة واحدة، والطبقات العلوية فقط تُعاد
+        self.layers = MapLayers(self.ax, self.canvas, label_grid=LABEL_GRID)
         self.draw_base_map()
+        # النقر الأيسر يحدد نقطة البداية والأيمن نقطة النهاية
+        self.canvas.mpl_connect("button_press_event", self.on_map_click)
 
     def setup_algorithm_tabs(self):
         """Set up tabs for different algorithms"""
@@ -76,12 +156,17 @@ class CairoMapGUI:
         ttk.Checkbutton(options_frame, 
                     text="Show Metro Lines", 
                     variable=self.show_metro,
-                    command=self.draw_base_map).pack(side=tk.LEFT, padx=5)
+                    command=self.toggle_metro).pack(side=tk.LEFT, padx=5)
         
         ttk.Checkbutton(options_frame, 
                     text="Show Bus Routes", 
                     variable=self.show_bus,
-                    command=self.draw_base_map).pack(side=tk.LEFT, padx=5)
+                    command=self.toggle_bus).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Checkbutton(options_frame, 
+                    text="Offline Map", 
+                    variable=self.offline_tiles,
+                    command=self.toggle_offline).pack(side=tk.LEFT, padx=5)
         
         # إنشاء تبويبات الخوارزميات
         tab_control = ttk.Notebook(self.control_frame)
@@ -129,7 +214,7 @@ class CairoMapGUI:
         ttk.Label(frame, text="Algorithm:").grid(row=2, column=0, sticky="w")
         self.algo_var = tk.StringVar()
         algo_combo = ttk.Combobox(frame, textvariable=self.algo_var, width=25,
-                                 values=["Dijkstra", "A*", "Greedy", "Time-dependent Dijkstra", "MST"])
+                                 values=["Dijkstra", "A*", "Fast (Anytime A*)", "Time-dependent Dijkstra", "MST"])
         algo_combo.current(0)
         algo_combo.grid(row=2, column=1, pady=5)
         
@@ -144,6 +229,7 @@ class CairoMapGUI:
         # Path information display
         self.path_info = tk.Text(frame, height=10, width=40, state=tk.DISABLED)
         self.path_info.grid(row=5, column=0, columnspan=2)
+        ttk.Label(frame, text="Left/right click on the map sets start/end").grid(row=6, column=0, columnspan=2)
 
     def setup_emergency_tab(self, parent):
         """Setup interface for emergency mode"""
@@ -154,15 +240,19 @@ class CairoMapGUI:
         ttk.Label(frame, text="Emergency Vehicle Direction:").pack()
         self.emergency_dir = tk.StringVar()
         ttk.Combobox(frame, textvariable=self.emergency_dir, 
-                     values=["north", "south", "east", "west"]).pack(pady=5)
-        
-        # Traffic data (can be fetched from the system)
-        self.traffic_data = {
-            "north": 50,
-            "south": 30,
-            "east": 70,
-            "west": 20
-        }
+                     values=list(DIRECTIONS)).pack(pady=5)
+        
+        # Intersection whose signal is adjusted (a shown route is preempted instead)
+        ttk.Label(frame, text="Intersection:").pack()
+        self.emergency_node_var = tk.StringVar()
+        self.emergency_combo = ttk.Combobox(frame, textvariable=self.emergency_node_var, width=25)
+        self.emergency_combo.pack(pady=5)
+        
+        # Traffic counts of the roads in this period
+        ttk.Label(frame, text="Traffic Period:").pack()
+        self.emergency_period = tk.StringVar(value="morning")
+        ttk.Combobox(frame, textvariable=self.emergency_period,
+                     values=["morning", "afternoon", "evening", "night"]).pack(pady=5)
         
         # Activation button
         ttk.Button(frame, text="Activate Emergency Mode", 
@@ -178,8 +268,8 @@ class CairoMapGUI:
         frame.pack(fill=tk.BOTH, padx=5, pady=5)
         
         # Budget input
-        ttk.Label(frame, text="Available Budget:").pack()
-        self.budget_var = tk.IntVar(value=1000)
+        ttk.Label(frame, text="Available Budget (EGP):").pack()
+        self.budget_var = tk.IntVar(value=20000000)
         ttk.Entry(frame, textvariable=self.budget_var).pack(pady=5)
         
         # Optimization button
@@ -221,6 +311,7 @@ class CairoMapGUI:
         
         self.start_combo['values'] = display_names
         self.end_combo['values'] = display_names
+        self.emergency_combo['values'] = display_names
         if display_names:
             self.start_combo.current(0)
             self.end_combo.current(min(1, len(display_names)-1))
@@ -230,9 +321,10 @@ class CairoMapGUI:
 
     # ثم عدل دالة draw_base_map كما يلي:
     def draw_base_map(self):
-        """Draw the base map with real Cairo map background"""
+        """Draw the base map with real Cairo map background (static layers and overlays from scratch)"""
         self.ax.clear()
-        pos = {node: data.get('pos', (0, 0)) for node, data in self.cairo_map.G.nodes(data=True)}
+        self.layers.reset()
+        self.pos = pos = {node: data.get('pos', (0, 0)) for node, data in self.cairo_map.G.nodes(data=True)}
         
         # تحويل الإحداثيات إلى نظام إسقاط مناسب (مثال: WGS84)
         # لاحظ أن إحداثياتك الحالية تبدو كإحداثيات خطوط الطول والعرض
@@ -240,17 +332,6 @@ class CairoMapGUI:
         node_positions = {node: (data['pos'][0], data['pos'][1]) 
                         for node, data in self.cairo_map.G.nodes(data=True) if 'pos' in data}
         
-        # فصل العقد إلى أحياء ومرافق
-        neighborhoods = []
-        facilities = []
-        
-        for node in self.cairo_map.G.nodes():
-            node_data = self.cairo_map.G.nodes[node]
-            if node_data.get('node_type') == 'neighborhood':
-                neighborhoods.append(node)
-            elif node_data.get('node_type') == 'facility':
-                facilities.append(node)
-        
         # رسم الخريطة الأساسية
         if node_positions:
             # الحصول على حدود الخريطة بناءً على مواقع العقد
@@ -270,128 +351,157 @@ class CairoMapGUI:
             self.ax.set_xlim(min_x, max_x)
             self.ax.set_ylim(min_y, max_y)
             
-            # إضافة خريطة القاعدة (قد تحتاج إلى ضبط مستوى التكبير)
+            # إضافة خريطة القاعدة من البلاطات المخزنة (صورة مركبة جاهزة لكل مستوى تكبير ومنطقة)
             try:
-                ctx.add_basemap(
-                    self.ax,
-                    crs='EPSG:4326',  # نظام إحداثيات WGS84
-                    source=ctx.providers.OpenStreetMap.Mapnik,
-                    zoom=12  # يمكن ضبط مستوى التكبير حسب الحاجة
-                )
+                image, extent = self.tiles.background(min_x, min_y, max_x, max_y, BASEMAP_ZOOM)
+                if image[..., 3].any():
+                    basemap = self.ax.imshow(image, extent=extent, interpolation='bilinear', zorder=0)
+                    self.ax.set_xlim(min_x, max_x)
+                    self.ax.set_ylim(min_y, max_y)
+                    self.layers.set_static("basemap", [basemap])
             except Exception as e:
                 print(f"Error loading basemap: {e}")
                 # إذا فشل تحميل الخريطة، ارسم بدونها
                 pass
         
-        # رسم الطرق
-        nx.draw_networkx_edges(
-            self.cairo_map.G, pos, 
-            edge_color="#4d4d4d", 
-            width=1, 
-            ax=self.ax
-        )
-        
-        # رسم الأحياء باللون الأخضر
-        nx.draw_networkx_nodes(
-            self.cairo_map.G, pos,
-            nodelist=neighborhoods,
-            node_size=100,  # تصغير حجم العقد لتناسب الخريطة
-            node_color="#66c2a5",
-            ax=self.ax,
-            alpha=0.8
-        )
-        
-        # رسم المرافق باللون البرتقالي
-        nx.draw_networkx_nodes(
-            self.cairo_map.G, pos,
-            nodelist=facilities,
-            node_size=100,
-            node_color="#ff7f0e",
-            ax=self.ax,
-            node_shape='s',
-            alpha=0.8
-        )
-        
-        # تسميات العقد (يمكن تقليل حجم الخط)
-        labels = {n: d.get('name', n) for n, d in self.cairo_map.G.nodes(data=True)}
-        nx.draw_networkx_labels(
-            self.cairo_map.G, pos,
-            labels=labels,
-            font_size=8,
-            ax=self.ax,
-            font_color='black',
-            bbox=dict(facecolor='white', alpha=0.7, edgecolor='none')
-        )
-        
-        # إضافة وسيلة الإيضاح
+        # الطرق والعقد والتسميات: يُرسم فقط ما في مجال الرؤية، حسب مستوى التكبير
+        self.build_view_index()
+        self.road_lines = line_collection(self.ax, pos, [], autolim=False, colors="#4d4d4d", linewidths=1,
+                                          zorder=1)
+        self.layers.set_static("roads", [self.road_lines])
+        
+        # الأحياء باللون الأخضر والمرافق باللون البرتقالي
+        self.neighborhood_dots = self.ax.scatter([], [], s=100, c="#66c2a5", marker='o', alpha=0.8, zorder=2)
+        self.facility_dots = self.ax.scatter([], [], s=100, c="#ff7f0e", marker='s', alpha=0.8, zorder=2)
+        self.layers.set_static("nodes", [self.neighborhood_dots, self.facility_dots])
+        
+        # تسميات العقد (مجموعة ثابتة يعاد استخدامها)
+        self.labels = [
+            self.ax.text(0, 0, "", fontsize=8, color='black', ha='center', va='center', zorder=3,
+                         visible=False, bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
+            for _ in range(LABEL_GRID[0] * LABEL_GRID[1])
+        ]
+        self.layers.set_static("labels", self.labels)
+        self.update_view()
+        self.ax.callbacks.connect('xlim_changed', self.update_view)
+        self.ax.callbacks.connect('ylim_changed', self.update_view)
+        
+        self.ax.set_title("Cairo Transportation Network Map")
+        self.ax.axis('off')
+        
+        # خطوط المترو والباصات ووسيلة الإيضاح طبقات علوية تُخفى ولا يُعاد رسم الخريطة
+        self.draw_metro_lines()
+        self.draw_bus_routes()
+        self.update_legend()
+        self.canvas.draw()
+
+    def build_view_index(self):
+        """Spatial index and level-of-detail order of the roads and nodes"""
+        csr = self.cairo_map.freeze()
+        graph = self.cairo_map.G
+        self.index = index = GridIndex.from_csr(csr)
+        
+        # الطرق الرئيسية (الأعلى سعة) أولاً
+        capacity = np.nan_to_num(csr.weights.get('capacity', np.zeros(len(csr.targets))))
+        edge_capacity = capacity[np.repeat(np.arange(len(csr.node_ids)), np.diff(csr.offsets)) < csr.targets]
+        edge_order = np.argsort(-edge_capacity, kind="stable")
+        
+        # العقد الأكثر سكاناً ثم الأكثر اتصالاً أولاً
+        population = np.array([graph.nodes[n].get('population', 0) for n in csr.node_ids], dtype=np.float64)
+        node_order = np.lexsort((-np.diff(csr.offsets), -population))
+        self.node_rank = np.empty(len(node_order), dtype=np.int64)
+        self.node_rank[node_order] = np.arange(len(node_order))
+        self.is_facility = np.array([graph.nodes[n].get('node_type') == 'facility' for n in csr.node_ids], dtype=bool)
+        self.node_names = [graph.nodes[n].get('name', n) for n in csr.node_ids]
+        self.detail = LevelOfDetail(index, node_order, edge_order, MAX_VISIBLE_NODES, MAX_VISIBLE_ROADS)
+
+    def update_view(self, ax=None):
+        """Show the roads, nodes and labels in view, at the level of detail of the current zoom"""
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        self.road_lines.set_segments(self.index.segments(self.detail.edges_in(x0, y0, x1, y1)))
+        
+        nodes = self.detail.nodes_in(x0, y0, x1, y1)
+        self.neighborhood_dots.set_offsets(self.index.xy[nodes[~self.is_facility[nodes]]])
+        self.facility_dots.set_offsets(self.index.xy[nodes[self.is_facility[nodes]]])
+        
+        # تسمية واحدة لكل خلية من شبكة الشاشة، للعقدة الأهم فيها
+        ordered = nodes[np.argsort(self.node_rank[nodes], kind="stable")]
+        cols, rows = LABEL_GRID
+        xy = self.index.xy[ordered]
+        cx = ((xy[:, 0] - x0) / max(x1 - x0, 1e-12) * cols).astype(np.int64).clip(0, cols - 1)
+        cy = ((xy[:, 1] - y0) / max(y1 - y0, 1e-12) * rows).astype(np.int64).clip(0, rows - 1)
+        _, first = np.unique(cy * cols + cx, return_index=True)
+        shown = ordered[np.sort(first)].tolist()
+        for i, text in enumerate(self.labels):
+            if i < len(shown):
+                text.set_position(self.index.xy[shown[i]])
+                text.set_text(self.node_names[shown[i]])
+            text.set_visible(i < len(shown))
+
+    def update_legend(self):
+        """Legend overlay, listing the transit layers that are shown"""
         legend_elements = [
             Patch(facecolor='#66c2a5', edgecolor='black', label='Neighborhoods'),
             Patch(facecolor='#ff7f0e', edgecolor='black', label='Facilities'),
             Line2D([0], [0], color='#4d4d4d', lw=2, label='Existing Roads'),
             Line2D([0], [0], color='#4d4d4d', lw=2, linestyle='dotted', label='Proposed Roads')
         ]
-        
-        # إضافة خطوط المترو والباصات إذا كانت مفعلة
-        if hasattr(self, 'show_metro') and self.show_metro.get():
-            self.draw_metro_lines()
+        if self.show_metro.get():
             legend_elements.append(Line2D([0], [0], color='red', lw=2, label='Metro Lines'))
-        
-        if hasattr(self, 'show_bus') and self.show_bus.get():
-            self.draw_bus_routes()
+        if self.show_bus.get():
             legend_elements.append(Line2D([0], [0], color='blue', lw=2, linestyle='--', label='Bus Routes'))
         
-        self.ax.legend(handles=legend_elements, loc='upper right')
-        self.ax.set_title("Cairo Transportation Network Map")
-        self.ax.axis('off')
-        self.canvas.draw()
+        legend = Legend(self.ax, legend_elements, [h.get_label() for h in legend_elements], loc='upper right')
+        self.ax.add_artist(legend)
+        self.layers.set_overlay("legend", [legend])
 
     def draw_metro_lines(self):
-        """Draw metro lines on the map"""
-        pos = {node: data.get('pos', (0, 0)) for node, data in self.cairo_map.G.nodes(data=True)}
+        """Draw metro lines on the map (one overlay for all lines)"""
+        pos = self.pos
+        segments, colors, labels = [], [], []
         
         for line in self.cairo_map.metro_lines:
-            stations = line["stations"]
+            stations = [str(station) for station in line["stations"]]
             line_color = self.get_line_color(line["line_id"])
             
-            # Draw line segments between stations
-            for i in range(len(stations)-1):
-                start = str(stations[i])
-                end = str(stations[i+1])
-                
+            # Line segments between stations
+            for start, end in zip(stations, stations[1:]):
                 if start in pos and end in pos:
-                    x_values = [pos[start][0], pos[end][0]]
-                    y_values = [pos[start][1], pos[end][1]]
-                    self.ax.plot(x_values, y_values, color=line_color, linewidth=3, alpha=0.7)
+                    segments.append((start, end))
+                    colors.append(line_color)
                     
                     # Add line label at midpoint
                     midpoint_x = (pos[start][0] + pos[end][0]) / 2
                     midpoint_y = (pos[start][1] + pos[end][1]) / 2
-                    self.ax.text(midpoint_x, midpoint_y, line["line_id"], 
-                                color=line_color, fontsize=8, weight='bold',
-                                bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
+                    labels.append(self.ax.text(midpoint_x, midpoint_y, line["line_id"], 
+                                               color=line_color, fontsize=8, weight='bold',
+                                               bbox=dict(facecolor='white', alpha=0.7, edgecolor='none')))
+        
+        lines = line_collection(self.ax, pos, segments, autolim=False, colors=colors, linewidths=3, alpha=0.7)
+        self.layers.set_overlay("metro", [lines] + labels, visible=self.show_metro.get())
 
     def draw_bus_routes(self):
-        """Draw bus routes on the map"""
-        pos = {node: data.get('pos', (0, 0)) for node, data in self.cairo_map.G.nodes(data=True)}
+        """Draw bus routes on the map (one overlay for all routes)"""
+        pos = self.pos
+        segments, labels = [], []
         
         for route in self.cairo_map.bus_routes:
-            stops = route["stops"]
+            stops = [str(stop) for stop in route["stops"]]
             
-            # Draw line segments between stops
-            for i in range(len(stops)-1):
-                start = str(stops[i])
-                end = str(stops[i+1])
-                
+            # Line segments between stops
+            for i, (start, end) in enumerate(zip(stops, stops[1:])):
                 if start in pos and end in pos:
-                    x_values = [pos[start][0], pos[end][0]]
-                    y_values = [pos[start][1], pos[end][1]]
-                    self.ax.plot(x_values, y_values, color='blue', linewidth=1.5, linestyle='--', alpha=0.5)
+                    segments.append((start, end))
                     
                     # Add route label at first stop
                     if i == 0:
-                        self.ax.text(pos[start][0], pos[start][1], route["route_id"], 
-                                    color='blue', fontsize=7,
-                                    bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
+                        labels.append(self.ax.text(pos[start][0], pos[start][1], route["route_id"], 
+                                                   color='blue', fontsize=7,
+                                                   bbox=dict(facecolor='white', alpha=0.7, edgecolor='none')))
+        
+        routes = line_collection(self.ax, pos, segments, autolim=False,
+                                 colors='blue', linewidths=1.5, linestyles='--', alpha=0.5)
+        self.layers.set_overlay("bus", [routes] + labels, visible=self.show_bus.get())
 
     def get_line_color(self, line_id):
         """Return color based on metro line ID"""
@@ -404,14 +514,21 @@ class CairoMapGUI:
 
     def toggle_metro(self):
         """Toggle visibility of metro lines"""
+        self.layers.show("metro", self.show_metro.get(), refresh=False)
+        self.update_legend()
+
+    def toggle_offline(self):
+        """Use stored map tiles only (no tile downloads)"""
+        self.tiles.offline = self.offline_tiles.get()
         self.draw_base_map()
 
     def toggle_bus(self):
         """Toggle visibility of bus routes"""
-        self.draw_base_map()
+        self.layers.show("bus", self.show_bus.get(), refresh=False)
+        self.update_legend()
 
     def find_path(self):
-        """Find path using selected algorithm"""
+        """Find path using selected algorithm (computed in the background)"""
         start = self.extract_node_id(self.start_var.get())
         end = self.extract_node_id(self.end_var.get())
         algo = self.algo_var.get()
@@ -419,53 +536,112 @@ class CairoMapGUI:
         if not start or not end:
             messagebox.showerror("Error", "Please select start and end points")
             return
-            
+
+        self.draw_picks(start, end)
+        # A new search replaces the one still running
+        self.jobs.submit("path", self.compute_path, start, end, algo, self.time_var.get(),
+                         description=f"{algo} search", on_done=self.show_path, on_error=self.show_error)
+
+    def on_map_click(self, event):
+        """Left click: start at the nearest node, right click: end; routes once both are set"""
+        if event.inaxes is not self.ax or self.toolbar.mode or event.button not in (1, 3):
+            return      # zoom/pan clicks belong to the toolbar
+        node = self.cairo_map.nearest_node(event.xdata, event.ydata)
+        if node is None:
+            return
+        name = self.cairo_map.G.nodes[node].get('name', node)
+        (self.start_var if event.button == 1 else self.end_var).set(f"{name} ({node})")
+        start = self.extract_node_id(self.start_var.get())
+        end = self.extract_node_id(self.end_var.get())
+        if start and end and start != end:
+            self.find_path()
+        else:
+            self.draw_picks(start, end)
+
+    def draw_picks(self, start, end):
+        """Mark the chosen start (green) and end (red) nodes"""
+        marks = []
+        for node, color in ((start, "green"), (end, "red")):
+            if node in self.pos:
+                x, y = self.pos[node]
+                marks.append(Line2D([x], [y], marker="o", markersize=10, color=color, markeredgecolor="black"))
+        for mark in marks:
+            self.ax.add_line(mark)
+        self.layers.set_overlay("picks", marks)
+
+    def compute_path(self, job, start, end, algo, hour):
+        """Run the path algorithm on a worker thread: returns (path or MST, info), no Tk calls here"""
         path = None
         info = ""
-        
-        try:
-            if algo == "Dijkstra":
-                path, length = get_shortest_path_dijkstra(self.cairo_map.G, start, end)
-                info = f"Shortest Path (Dijkstra)\nLength: {length:.2f} km\n\n"
-            elif algo == "A*":
-                path, length = get_shortest_path_astar(self.cairo_map.G, start, end)
-                info = f"Shortest Path (A*)\nLength: {length:.2f} km\n\n"
-            elif algo == "Greedy":
-                path = greedy_search(self.cairo_map.G, start, end)
-                info = "Path (Greedy)\n\n"
-            elif algo == "Time-dependent Dijkstra":
-                path, length = get_time_dependent_path(self.cairo_map.G, start, end, self.time_var.get())
-                info = f"Time-dependent Path\nTime: {length:.2f} minutes\n\n"
-            elif algo == "MST":
-                mst = design_mst_network(self.cairo_map.G)
-                self.draw_mst(mst)
-                info = "Minimum Spanning Tree Network\n"
-                self.update_path_info(info)
-                return
-                
-            if path:
-                info += "Path:\n" + " → ".join([self.cairo_map.G.nodes[n].get('name', n) for n in path])
-                self.draw_path(path)
-            else:
-                info = "No available path!"
-                
-            self.update_path_info(info)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        if algo == "Dijkstra":
+            path, length = get_shortest_path_dijkstra(self.cairo_map.G, start, end)
+            info = f"Shortest Path (Dijkstra)\nLength: {length:.2f} km\n\n"
+        elif algo == "A*":
+            path, length = get_shortest_path_astar(self.cairo_map.G, start, end)
+            info = f"Shortest Path (A*)\nLength: {length:.2f} km\n\n"
+        elif algo == "Fast (Anytime A*)":
+            step = FAST_ROUTE_BUDGET / FAST_ROUTE_STEPS
+            search = get_anytime_path(self.cairo_map.freeze(), start, end, time_budget=step)
+            for done in range(1, FAST_ROUTE_STEPS):
+                if search.done:
+                    break
+                job.report(done / FAST_ROUTE_STEPS)
+                search.refine(time_budget=step)
+            path, length = search.path, search.cost
+            quality = f"at most {search.bound:.2f}x the shortest" if search.bound < float('inf') else "not yet bounded"
+            info = f"Fast Path (Anytime A*)\nLength: {length:.2f} km ({quality})\n\n"
+        elif algo == "Time-dependent Dijkstra":
+            path, length = get_time_dependent_path(self.cairo_map.G, start, end, hour)
+            info = f"Time-dependent Path\nTime: {length:.2f} minutes\n\n"
+        elif algo == "MST":
+            return design_mst_network(self.cairo_map.G), "Minimum Spanning Tree Network\n"
+
+        if path:
+            info += "Path:\n" + " → ".join([self.cairo_map.G.nodes[n].get('name', n) for n in path])
+        else:
+            info = "No available path!"
+        return path, info
+
+    def show_path(self, result):
+        """Draw the result of compute_path"""
+        path, info = result
+        # The route shown on the map, preempted by emergency mode
+        self.route = path if isinstance(path, list) else None
+        if isinstance(path, nx.Graph):
+            self.draw_mst(path)
+        elif path:
+            self.draw_path(path)
+        self.update_path_info(info)
 
     def activate_emergency(self):
-        """Activate emergency mode"""
+        """Activate emergency mode: preempt the signals along the shown route, or adjust one intersection"""
+        route = self.route
         direction = self.emergency_dir.get()
-        if not direction:
-            messagebox.showerror("Error", "Please select an emergency vehicle direction")
+        node = self.extract_node_id(self.emergency_node_var.get())
+        if not route and not (direction and node):
+            messagebox.showerror("Error", "Find a route first, or select an intersection and "
+                                          "an emergency vehicle direction")
             return
             
         try:
-            result = adjust_signal_for_emergency(self.traffic_data, direction)
-            text = "Traffic Signal Distribution:\n"
-            for dir, time in result.items():
-                text += f"{dir}: {time}%\n"
+            # Approach counts of every intersection from the roads' traffic in the chosen period
+            csr = self.cairo_map.freeze()
+            _, counts = approach_counts(csr, self.emergency_period.get())
+            if route:
+                splits, rows = preempt_route(csr, counts, route)
+                text = "Traffic Signal Distribution along the route:\n"
+                for row in rows.tolist():
+                    name = self.cairo_map.G.nodes[csr.node_ids[row]].get('name', csr.node_ids[row])
+                    shares = ", ".join(f"{dir[0].upper()} {time:g}%" for dir, time in zip(DIRECTIONS, splits[row]))
+                    text += f"{name}: {shares}\n"
+            else:
+                index = csr.node_index(node)
+                if index is None:
+                    raise ValueError(f"Unknown intersection {node}")
+                result = adjust_signal_for_emergency(dict(zip(DIRECTIONS, counts[index].tolist())), direction)
+                text = "Traffic Signal Distribution:\n"
+                for dir, time in result.items():
+                    text += f"{dir}: {time}%\n"
                 
             self.emergency_result.config(state=tk.NORMAL)
             self.emergency_result.delete(1.0, tk.END)
@@ -477,18 +653,20 @@ class CairoMapGUI:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
     def optimize_maintenance(self):
-        """Optimize road maintenance"""
-        roads = [
-            {"road_id": "1-3", "repair_cost": 500, "urgency": 7},
-            {"road_id": "2-5", "repair_cost": 300, "urgency": 9},
-            {"road_id": "3-6", "repair_cost": 200, "urgency": 5}
-        ]
-        
-        selected, total = optimize_road_maintenance(roads, self.budget_var.get())
-        
+        """Optimize road maintenance (in the background)"""
+        self.jobs.submit("maintenance", self.compute_maintenance, self.budget_var.get(),
+                         description="Maintenance plan", on_done=self.show_maintenance, on_error=self.show_error)
+
+    def compute_maintenance(self, job, budget):
+        roads = maintenance_candidates(self.cairo_map)
+        job.check()
+        return optimize_road_maintenance(roads, budget, scale='auto')
+
+    def show_maintenance(self, result):
+        selected, total = result
         text = f"Selected roads (Total importance: {total}):\n"
         for road in selected:
-            text += f"{road['road_id']} (Cost: {road['repair_cost']}, Urgency: {road['urgency']})\n"
+            text += f"{road['road_id']} (Cost: {road['repair_cost']:,} EGP, Urgency: {road['urgency']})\n"
             
         self.maintenance_result.config(state=tk.NORMAL)
         self.maintenance_result.delete(1.0, tk.END)
@@ -496,14 +674,18 @@ class CairoMapGUI:
         self.maintenance_result.config(state=tk.DISABLED)
 
     def schedule_transit(self):
-        """Schedule public transit"""
+        """Schedule public transit (in the background)"""
         lines = [
             {"line_id": "M1", "start_time": 6, "end_time": 22, "passenger_demand": 1500000},
             {"line_id": "M2", "start_time": 7, "end_time": 23, "passenger_demand": 1200000}
         ]
         
-        selected, total = schedule_transit(lines, self.buses_var.get())
-        
+        self.jobs.submit("transit", lambda job, buses: schedule_transit(lines, buses),
+                         self.buses_var.get(),
+                         description="Transit schedule", on_done=self.show_transit, on_error=self.show_error)
+
+    def show_transit(self, result):
+        selected, total = result
         text = f"Selected lines (Total passengers: {total}):\n"
         for line in selected:
             text += f"{line['line_id']} (Passengers: {line['passenger_demand']})\n"
@@ -514,32 +696,15 @@ class CairoMapGUI:
         self.transit_result.config(state=tk.DISABLED)
 
     def draw_path(self, path):
-        """Draw the path on the map"""
-        pos = {node: data.get('pos', (0, 0)) for node, data in self.cairo_map.G.nodes(data=True)}
+        """Draw the path on the map (replaces the route overlay only)"""
         path_edges = list(zip(path[:-1], path[1:]))
-        
-        self.draw_base_map()
-        nx.draw_networkx_edges(
-            self.cairo_map.G, pos,
-            edgelist=path_edges,
-            edge_color="red",
-            width=3,
-            ax=self.ax
-        )
-        self.canvas.draw()
+        route = line_collection(self.ax, self.pos, path_edges, autolim=False, colors="red", linewidths=3)
+        self.layers.set_overlay("route", [route])
 
     def draw_mst(self, mst):
-        """Draw the Minimum Spanning Tree"""
-        pos = {node: data.get('pos', (0, 0)) for node, data in self.cairo_map.G.nodes(data=True)}
-        
-        self.draw_base_map()
-        nx.draw_networkx_edges(
-            mst, pos,
-            edge_color="blue",
-            width=2,
-            ax=self.ax
-        )
-        self.canvas.draw()
+        """Draw the Minimum Spanning Tree (replaces the route overlay only)"""
+        tree = line_collection(self.ax, self.pos, mst.edges(), autolim=False, colors="blue", linewidths=2)
+        self.layers.set_overlay("route", [tree])
 
     def update_path_info(self, text):
         """Update the path information display"""
@@ -0,0 +1,117 @@
+# gui/jobs.py
+"""Background jobs for the Tk GUI.
+
+Algorithms run on a thread pool so the window (including matplotlib zoom
+and pan) keeps handling events; results are polled with ``root.after``
+and handed to callbacks on the Tk thread, the only thread allowed to
+touch widgets. Each job belongs to a channel ("path", "maintenance", ...)
+and a new job supersedes the one still running on its channel.
+
+Python threads cannot be stopped from outside, so cancelling is
+cooperative: a cancelled job's result is dropped, and jobs that call
+:meth:`Job.report` or :meth:`Job.check` between steps stop at the next one.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# How often (ms) finished jobs and progress are collected on the Tk thread
+POLL_MS = 50
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by :meth:`Job.check` once it was cancelled or superseded."""
+
+
+class Job:
+    """Handle shared by the worker running a job and the GUI watching it."""
+
+    def __init__(self, channel, description=""):
+        self.channel = channel
+        self.description = description
+        self.progress = None    # fraction done, None = unknown
+        self.future = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        """Stop here (raise JobCancelled) if the job is no longer wanted."""
+        if self.cancelled:
+            raise JobCancelled(self.description)
+
+    def report(self, fraction):
+        """Publish progress (0..1) from the worker; also a cancellation point."""
+        self.check()
+        self.progress = fraction
+
+
+class JobRunner:
+    """Thread-pool executor that delivers results on the Tk thread, one job per channel."""
+
+    def __init__(self, root, max_workers=2, on_update=None, poll_ms=POLL_MS):
+        self.root = root
+        self.on_update = on_update      # called with the running jobs after every poll
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-job")
+        self._jobs = {}                 # channel -> (job, on_done, on_error)
+        self._polling = False
+
+    def submit(self, channel, fn, *args, description="", on_done=None, on_error=None):
+        """Run ``fn(job, *args)`` in the background, superseding the job running on ``channel``.
+
+        ``on_done(result)`` / ``on_error(exception)`` are called on the Tk thread,
+        and never for a job that was cancelled or superseded.
+        """
+        self.cancel(channel)
+        job = Job(channel, description)
+        job.future = self._pool.submit(fn, job, *args)
+        self._jobs[channel] = (job, on_done, on_error)
+        self._schedule()
+        return job
+
+    def cancel(self, channel=None):
+        """Cancel the job on ``channel``, or every job."""
+        channels = list(self._jobs) if channel is None else [channel]
+        for name in channels:
+            entry = self._jobs.pop(name, None)
+            if entry is not None:
+                entry[0].cancel()
+        if channels and self.on_update is not None:
+            self.on_update(self.running())
+
+    def running(self):
+        return [job for job, _, _ in self._jobs.values()]
+
+    def shutdown(self):
+        """Cancel everything and stop accepting jobs (workers finish in the background)."""
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        for channel, (job, on_done, on_error) in list(self._jobs.items()):
+            if not job.future.done():
+                continue
+            del self._jobs[channel]
+            error = job.future.exception()
+            if error is None:
+                if on_done is not None:
+                    on_done(job.future.result())
+            elif not isinstance(error, JobCancelled) and on_error is not None:
+                on_error(error)
+        if self.on_update is not None:
+            self.on_update(self.running())
+        if self._jobs:
+            self._schedule()
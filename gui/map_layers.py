@@ -0,0 +1,112 @@
+# gui/map_layers.py
+"""Layered map rendering with a cached background.
+
+The map is split into named layers. *Static* layers (basemap, roads,
+nodes, labels) are ordinary artists rendered by a full canvas draw, which
+only happens on the first show, zoom, pan or resize. Right after that draw
+the canvas is copied as the background bitmap. *Overlays* (transit lines,
+the current route and its picked ends, the legend) are animated artists:
+they are blitted on top of that bitmap, so toggling one or showing a new
+route redraws only the overlays instead of every road, node and tile.
+Overlay labels outside the view are skipped, and with ``label_grid`` at
+most one per screen cell is drawn.
+"""
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.text import Text
+
+# Overlays are drawn in this order (later ones on top)
+OVERLAYS = ("metro", "bus", "route", "picks", "legend")
+
+
+class MapLayers:
+    """Named layers of artists on one axes, with blitted overlays."""
+
+    def __init__(self, ax, canvas, label_grid=None):
+        self.ax = ax
+        self.canvas = canvas
+        self.label_grid = label_grid    # (columns, rows)
+        self.static = {}
+        self.overlays = {}
+        self.background = None
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def reset(self):
+        """Forget every layer (after ``ax.clear()``)."""
+        self.static.clear()
+        self.overlays.clear()
+        self.background = None
+
+    def set_static(self, name, artists):
+        """Replace a static layer; the background is rendered again on the next draw."""
+        _remove(self.static.pop(name, ()))
+        self.static[name] = list(artists)
+        self.background = None
+        self.canvas.draw_idle()
+
+    def set_overlay(self, name, artists, visible=True):
+        """Replace an overlay and blit it."""
+        _remove(self.overlays.pop(name, ()))
+        artists = list(artists)
+        for artist in artists:
+            artist.set_animated(True)
+            artist.set_visible(visible)
+        self.overlays[name] = artists
+        self.refresh()
+
+    def show(self, name, visible=True, refresh=True):
+        """Show or hide an overlay without rebuilding it."""
+        for artist in self.overlays.get(name, ()):
+            artist.set_visible(visible)
+        if refresh:
+            self.refresh()
+
+    def refresh(self):
+        """Redraw the overlays over the cached background."""
+        if self.background is None:
+            self.canvas.draw_idle()     # _on_draw blits them after the full draw
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_overlays()
+        self.canvas.blit(self.ax.figure.bbox)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.figure.bbox)
+        self._draw_overlays()
+
+    def _draw_overlays(self):
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        cols, rows = self.label_grid or (0, 0)
+        for name in sorted(self.overlays, key=lambda n: OVERLAYS.index(n) if n in OVERLAYS else len(OVERLAYS)):
+            taken = set()
+            for artist in self.overlays[name]:
+                if not artist.get_visible():
+                    continue
+                if isinstance(artist, Text):
+                    x, y = artist.get_position()
+                    if not (x0 <= x <= x1 and y0 <= y <= y1):
+                        continue
+                    if cols:
+                        cell = (int((x - x0) / (x1 - x0) * cols), int((y - y0) / (y1 - y0) * rows))
+                        if cell in taken:
+                            continue
+                        taken.add(cell)
+                self.ax.draw_artist(artist)
+
+
+def segment_array(pos, edges):
+    """``(E, 2, 2)`` array of the edges' end coordinates, for a LineCollection; edges without positions are skipped."""
+    segments = [(pos[u], pos[v]) for u, v in edges if u in pos and v in pos]
+    return np.array(segments, dtype=np.float64).reshape(-1, 2, 2)
+
+
+def line_collection(ax, pos, edges, autolim=True, **style):
+    """One LineCollection for all ``edges``, added to ``ax``."""
+    collection = LineCollection(segment_array(pos, edges), **style)
+    ax.add_collection(collection, autolim=autolim)
+    return collection
+
+
+def _remove(artists):
+    for artist in artists:
+        artist.remove()
@@ -0,0 +1,233 @@
+# gui/tile_cache.py
+"""Basemap tiles from a local on-disk store.
+
+Tiles live in ``<directory>/<z>/<x>/<y>.png``. A missing tile is fetched
+from ``url`` (any urllib URL, so ``file://`` directories and local stub
+servers work too) unless the store is offline; the store is kept under
+``max_bytes`` by evicting the least recently used files. Backgrounds are
+composited once per tile source, zoom and tile range, warped to the map's
+lon/lat axes, and kept in memory and as ``.npy`` files that share the
+tiles' size budget, so showing the same view again fetches and decodes
+nothing.
+
+Prefetch the area of the network before going offline:
+
+    python -m gui.tile_cache --data data --zooms 11 12 13
+"""
+import hashlib
+import io
+import math
+import os
+import urllib.request
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.image import imread
+
+DEFAULT_CACHE = os.path.join("data", "tiles")
+TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+TILE_SIZE = 256
+MAX_CACHE_BYTES = 512 * 2 ** 20
+USER_AGENT = "Cairo-Transportation-Network/1.0"
+# Backgrounds of more tiles than this are composited at a lower zoom
+MAX_BACKGROUND_TILES = 64
+COMPOSITES = "composites"
+
+
+class TileStore:
+    """Size-bounded LRU store of map tiles and background composites on disk, with an offline mode."""
+
+    def __init__(self, directory=DEFAULT_CACHE, url=TILE_URL, max_bytes=MAX_CACHE_BYTES, offline=False, timeout=10):
+        self.directory = directory
+        self.url = url
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.timeout = timeout
+        self._backgrounds = {}
+        self._files = OrderedDict()     # tile or composite path -> size, least recently used first
+        self.size = 0
+        found = []
+        for root, dirs, files in os.walk(directory):
+            for name in files:
+                if name.endswith((".png", ".npy")):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    found.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._files[path] = size
+            self.size += size
+
+    def __len__(self):
+        """Number of stored tiles (composites not included)."""
+        return sum(path.endswith(".png") for path in self._files)
+
+    def path(self, z, x, y):
+        return os.path.join(self.directory, str(z), str(x), f"{y}.png")
+
+    def get(self, z, x, y):
+        """PNG bytes of tile (z, x, y); fetched and stored if missing. None if offline and not stored."""
+        path = self.path(z, x, y)
+        if path in self._files:
+            self._touch(path)
+            with open(path, "rb") as f:
+                return f.read()
+        if self.offline:
+            return None
+        request = urllib.request.Request(self.url.format(z=z, x=x, y=y), headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = response.read()
+        self._store(path, lambda f: f.write(data))
+        return data
+
+    def prefetch(self, west, south, east, north, zooms):
+        """Download every tile of the bounding box at ``zooms`` that is not stored yet; returns how many."""
+        fetched = 0
+        for z in zooms:
+            x0, y0, x1, y1 = tile_range(west, south, east, north, z)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    if self.path(z, x, y) not in self._files:
+                        self.get(z, x, y)
+                        fetched += 1
+        return fetched
+
+    def background(self, west, south, east, north, zoom):
+        """``(image, (left, right, bottom, top))`` covering the bounding box, for ``ax.imshow``.
+
+        The image is an RGBA uint8 array in lon/lat (EPSG:4326) rows. Tiles
+        that cannot be had are left transparent; such incomplete composites
+        are not saved, so they fill in once the tiles are available. Large
+        areas use a lower zoom, at most MAX_BACKGROUND_TILES tiles.
+        """
+        while zoom > 0 and _tile_count(tile_range(west, south, east, north, zoom)) > MAX_BACKGROUND_TILES:
+            zoom -= 1
+        tiles = (zoom,) + tile_range(west, south, east, north, zoom)
+        # The source is part of the key: another tile server gives other images
+        source = hashlib.sha1(self.url.encode("utf-8")).hexdigest()[:12]
+        key = (source,) + tiles
+        if key in self._backgrounds:
+            return self._backgrounds[key]
+        z, x0, y0, x1, y1 = tiles
+        saved = os.path.join(self.directory, COMPOSITES, "_".join(map(str, key)) + ".npy")
+        extent = (tile_lon(x0, z), tile_lon(x1 + 1, z), tile_lat(y1 + 1, z), tile_lat(y0, z))
+        if saved in self._files:
+            self._touch(saved)
+            self._backgrounds[key] = np.load(saved), extent
+            return self._backgrounds[key]
+
+        mosaic = np.zeros(((y1 - y0 + 1) * TILE_SIZE, (x1 - x0 + 1) * TILE_SIZE, 4), dtype=np.uint8)
+        complete = True
+        reachable = not self.offline
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                data = None
+                if reachable or self.path(z, x, y) in self._files:
+                    try:
+                        data = self.get(z, x, y)
+                    except OSError as e:
+                        print(f"Tile server unavailable ({e}), using stored tiles only")
+                        reachable = False
+                if data is None:
+                    complete = False
+                    continue
+                top, left = (y - y0) * TILE_SIZE, (x - x0) * TILE_SIZE
+                mosaic[top:top + TILE_SIZE, left:left + TILE_SIZE] = decode_tile(data)
+
+        # Web Mercator rows -> rows evenly spaced in latitude
+        step = (extent[3] - extent[2]) / len(mosaic)
+        lats = extent[3] - (np.arange(len(mosaic)) + 0.5) * step
+        rows = ((tile_y(lats, z) - y0) * TILE_SIZE).astype(np.int64).clip(0, len(mosaic) - 1)
+        image = mosaic[rows]
+        if complete:
+            self._store(saved, lambda f: np.save(f, image))
+        self._backgrounds[key] = image, extent
+        return image, extent
+
+    def _touch(self, path):
+        self._files.move_to_end(path)
+        os.utime(path)     # the order survives restarts through the mtime
+
+    def _store(self, path, write):
+        """Write a file with ``write(f)`` and evict the least recently used files until the store fits."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = path + ".part"
+        with open(temporary, "wb") as f:
+            write(f)
+        os.replace(temporary, path)
+        size = os.path.getsize(path)
+        self.size += size - self._files.pop(path, 0)
+        self._files[path] = size
+        while self.size > self.max_bytes and len(self._files) > 1:
+            oldest, size = self._files.popitem(last=False)
+            self.size -= size
+            os.remove(oldest)
+
+
+def decode_tile(data):
+    """PNG bytes -> TILE_SIZE x TILE_SIZE x 4 uint8 array."""
+    image = imread(io.BytesIO(data), format="png")
+    if image.dtype != np.uint8:
+        image = (image * 255).round().astype(np.uint8)
+    if image.ndim == 2:
+        image = np.repeat(image[:, :, None], 3, axis=2)
+    if image.shape[2] == 3:
+        image = np.dstack([image, np.full(image.shape[:2], 255, dtype=np.uint8)])
+    return image
+
+
+def tile_x(lon, zoom):
+    return (np.asarray(lon) + 180.0) / 360.0 * 2 ** zoom
+
+
+def tile_y(lat, zoom):
+    lat = np.radians(lat)
+    return (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * 2 ** zoom
+
+
+def tile_lon(x, zoom):
+    return x / 2 ** zoom * 360.0 - 180.0
+
+
+def tile_lat(y, zoom):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / 2 ** zoom))))
+
+
+def tile_range(west, south, east, north, zoom):
+    """Inclusive ``(x0, y0, x1, y1)`` of the tiles covering a lon/lat bounding box."""
+    last = 2 ** zoom - 1
+    x0, x1 = (min(max(int(v), 0), last) for v in (tile_x(west, zoom), tile_x(east, zoom)))
+    y0, y1 = (min(max(int(v), 0), last) for v in (tile_y(north, zoom), tile_y(south, zoom)))
+    return x0, y0, x1, y1
+
+
+def _tile_count(tiles):
+    x0, y0, x1, y1 = tiles
+    return (x1 - x0 + 1) * (y1 - y0 + 1)
+
+
+def node_bbox(graph, padding=0.02):
+    """``(west, south, east, north)`` of the nodes' ``pos``, padded like the map view."""
+    xs, ys = zip(*(data['pos'] for _, data in graph.nodes(data=True) if 'pos' in data))
+    return min(xs) - padding, min(ys) - padding, max(xs) + padding, max(ys) + padding
+
+
+if __name__ == "__main__":
+    import argparse
+    from core.models.data_module import CairoMap
+    from core.services.data_loader import load_cairo_map
+
+    parser = argparse.ArgumentParser(description="Prefetch basemap tiles for the network's bounding box")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--zooms", type=int, nargs="+", default=[12])
+    parser.add_argument("--cache", default=DEFAULT_CACHE)
+    parser.add_argument("--url", default=TILE_URL)
+    parser.add_argument("--max-mb", type=float, default=MAX_CACHE_BYTES / 2 ** 20)
+    args = parser.parse_args()
+
+    cairo_map = load_cairo_map(CairoMap(), args.data)
+    store = TileStore(args.cache, args.url, int(args.max_mb * 2 ** 20))
+    bbox = node_bbox(cairo_map.G)
+    fetched = store.prefetch(*bbox, args.zooms)
+    for zoom in args.zooms:
+        store.background(*bbox, zoom)
+    print(f"{fetched} tiles fetched, {len(store)} stored ({store.size / 2 ** 20:.1f} MB) in {args.cache}")
@@ -1,49 +1,33 @@
-import json
 from core.models.data_module import CairoMap
-from core.services.data_loader import DataLoader
+from core.services.distance_store import attach_distance_store
+from core.services.network_snapshot import load_snapshot
+from core.services.stream_loader import stream_cairo_map
 from gui.gui import CairoMapGUI
 import tkinter as tk
 
-def load_data(cairo_map):
-    """Load all data into the CairoMap instance"""
+def load_data(data_dir='data'):
+    """Build a CairoMap with all data loaded, or None if loading failed"""
     try:
-        # Load neighborhoods
-        with open('data/neighborhoods.json', 'r', encoding='utf-8') as f:
-            cairo_map.neighborhoods = json.load(f)
-        
-        # Load facilities
-        with open('data/facilities.json', 'r', encoding='utf-8') as f:
-            cairo_map.facilities = json.load(f)
-        
-        # Load roads
-        with open('data/roads.json', 'r', encoding='utf-8') as f:
-            roads_data = json.load(f)
-            cairo_map.existing_roads = roads_data.get("existing_roads", [])
-            cairo_map.new_roads = roads_data.get("new_roads", [])
-        
-        # Load transport data using DataLoader
-        transport_loader = DataLoader('data/transport.json')
-        cairo_map.traffic_patterns = transport_loader.get_traffic_patterns()
-        cairo_map.metro_lines = transport_loader.get_metro_lines()
-        cairo_map.bus_routes = transport_loader.get_bus_routes()
-        cairo_map.public_transport_demand = transport_loader.get_public_transport_demand()
-        
-        # Build the graph
-        cairo_map._add_nodes()
-        cairo_map._add_edges()
-        
-        print(f"Data loaded successfully! Nodes: {len(cairo_map.G.nodes())}, Edges: {len(cairo_map.G.edges())}")
-        return True
+        try:
+            # Memory-mapped binary snapshot, recompiled automatically when data/*.json changes
+            cairo_map = load_snapshot(CairoMap(), data_dir)
+        except Exception as e:
+            print(f"Snapshot unavailable ({e}), loading JSON files instead")
+            cairo_map = stream_cairo_map(CairoMap(), data_dir)
+        # Precomputed routes (python -m core.services.distance_store), used only if built from these files
+        attach_distance_store(cairo_map, data_dir)
+        # Counted on the CSR snapshot: reading G would build the networkx graph here
+        csr = cairo_map.freeze()
+        print(f"Data loaded successfully! Nodes: {csr.num_nodes}, Edges: {csr.num_edges // 2}")
+        return cairo_map
     except Exception as e:
         print(f"Error loading data: {str(e)}")
-        return False
+        return None
 
 def main():
-    # Create CairoMap instance
-    cairo_map = CairoMap()
-    
-    # Load data
-    if not load_data(cairo_map):
+    # Create the CairoMap and load data
+    cairo_map = load_data()
+    if cairo_map is None:
         print("Failed to load data. Exiting...")
         return
     